@@ -0,0 +1,194 @@
+"""
+AI Aggregation Tool for BeaconIQ
+Lets VectorDeep AI compute exact figures instead of estimating them from the
+summary context. The model replies with a single `TOOL_CALL: {...}` line
+asking for measures summed by whitelisted dimensions under filters; the
+server runs it on the cube or MongoDB and answers with a small
+`TOOL_RESULT:` table, until the model replies in plain text.
+"""
+
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from analytics_query import MEASURES, build_match, to_number
+
+TOOL_CALL_PREFIX = 'TOOL_CALL:'
+MAX_TOOL_CALLS = 3
+MAX_GROUP_BY = 3
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+# Dimensions with up to this many members have them listed in the instructions
+LISTED_MEMBERS = 40
+
+
+class ToolError(ValueError):
+    """A tool call the model has to correct; the message is sent back to it"""
+
+
+class AggregateSpec:
+    """A validated aggregate call"""
+
+    def __init__(self, group_by: List[str], measures: List[str], filters: Dict[str, List[Any]],
+                 sort_by: str, descending: bool, limit: int):
+        self.group_by = group_by
+        self.measures = measures
+        self.filters = filters
+        self.sort_by = sort_by
+        self.descending = descending
+        self.limit = limit
+
+    @classmethod
+    def parse(cls, call: Dict[str, Any], dimensions: List[str]) -> 'AggregateSpec':
+        if call.get('tool', 'aggregate') != 'aggregate':
+            raise ToolError(f"Unknown tool {call.get('tool')!r}; the only tool is 'aggregate'")
+
+        group_by = call.get('group_by') or []
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        unknown = [dim for dim in group_by if dim not in dimensions]
+        if unknown:
+            raise ToolError(f"Unknown dimensions {unknown}; use any of {dimensions}")
+        if len(group_by) > MAX_GROUP_BY:
+            raise ToolError(f"Group by at most {MAX_GROUP_BY} dimensions")
+
+        measures = call.get('measures') or MEASURES
+        if isinstance(measures, str):
+            measures = [measures]
+        if any(measure not in MEASURES for measure in measures):
+            raise ToolError(f"Measures must be among {MEASURES}")
+
+        filters = {}
+        for dim, values in (call.get('filters') or {}).items():
+            if dim not in dimensions:
+                raise ToolError(f"Cannot filter on {dim!r}; use any of {dimensions}")
+            values = values if isinstance(values, list) else [values]
+            try:
+                filters[dim] = [int(value) for value in values] if dim == 'Year' else [str(value) for value in values]
+            except (TypeError, ValueError):
+                raise ToolError("Year filters must be whole years")
+
+        sort_by = call.get('sort_by') or measures[0]
+        if sort_by not in measures:
+            raise ToolError("sort_by must be one of the requested measures")
+        try:
+            limit = max(1, min(int(call.get('limit') or DEFAULT_LIMIT), MAX_LIMIT))
+        except (TypeError, ValueError):
+            raise ToolError("limit must be a number")
+        return cls(list(group_by), list(measures), filters, sort_by,
+                   str(call.get('order', 'desc')).lower() != 'asc', limit)
+
+    def top(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return sorted(rows, key=lambda row: row[self.sort_by], reverse=self.descending)[:self.limit]
+
+    def pipeline(self) -> List[Dict[str, Any]]:
+        """MongoDB equivalent of the cube path, for fields the cube does not hold"""
+        match = build_match(self.filters)
+        for dim in self.group_by:
+            match.setdefault(dim, {'$ne': None})
+        return [
+            {'$match': match},
+            {'$group': {'_id': {dim: f'${dim}' for dim in self.group_by},
+                        **{measure: {'$sum': to_number(measure)} for measure in self.measures}}},
+            {'$sort': {self.sort_by: -1 if self.descending else 1}},
+            {'$limit': self.limit}
+        ]
+
+
+def aggregate_cube(cube, spec: AggregateSpec) -> List[Dict[str, Any]]:
+    rows = cube.group_sum(spec.group_by, cube.mask(spec.filters), spec.measures, round_to=2)
+    return spec.top(rows)
+
+
+def aggregate_docs(docs: List[Dict[str, Any]], spec: AggregateSpec) -> List[Dict[str, Any]]:
+    """Flatten $group output from spec.pipeline()"""
+    return [{**(doc['_id'] or {}), **{measure: round(float(doc[measure]), 2) for measure in spec.measures}}
+            for doc in docs]
+
+
+def render_table(rows: List[Dict[str, Any]], spec: AggregateSpec) -> str:
+    if not rows:
+        return "No rows match these filters."
+    columns = spec.group_by + spec.measures
+    lines = [' | '.join(columns)]
+    for row in rows:
+        cells = [str(row[dim]) for dim in spec.group_by]
+        cells += [f"{row[measure]:,.2f}" for measure in spec.measures]
+        lines.append(' | '.join(cells))
+    return '\n'.join(lines)
+
+
+def tool_instructions(dimensions: List[str], members: Dict[str, List[Any]]) -> str:
+    """Tool description for the system message"""
+    lines = [
+        "Tools:",
+        "For any figure not stated above (a specific customer, quarter, month or combination),",
+        "do not estimate. Reply with only this line instead of an answer:",
+        'TOOL_CALL: {"tool": "aggregate", "group_by": [...], "measures": [...], "filters": {...},'
+        ' "sort_by": "Revenue", "order": "desc", "limit": 20}',
+        f"- group_by: up to {MAX_GROUP_BY} of {', '.join(dimensions)} (empty for grand totals)",
+        f"- measures: any of {', '.join(MEASURES)}",
+        "- filters: {dimension: [values]}; a quarter is its three months",
+        f"- limit: at most {MAX_LIMIT} rows",
+        f"You will receive TOOL_RESULT with a table, then either call again (at most {MAX_TOOL_CALLS} calls)",
+        "or answer the user in plain text using those exact figures."
+    ]
+    for dim in dimensions:
+        values = members.get(dim) or []
+        if 0 < len(values) <= LISTED_MEMBERS:
+            lines.append(f"- {dim} values: {', '.join(str(value) for value in values)}")
+    return '\n'.join(lines)
+
+
+def parse_tool_call(reply: str) -> Optional[Dict[str, Any]]:
+    """The call in a reply, or None when the reply is an answer"""
+    text = reply.strip()
+    if not text.startswith(TOOL_CALL_PREFIX):
+        return None
+    body = text[len(TOOL_CALL_PREFIX):].strip()
+    try:
+        call = json.loads(body[:body.rindex('}') + 1])
+    except ValueError:
+        raise ToolError("TOOL_CALL must be followed by one JSON object")
+    if not isinstance(call, dict):
+        raise ToolError("TOOL_CALL must be followed by one JSON object")
+    return call
+
+
+async def stream_with_tools(session, text: str,
+                            execute: Callable[[Dict[str, Any]], Awaitable[str]]) -> AsyncIterator[str]:
+    """Tokens of the model's final answer, running its tool calls in between
+
+    Replies are buffered only until they can be told apart from a tool call,
+    so a plain answer still streams from its first tokens.
+    """
+    message = text
+    for calls in range(MAX_TOOL_CALLS + 1):
+        buffered, streaming = [], False
+        async for token in session.stream(message):
+            if streaming:
+                yield token
+                continue
+            buffered.append(token)
+            head = ''.join(buffered).lstrip()
+            if len(head) >= len(TOOL_CALL_PREFIX) and not head.startswith(TOOL_CALL_PREFIX):
+                streaming = True
+                yield ''.join(buffered)
+        if streaming:
+            return
+
+        reply = ''.join(buffered)
+        try:
+            call = parse_tool_call(reply)
+            if call is None:
+                # Answers shorter than the prefix
+                if reply:
+                    yield reply
+                return
+            if calls == MAX_TOOL_CALLS:
+                raise ToolError("No more tool calls are allowed")
+            message = f"TOOL_RESULT:\n{await execute(call)}"
+        except ToolError as e:
+            if calls == MAX_TOOL_CALLS:
+                yield "Sorry, I could not compute that figure."
+                return
+            message = f"TOOL_ERROR: {e}"
@@ -0,0 +1,383 @@
+"""
+In-Memory Analytics Cube for BeaconIQ
+Columnar copy of business_data built once at startup: dimensions are
+dictionary-encoded to integer codes and measures live in contiguous NumPy
+arrays, so dashboard groupbys become vectorized bincount reductions
+"""
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics_query import (
+    MEASURES, NUMERIC_DIMENSIONS, Page, PeriodRange, month_number, month_sort_key, page_info, period_key
+)
+from cube_snapshot import load_snapshot, save_snapshot
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = [
+    'Year', 'Month_Name', 'Period', 'Business', 'Channel', 'Customer', 'Brand',
+    'Category', 'Sub_Category', 'Sub_Cat', 'Board_Category'
+]
+
+# Above this many possible key combinations the dense bincount is replaced by np.unique
+DENSE_GROUP_LIMIT = 1 << 24
+
+
+class _DictionaryBuilder:
+    """Incrementally assigns integer codes to the values of one dimension"""
+
+    def __init__(self, numeric: bool = False):
+        self.numeric = numeric
+        self.index: Dict[Any, int] = {}
+        self.chunks: List[np.ndarray] = []
+        self.present = False
+
+    def add(self, values: List[Any]):
+        if self.numeric:
+            series = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').astype('Int64')
+        else:
+            series = pd.Series([v if v is None or isinstance(v, str) else str(v) for v in values], dtype=object)
+        self.present = self.present or bool(series.notna().any())
+
+        local_codes, uniques = pd.factorize(series)
+        lookup = np.array([self.index.setdefault(value, len(self.index)) for value in uniques] + [-1], dtype=np.int32)
+        # factorize marks missing values with -1, which indexes the trailing -1 in lookup
+        self.chunks.append(lookup[local_codes])
+
+    def finish(self):
+        """Return (codes, sorted dictionary) with codes remapped to sorted order"""
+        values = list(self.index)
+        order = sorted(range(len(values)), key=lambda i: values[i])
+        remap = np.empty(len(values) + 1, dtype=np.int32)
+        remap[order] = np.arange(len(values), dtype=np.int32)
+        remap[-1] = -1
+
+        codes = np.concatenate(self.chunks) if self.chunks else np.empty(0, dtype=np.int32)
+        dictionary = np.array([values[i] for i in order], dtype=object)
+        if self.numeric:
+            dictionary = dictionary.astype(np.int64)
+        return np.ascontiguousarray(remap[codes]), dictionary
+
+
+class AnalyticsCube:
+    """Immutable columnar store answering filter + groupby + sum queries"""
+
+    def __init__(
+        self,
+        codes: Dict[str, np.ndarray],
+        dictionaries: Dict[str, np.ndarray],
+        measures: Dict[str, np.ndarray],
+        present: Iterable[str]
+    ):
+        self.codes = codes
+        self.dictionaries = dictionaries
+        self.measures = measures
+        self.present = set(present)
+        self.n_rows = len(next(iter(measures.values()))) if measures else 0
+        self._positions = {dim: {value: code for code, value in enumerate(values.tolist())}
+                           for dim, values in dictionaries.items()}
+
+    @classmethod
+    async def load(cls, collection, batch_size: int = 10000) -> 'AnalyticsCube':
+        """Stream the collection in batches and encode it column by column"""
+        projection = {'_id': 0, **{field: 1 for field in DIMENSIONS + MEASURES + ['Month']}}
+        builders = {dim: _DictionaryBuilder(numeric=(dim in NUMERIC_DIMENSIONS)) for dim in DIMENSIONS}
+        measure_chunks: Dict[str, List[np.ndarray]] = {measure: [] for measure in MEASURES}
+
+        batch = []
+        cursor = collection.find({}, projection).batch_size(batch_size)
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                cls._encode_batch(batch, builders, measure_chunks)
+                batch = []
+                # Let other requests run between batches on large collections
+                await asyncio.sleep(0)
+        if batch:
+            cls._encode_batch(batch, builders, measure_chunks)
+
+        codes, dictionaries = {}, {}
+        for dim, builder in builders.items():
+            codes[dim], dictionaries[dim] = builder.finish()
+        measures = {
+            measure: np.ascontiguousarray(np.concatenate(chunks) if chunks else np.empty(0, dtype=np.float64))
+            for measure, chunks in measure_chunks.items()
+        }
+        present = [dim for dim, builder in builders.items() if builder.present]
+        return cls(codes, dictionaries, measures, present)
+
+    @staticmethod
+    def _encode_batch(batch, builders, measure_chunks):
+        for doc in batch:
+            # Rows loaded before Period was stored get it from their month
+            if doc.get('Period') is None and doc.get('Year') is not None:
+                doc['Period'] = period_key(doc['Year'], doc.get('Month') or month_number(doc.get('Month_Name')))
+        for dim, builder in builders.items():
+            builder.add([doc.get(dim) for doc in batch])
+        for measure, chunks in measure_chunks.items():
+            values = pd.to_numeric(pd.Series([doc.get(measure) for doc in batch], dtype=object), errors='coerce')
+            chunks.append(values.fillna(0).to_numpy(dtype=np.float64))
+
+    def has_dimension(self, dim: str) -> bool:
+        return dim in self.present
+
+    def mask(self, filters: Dict[str, List[Any]], base: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """Boolean row mask for {dim: [values]} filters; None means every row"""
+        mask = base
+        for dim, values in filters.items():
+            positions = self._positions[dim]
+            # One extra slot so that missing values (code -1) look up False
+            allowed = np.zeros(len(positions) + 1, dtype=bool)
+            if isinstance(values, PeriodRange):
+                allowed[:-1] = values.contains(self.dictionaries[dim])
+            else:
+                allowed[[positions[v] for v in values if v in positions]] = True
+            dim_mask = allowed[self.codes[dim]]
+            mask = dim_mask if mask is None else mask & dim_mask
+        return mask
+
+    def count(self, mask: Optional[np.ndarray] = None) -> int:
+        return self.n_rows if mask is None else int(np.count_nonzero(mask))
+
+    def totals(self, mask: Optional[np.ndarray] = None, measures: List[str] = MEASURES) -> Dict[str, float]:
+        return {
+            measure: float(self.measures[measure].sum() if mask is None else self.measures[measure][mask].sum())
+            for measure in measures
+        }
+
+    def _group_totals(self, dims: List[str], mask: Optional[np.ndarray], measures: List[str]):
+        """Encoded group keys and their measure sums, in key order"""
+        sizes = [len(self.dictionaries[dim]) for dim in dims]
+        keys = np.zeros(self.n_rows, dtype=np.int64)
+        valid = np.ones(self.n_rows, dtype=bool) if mask is None else mask.copy()
+        for dim, size in zip(dims, sizes):
+            codes = self.codes[dim]
+            valid &= codes >= 0
+            keys = keys * size + codes
+        keys = keys[valid]
+
+        n_groups = int(np.prod(sizes, dtype=np.int64))
+        if n_groups == 0 or len(keys) == 0:
+            return sizes, np.empty(0, dtype=np.int64), {measure: np.empty(0) for measure in measures}
+        if n_groups <= DENSE_GROUP_LIMIT:
+            group_keys = np.flatnonzero(np.bincount(keys, minlength=n_groups))
+            inverse = None
+        else:
+            group_keys, inverse = np.unique(keys, return_inverse=True)
+
+        sums = {}
+        for measure in measures:
+            weights = self.measures[measure][valid]
+            if inverse is None:
+                sums[measure] = np.bincount(keys, weights=weights, minlength=n_groups)[group_keys]
+            else:
+                sums[measure] = np.bincount(inverse, weights=weights, minlength=len(group_keys))
+        return sizes, group_keys, sums
+
+    def _rows(self, dims: List[str], sizes: List[int], group_keys: np.ndarray,
+              sums: Dict[str, np.ndarray], round_to: Optional[int]) -> List[Dict[str, Any]]:
+        columns = {}
+        remaining = group_keys
+        for dim, size in reversed(list(zip(dims, sizes))):
+            columns[dim] = self.dictionaries[dim][remaining % size].tolist()
+            remaining = remaining // size
+
+        values = {}
+        for measure, totals in sums.items():
+            if round_to is not None:
+                totals = totals.round(round_to)
+            values[measure] = totals.tolist()
+
+        return [
+            {**{dim: columns[dim][i] for dim in dims}, **{measure: values[measure][i] for measure in sums}}
+            for i in range(len(group_keys))
+        ]
+
+    def group_sum(
+        self,
+        dims: List[str],
+        mask: Optional[np.ndarray] = None,
+        measures: List[str] = MEASURES,
+        round_to: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Sum measures by one or more dimensions, ordered by the dimension values"""
+        sizes, group_keys, sums = self._group_totals(dims, mask, measures)
+        if len(group_keys) == 0:
+            return []
+        return self._rows(dims, sizes, group_keys, sums, round_to)
+
+    def top_groups(
+        self,
+        dims: List[str],
+        page: Page,
+        mask: Optional[np.ndarray] = None,
+        measures: List[str] = MEASURES,
+        round_to: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of groups ordered by a measure, and the total number of groups
+
+        Only the groups up to the end of the page are partially selected with
+        argpartition and sorted; the rest are never decoded into rows.
+        """
+        sizes, group_keys, sums = self._group_totals(dims, mask, measures)
+        total = len(group_keys)
+        if total == 0:
+            return [], 0
+        values = sums[page.sort_by] if page.descending else -sums[page.sort_by]
+        end = total if page.limit is None else min(total, page.offset + page.limit)
+        if end < total:
+            candidates = np.argpartition(-values, end - 1)[:end]
+        else:
+            candidates = np.arange(total)
+        # Ties are broken by the group key so pages never overlap
+        order = candidates[np.lexsort((group_keys[candidates], -values[candidates]))][page.offset:end]
+        page_sums = {measure: totals[order] for measure, totals in sums.items()}
+        return self._rows(dims, sizes, group_keys[order], page_sums, round_to), total
+
+
+class CubeStore:
+    """Holds the current cube and swaps in a rebuilt one when data changes
+
+    With a snapshot directory the cube for a data version is memory-mapped
+    from disk when available and written there after a MongoDB load.
+    """
+
+    def __init__(self, snapshot_dir: Optional[Path] = None):
+        self.cube: Optional[AnalyticsCube] = None
+        self.snapshot_dir = snapshot_dir
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, collection, version: Optional[int] = None):
+        async with self._lock:
+            cube = None
+            use_snapshot = self.snapshot_dir is not None and version is not None
+            if use_snapshot:
+                parts = load_snapshot(self.snapshot_dir, version)
+                if parts is not None:
+                    cube = AnalyticsCube(*parts)
+                    # Guards against data changed without a version bump, and
+                    # snapshots written before a dimension was added
+                    if cube.n_rows != await collection.estimated_document_count() or set(cube.codes) != set(DIMENSIONS):
+                        cube = None
+
+            if cube is None:
+                cube = await AnalyticsCube.load(collection)
+                if use_snapshot:
+                    try:
+                        await asyncio.to_thread(save_snapshot, cube, self.snapshot_dir, version)
+                    except OSError as e:
+                        logger.warning(f"Could not write cube snapshot: {str(e)}")
+
+            self.cube = cube
+            logger.info(f"Analytics cube loaded - {cube.n_rows} rows")
+            return cube
+
+
+# Endpoint computations against the cube
+
+def executive_overview(cube: AnalyticsCube, filters: Dict[str, List[Any]]) -> Optional[Dict[str, Any]]:
+    mask = cube.mask(filters)
+    if cube.count(mask) == 0:
+        return None
+
+    yearly = cube.group_sum(['Year'], mask, round_to=2)
+    business_perf = cube.group_sum(['Business'], mask, round_to=2)
+
+    # Month-wise trend for current year with proper month ordering
+    monthly_trend = []
+    if yearly:
+        current_year = yearly[-1]['Year']
+        monthly_trend = cube.group_sum(['Month_Name'], cube.mask({'Year': [current_year]}, mask), round_to=2)
+        monthly_trend.sort(key=lambda row: month_sort_key(row['Month_Name']))
+
+    totals = cube.totals(mask)
+    return {
+        "yearly_performance": yearly,
+        "business_performance": business_perf,
+        "monthly_trend": monthly_trend,
+        "total_profit": totals['Gross_Profit'],
+        "total_revenue": totals['Revenue'],
+        "total_units": totals['Units']
+    }
+
+
+def customer_analysis(cube: AnalyticsCube, filters: Dict[str, List[Any]],
+                      page: Optional[Page] = None) -> Optional[Dict[str, Any]]:
+    mask = cube.mask(filters)
+    if cube.count(mask) == 0:
+        return None
+
+    if page is not None:
+        customers, total = cube.top_groups(['Customer'], page, mask, round_to=2)
+        top_customers, _ = cube.top_groups(['Customer'], Page('Revenue', True, 0, 10), mask, round_to=2)
+        return {
+            "channel_performance": cube.group_sum(['Channel'], mask, round_to=2),
+            "customer_performance": customers,
+            "top_customers": top_customers,
+            "page": page_info(page, {"customer_performance": total})
+        }
+
+    customer_perf = cube.group_sum(['Customer'], mask, round_to=2)
+    return {
+        "channel_performance": cube.group_sum(['Channel'], mask, round_to=2),
+        "customer_performance": customer_perf,
+        "top_customers": sorted(customer_perf, key=lambda row: row['Revenue'], reverse=True)[:10]
+    }
+
+
+def brand_analysis(cube: AnalyticsCube, filters: Dict[str, List[Any]],
+                   page: Optional[Page] = None) -> Optional[Dict[str, Any]]:
+    mask = cube.mask(filters)
+    if cube.count(mask) == 0:
+        return None
+
+    if page is None:
+        return {
+            "brand_performance": cube.group_sum(['Brand'], mask),
+            "brand_by_business": cube.group_sum(['Brand', 'Business'], mask, measures=['Gross_Profit', 'Revenue']),
+            "brand_yoy_growth": cube.group_sum(['Brand', 'Year'], mask, measures=['Revenue'])
+        }
+
+    # The breakdowns only cover the brands on the page
+    brands, total = cube.top_groups(['Brand'], page, mask)
+    page_mask = cube.mask({'Brand': [row['Brand'] for row in brands]}, mask)
+    return {
+        "brand_performance": brands,
+        "brand_by_business": cube.group_sum(['Brand', 'Business'], page_mask, measures=['Gross_Profit', 'Revenue']),
+        "brand_yoy_growth": cube.group_sum(['Brand', 'Year'], page_mask, measures=['Revenue']),
+        "page": page_info(page, {"brand_performance": total})
+    }
+
+
+def category_analysis(cube: AnalyticsCube, filters: Dict[str, List[Any]],
+                      page: Optional[Page] = None) -> Optional[Dict[str, Any]]:
+    mask = cube.mask(filters)
+    if cube.count(mask) == 0:
+        return None
+
+    board_category_perf = []
+    if cube.has_dimension('Board_Category'):
+        board_category_perf = cube.group_sum(['Board_Category'], mask, measures=['Gross_Profit', 'Revenue'])
+
+    if page is None:
+        return {
+            "category_performance": cube.group_sum(['Category'], mask),
+            "subcategory_performance": cube.group_sum(['Sub_Category'], mask),
+            "board_category_performance": board_category_perf
+        }
+
+    categories, category_total = cube.top_groups(['Category'], page, mask)
+    subcategories, subcategory_total = cube.top_groups(['Sub_Category'], page, mask)
+    return {
+        "category_performance": categories,
+        "subcategory_performance": subcategories,
+        "board_category_performance": board_category_perf,
+        "page": page_info(page, {"category_performance": category_total,
+                                 "subcategory_performance": subcategory_total})
+    }
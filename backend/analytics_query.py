@@ -0,0 +1,311 @@
+"""
+Analytics Query Layer for BeaconIQ
+Translates dashboard multi-select filters into MongoDB aggregation pipelines
+so that rollups are computed by the database instead of in pandas
+"""
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from metrics import stage
+
+MEASURES = ['Gross_Profit', 'Revenue', 'Units']
+
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+
+def parse_list(value: Optional[str], cast: Callable[[str], Any] = str) -> List[Any]:
+    """Split a comma separated query parameter into a clean list"""
+    if not value:
+        return []
+    return [cast(item.strip()) for item in value.split(',') if item.strip()]
+
+
+# Query parameter name -> record field for the multi-select filters
+FILTER_FIELDS = {
+    'years': 'Year',
+    'months': 'Month_Name',
+    'businesses': 'Business',
+    'channels': 'Channel',
+    'customers': 'Customer',
+    'brands': 'Brand',
+    'categories': 'Category'
+}
+
+# Compound indexes backing the filter $match; the leading fields are the ones
+# every dashboard filters on, drilldown dimensions lead their own index
+ANALYTICS_INDEXES = [
+    [('Year', 1), ('Month_Name', 1), ('Business', 1), ('Channel', 1)],
+    # from/to period ranges are index range scans on the YYYYMM key
+    [('Period', 1), ('Business', 1), ('Channel', 1)],
+    [('Customer', 1), ('Year', 1), ('Month_Name', 1)],
+    [('Brand', 1), ('Year', 1), ('Month_Name', 1)],
+    [('Category', 1), ('Year', 1), ('Month_Name', 1)]
+]
+
+
+class Page(NamedTuple):
+    """Drilldown page: groups ordered by a measure, then offset/limit"""
+    sort_by: str
+    descending: bool
+    offset: int
+    limit: Optional[int]
+
+
+def parse_page(limit: Optional[int], offset: int, sort_by: Optional[str], order: str) -> Optional[Page]:
+    """None when no paging was asked for, keeping the full key-ordered lists"""
+    if limit is None and not offset and sort_by is None:
+        return None
+    return Page(sort_by or 'Revenue', order != 'asc', offset, limit)
+
+
+def page_params(page: Optional[Page]) -> Dict[str, Any]:
+    """Result cache key parameters for a page"""
+    return page._asdict() if page is not None else {}
+
+
+def page_info(page: Page, totals: Dict[str, int]) -> Dict[str, Any]:
+    """Echo of the page plus the total number of groups in each paged list"""
+    return {
+        "sort_by": page.sort_by,
+        "order": "desc" if page.descending else "asc",
+        "offset": page.offset,
+        "limit": page.limit,
+        "total": totals
+    }
+
+
+# Dimensions holding integers rather than strings
+NUMERIC_DIMENSIONS = ('Year', 'Period')
+
+# from/to query parameters: YYYYMM
+PERIOD_PATTERN = r"^[0-9]{4}(0[1-9]|1[0-2])$"
+
+
+class PeriodRange(NamedTuple):
+    """Inclusive YYYYMM range filter on Period; either end may be open"""
+    start: Optional[int]
+    end: Optional[int]
+
+    def match(self) -> Dict[str, int]:
+        bounds = {}
+        if self.start is not None:
+            bounds['$gte'] = self.start
+        if self.end is not None:
+            bounds['$lte'] = self.end
+        return bounds
+
+    def contains(self, period):
+        """Works on a single period or elementwise on a NumPy array"""
+        inside = True
+        if self.start is not None:
+            inside = inside & (period >= self.start)
+        if self.end is not None:
+            inside = inside & (period <= self.end)
+        return inside
+
+
+def period_key(year: Any, month: Any) -> Optional[int]:
+    """(2024, 3) -> 202403"""
+    if year is None or month is None:
+        return None
+    return int(year) * 100 + int(month)
+
+
+def period_range(start: Optional[str], end: Optional[str]) -> Dict[str, PeriodRange]:
+    """Filter entry for the from/to query parameters, empty when neither is set"""
+    if start is None and end is None:
+        return {}
+    return {'Period': PeriodRange(int(start) if start else None, int(end) if end else None)}
+
+
+def parse_filters(**params: Optional[str]) -> Dict[str, List[Any]]:
+    """Normalize multi-select query parameters into {field: [values]}"""
+    filters = {}
+    for param, value in params.items():
+        field = FILTER_FIELDS[param]
+        values = parse_list(value, int if field == 'Year' else str)
+        if values:
+            filters[field] = values
+    return filters
+
+
+def build_match(filters: Dict[str, List[Any]]) -> Dict[str, Any]:
+    """Build a $match document from normalized filters"""
+    return {field: values.match() if isinstance(values, PeriodRange) else {'$in': values}
+            for field, values in filters.items()}
+
+
+def to_number(field: str, to: str = 'double') -> Dict[str, Any]:
+    """Coerce a field to a number, treating missing or bad values as 0"""
+    return {'$convert': {'input': f'${field}', 'to': to, 'onError': 0, 'onNull': 0}}
+
+
+def _measure_sums() -> Dict[str, Any]:
+    return {measure: {'$sum': f'${measure}'} for measure in MEASURES}
+
+
+# Fields each endpoint groups on, used to route queries to the smallest rollup
+EXECUTIVE_OVERVIEW_FIELDS = ['Year', 'Month_Name', 'Business']
+CUSTOMER_ANALYSIS_FIELDS = ['Channel', 'Customer']
+BRAND_ANALYSIS_FIELDS = ['Brand', 'Business', 'Year']
+CATEGORY_ANALYSIS_FIELDS = ['Category', 'Sub_Category', 'Board_Category']
+
+
+def _numeric_projection(fields: List[str]) -> Dict[str, Any]:
+    projection = {'_id': 0, **{field: 1 for field in fields}}
+    projection.update({measure: to_number(measure) for measure in MEASURES})
+    if 'Year' in fields:
+        projection['Year'] = to_number('Year', 'int')
+    return projection
+
+
+def _group_by(field: str) -> List[Dict[str, Any]]:
+    return [
+        {'$match': {field: {'$ne': None}}},
+        {'$group': {'_id': f'${field}', **_measure_sums()}},
+        {'$sort': {'_id': 1}}
+    ]
+
+
+def executive_overview_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Single round trip pipeline returning yearly, business and monthly rollups plus totals"""
+    return [
+        {'$match': match},
+        {'$project': _numeric_projection(EXECUTIVE_OVERVIEW_FIELDS)},
+        {'$facet': {
+            'yearly': [
+                {'$group': {'_id': '$Year', **_measure_sums()}},
+                {'$sort': {'_id': 1}}
+            ],
+            'business': _group_by('Business'),
+            # Grouped by Year as well so the latest year can be picked without a second query
+            'monthly': [
+                {'$match': {'Month_Name': {'$ne': None}}},
+                {'$group': {'_id': {'Year': '$Year', 'Month_Name': '$Month_Name'}, **_measure_sums()}}
+            ],
+            'totals': [
+                {'$group': {'_id': None, **_measure_sums(), 'count': {'$sum': 1}}}
+            ]
+        }}
+    ]
+
+
+def _top_by(field: str, sort_by: str, descending: bool, offset: int, limit: Optional[int]) -> List[Dict[str, Any]]:
+    """Groups ordered by a measure with $skip/$limit pushed down, ties by key"""
+    direction = -1 if descending else 1
+    stages = _group_by(field)[:2] + [{'$sort': {sort_by: direction, '_id': 1}}]
+    if offset:
+        stages.append({'$skip': offset})
+    if limit is not None:
+        stages.append({'$limit': limit})
+    return stages
+
+
+def customer_analysis_pipeline(match: Dict[str, Any], page: Optional[Page] = None) -> List[Dict[str, Any]]:
+    """Channel and customer rollups in a single round trip
+
+    With a page only that slice of customers is returned, alongside the top
+    ten by revenue and the customer count.
+    """
+    facets = {'channel': _group_by('Channel')}
+    if page is None:
+        facets['customer'] = _group_by('Customer')
+    else:
+        facets['customer'] = _top_by('Customer', page.sort_by, page.descending, page.offset, page.limit)
+        facets['top_customers'] = _top_by('Customer', 'Revenue', True, 0, 10)
+        facets['customer_count'] = [
+            {'$match': {'Customer': {'$ne': None}}},
+            {'$group': {'_id': '$Customer'}},
+            {'$count': 'groups'}
+        ]
+    return [
+        {'$match': match},
+        {'$project': _numeric_projection(CUSTOMER_ANALYSIS_FIELDS)},
+        {'$facet': facets}
+    ]
+
+
+def _rounded_measures(doc: Dict[str, Any]) -> Dict[str, float]:
+    return {measure: round(float(doc.get(measure) or 0), 2) for measure in MEASURES}
+
+
+def month_number(month_name: Any) -> Optional[int]:
+    """'March', 'Mar' and 'march' all map to 3"""
+    if not isinstance(month_name, str):
+        return None
+    prefix = month_name.strip()[:3].lower()
+    for index, name in enumerate(MONTH_ORDER, 1):
+        if name[:3].lower() == prefix:
+            return index
+    return None
+
+
+def month_sort_key(month_name: str) -> int:
+    """Calendar position for full or abbreviated month names, unknown names last"""
+    number = month_number(month_name)
+    return number if number is not None else 999
+
+
+def shape_executive_overview(facets: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Convert the $facet output into the executive overview response"""
+    # MongoDB emits no totals document for an empty match; count guards engines that emit zeros
+    if not facets or not facets.get('totals') or not facets['totals'][0].get('count'):
+        return None
+
+    totals = facets['totals'][0]
+
+    yearly = [{'Year': int(doc['_id']), **_rounded_measures(doc)} for doc in facets['yearly']]
+    business_perf = [{'Business': doc['_id'], **_rounded_measures(doc)} for doc in facets['business']]
+
+    # Month-wise trend for current year with proper month ordering
+    monthly_trend = []
+    if yearly:
+        current_year = max(row['Year'] for row in yearly)
+        months = [doc for doc in facets['monthly'] if doc['_id']['Year'] == current_year]
+        months.sort(key=lambda doc: month_sort_key(doc['_id']['Month_Name']))
+        monthly_trend = [{'Month_Name': doc['_id']['Month_Name'], **_rounded_measures(doc)} for doc in months]
+
+    return {
+        "yearly_performance": yearly,
+        "business_performance": business_perf,
+        "monthly_trend": monthly_trend,
+        "total_profit": float(totals['Gross_Profit']),
+        "total_revenue": float(totals['Revenue']),
+        "total_units": float(totals['Units'])
+    }
+
+
+async def run_executive_overview(collection, match: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Execute the executive overview pipeline; returns None when no rows match"""
+    with stage('mongo_fetch'):
+        facets = await collection.aggregate(executive_overview_pipeline(match)).to_list(1)
+    with stage('shape'):
+        return shape_executive_overview(facets[0] if facets else None)
+
+
+def shape_customer_analysis(facets: Dict[str, Any], page: Optional[Page] = None) -> Optional[Dict[str, Any]]:
+    """Convert the $facet output into the customer analysis response"""
+    if not facets or not (facets.get('channel') or facets.get('customer')):
+        return None
+
+    customer_perf = [{'Customer': doc['_id'], **_rounded_measures(doc)} for doc in facets['customer']]
+    result = {
+        "channel_performance": [{'Channel': doc['_id'], **_rounded_measures(doc)} for doc in facets['channel']],
+        "customer_performance": customer_perf
+    }
+    if page is None:
+        result["top_customers"] = sorted(customer_perf, key=lambda row: row['Revenue'], reverse=True)[:10]
+    else:
+        result["top_customers"] = [{'Customer': doc['_id'], **_rounded_measures(doc)} for doc in facets['top_customers']]
+        count = facets['customer_count'][0]['groups'] if facets['customer_count'] else 0
+        result["page"] = page_info(page, {"customer_performance": count})
+    return result
+
+
+async def run_customer_analysis(collection, match: Dict[str, Any], page: Optional[Page] = None) -> Optional[Dict[str, Any]]:
+    """Execute the customer analysis pipeline; returns None when no rows match"""
+    with stage('mongo_fetch'):
+        facets = await collection.aggregate(customer_analysis_pipeline(match, page)).to_list(1)
+    with stage('shape'):
+        return shape_customer_analysis(facets[0] if facets else None, page)
@@ -0,0 +1,146 @@
+"""
+AI Answer Cache for BeaconIQ
+Completed VectorDeep AI answers keyed on the normalized question and the data
+version they were generated from, with TTL and LRU eviction. Optionally a
+question whose words closely match a cached one reuses its answer, provided
+both name the same numbers, periods and dimension members.
+"""
+
+import re
+import time
+from threading import Lock
+from typing import FrozenSet, Hashable, Iterable, Optional, Tuple
+
+from cachetools import TTLCache
+
+from analytics_query import MONTH_ORDER
+from metrics import REGISTRY, current_route
+
+ANSWER_CACHE_REQUESTS = REGISTRY.counter(
+    'beaconiq_ai_answer_cache_requests_total', 'AI answer cache lookups', ['route', 'result'])
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Words that pick a period; any word with a digit (2024, q2, fy24) does too
+PERIOD_WORDS = frozenset([name.lower() for name in MONTH_ORDER] + [name[:3].lower() for name in MONTH_ORDER] +
+                         ['sept', 'ytd', 'mtd', 'qtd', 'this', 'last', 'next', 'previous', 'prior', 'current'])
+# Longest dimension member name, in words, looked for in questions
+MAX_MEMBER_WORDS = 6
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase words only, so case, punctuation and spacing do not matter"""
+    return ' '.join(_WORD.findall(text.lower()))
+
+
+def split_terms(normalized: str, members: FrozenSet[str]) -> Tuple[Tuple[str, ...], FrozenSet[str]]:
+    """(numbers, periods and members in the order named, remaining words) of a normalized question
+
+    Member names are matched longest first, so "tesco ireland" is one term
+    rather than "tesco" plus a remaining "ireland". Order is kept because
+    "2024 vs 2023" and "2023 vs 2024" are different questions.
+    """
+    words = normalized.split()
+    terms, rest = [], set()
+    i = 0
+    while i < len(words):
+        for n in range(min(MAX_MEMBER_WORDS, len(words) - i), 0, -1):
+            phrase = ' '.join(words[i:i + n])
+            if phrase in members:
+                terms.append(phrase)
+                i += n
+                break
+        else:
+            word = words[i]
+            if word in PERIOD_WORDS or any(char.isdigit() for char in word):
+                terms.append(word)
+            else:
+                rest.add(word)
+            i += 1
+    return tuple(terms), frozenset(rest)
+
+
+def _similarity(left: FrozenSet[str], right: FrozenSet[str]) -> float:
+    if left == right:
+        return 1.0
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+class AnswerCache:
+    """Answers per (data version, normalized question)
+
+    With `similarity` > 0, a miss falls back to the cached question of the
+    same version with the highest word-set Jaccard similarity at or above it
+    (1.0 only matches the same words in another order). Only questions naming
+    exactly the same numbers, periods and members (see set_members) are
+    compared, and only on their remaining words.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 3600, similarity: float = 0.0):
+        self.similarity = similarity
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._answers = TTLCache(maxsize=maxsize, ttl=ttl, timer=time.monotonic)
+        self._members: FrozenSet[str] = frozenset()
+        self._lock = Lock()
+
+    def set_members(self, names: Iterable[str]):
+        """Dimension members a near match has to name identically"""
+        members = frozenset(normalize_question(str(name)) for name in names)
+        with self._lock:
+            self._members = members - {''}
+
+    def get(self, question: str, version: int) -> Optional[str]:
+        normalized = normalize_question(question)
+        with self._lock:
+            entry = self._answers.get((version, normalized))
+            result = 'hit'
+            if entry is None and self.similarity > 0:
+                entry = self._closest(normalized, version)
+                result = 'near_hit'
+            if entry is None:
+                self.misses += 1
+                ANSWER_CACHE_REQUESTS.inc(current_route.get(), 'miss')
+                return None
+            if result == 'hit':
+                self.hits += 1
+            else:
+                self.near_hits += 1
+            ANSWER_CACHE_REQUESTS.inc(current_route.get(), result)
+            return entry[2]
+
+    def _closest(self, normalized: str, version: int) -> Optional[Tuple[Tuple[str, ...], FrozenSet[str], str]]:
+        terms, words = split_terms(normalized, self._members)
+        best, best_score = None, self.similarity
+        for key, entry in self._answers.items():
+            if key[0] != version or entry[0] != terms:
+                continue
+            score = _similarity(words, entry[1])
+            if score >= best_score:
+                best, best_score = key, score
+        # Look the winner up again so it counts as recently used
+        return self._answers.get(best) if best is not None else None
+
+    def put(self, question: str, version: int, answer: str):
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+        key: Hashable = (version, normalized)
+        with self._lock:
+            self._answers[key] = (*split_terms(normalized, self._members), answer)
+
+    def clear(self):
+        with self._lock:
+            self._answers.clear()
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._answers)
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses
+        }
@@ -0,0 +1,79 @@
+"""
+Authentication Helpers for BeaconIQ
+bcrypt hashing and verification on a small dedicated thread pool behind a
+concurrency limit, and a cache of already-verified JWTs so dashboard calls
+skip re-decoding the token on every request
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+import bcrypt
+from cachetools import TLRUCache
+
+
+class LoginBusy(Exception):
+    """Too many password checks are already running or waiting"""
+
+
+class PasswordHasher:
+    """bcrypt off the event loop
+
+    The pool is separate from the analytics compute pool, so a burst of
+    logins can neither block the event loop nor starve dashboard traffic.
+    Callers wait at most `acquire_timeout` seconds for a slot.
+    """
+
+    def __init__(self, workers: int = 2, max_concurrent: int = 16, acquire_timeout: float = 5.0):
+        self.acquire_timeout = acquire_timeout
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()))
+        return hashed.decode('utf-8')
+
+    async def _run(self, fn, *args):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise LoginBusy("Too many concurrent login attempts, retry shortly")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+class VerifiedToken(NamedTuple):
+    email: str
+    exp: float
+
+
+class TokenCache:
+    """Tokens that already passed signature verification, kept until the
+    sooner of their own expiry and `ttl` seconds from now"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self.ttl = ttl
+        self._tokens = TLRUCache(maxsize=maxsize, ttu=self._expires_at, timer=time.time)
+
+    def _expires_at(self, token: str, value: VerifiedToken, now: float) -> float:
+        return min(value.exp, now + self.ttl)
+
+    def get(self, token: str) -> Optional[str]:
+        entry = self._tokens.get(token)
+        return entry.email if entry is not None else None
+
+    def put(self, token: str, email: str, exp: float):
+        self._tokens[token] = VerifiedToken(email, float(exp))
+
+    def clear(self):
+        self._tokens.clear()
@@ -0,0 +1,121 @@
+"""
+Bulk Loader for BeaconIQ
+Pipelined bulk writes shared by the data generators and the sync path.
+Producers hand documents to a bounded queue of batches, and several writers
+keep unordered insert_many calls in flight, so building the next batch
+overlaps with writing the previous ones.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from pymongo import IndexModel
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10000
+CONCURRENCY = 4
+
+
+class LoadStats(NamedTuple):
+    rows: int
+    batches: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+async def build_indexes(collection, indexes: Iterable[List]):
+    """Build several indexes in one createIndexes command, after the data is loaded"""
+    models = [IndexModel(keys) for keys in indexes]
+    if models:
+        await collection.create_indexes(models)
+
+
+class BulkLoader:
+    """Concurrent unordered insert_many behind a producer/consumer queue
+
+    Use as an async context manager; `stats` is filled in on exit. Indexes
+    are left as they are: loads into a fresh collection build them afterwards
+    with `build_indexes`.
+    """
+
+    def __init__(self, collection, batch_size: int = BATCH_SIZE, concurrency: int = CONCURRENCY):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.stats: Optional[LoadStats] = None
+        self.rows = 0
+        self.batches = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        self._writers: List[asyncio.Task] = []
+        self._error: Optional[BaseException] = None
+        self._started = 0.0
+
+    async def __aenter__(self) -> 'BulkLoader':
+        self._started = time.perf_counter()
+        self._writers = [asyncio.create_task(self._write()) for _ in range(self.concurrency)]
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                await self.flush()
+        finally:
+            # Writers are stopped even when the final flush fails
+            for _ in self._writers:
+                await self._queue.put(None)
+            await asyncio.gather(*self._writers)
+            self.stats = LoadStats(self.rows, self.batches, time.perf_counter() - self._started)
+        if exc_type is None and self._error is not None:
+            raise self._error
+        logger.info(f"Loaded {self.stats.rows} rows into {self.collection.name} in {self.stats.batches} batches "
+                     f"({self.stats.rows_per_second:,.0f} rows/sec)")
+
+    async def add(self, doc: Dict[str, Any]):
+        self._pending.append(doc)
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def add_many(self, docs: List[Dict[str, Any]]):
+        self._pending.extend(docs)
+        if len(self._pending) < self.batch_size:
+            return
+        pending, self._pending = self._pending, []
+        full = len(pending) - len(pending) % self.batch_size
+        self._pending = pending[full:]
+        for start in range(0, full, self.batch_size):
+            await self._put(pending[start:start + self.batch_size])
+
+    async def flush(self):
+        """Queue whatever is buffered, even a partial batch"""
+        if self._pending:
+            batch, self._pending = self._pending, []
+            await self._put(batch)
+
+    async def _put(self, batch: List[Dict[str, Any]]):
+        # Waits while the writers are saturated, which throttles the producer
+        if self._error is not None:
+            raise self._error
+        await self._queue.put(batch)
+
+    async def _write(self):
+        while True:
+            batch = await self._queue.get()
+            if batch is None:
+                return
+            # After a failure keep draining so producers never block on a full queue
+            if self._error is not None:
+                continue
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                self.rows += len(batch)
+                self.batches += 1
+            except Exception as e:
+                self._error = e
+
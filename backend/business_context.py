@@ -0,0 +1,135 @@
+"""
+AI Business Context for BeaconIQ
+Compact summary of the full dataset (totals, YoY by business, top brands,
+channels and customers, monthly trend) built once per data version and
+injected into the AI chat system message, so chat turns never touch MongoDB
+"""
+
+from typing import Any, Dict, List
+
+from analytics_query import MEASURES, month_sort_key, to_number
+
+# Summary name -> grouped dimensions
+CONTEXT_GROUPINGS = {
+    'yearly': ['Year'],
+    'business_yearly': ['Business', 'Year'],
+    'brands': ['Brand'],
+    'channels': ['Channel'],
+    'customers': ['Customer'],
+    'monthly': ['Year', 'Month_Name']
+}
+TOP_N = 10
+
+
+def _money(value: float) -> str:
+    return f"${value:,.2f}"
+
+
+def _growth(current: float, previous: float) -> str:
+    if not previous:
+        return "n/a"
+    return f"{(current - previous) / previous * 100:+.1f}%"
+
+
+def _top(rows: List[Dict[str, Any]], dim: str) -> List[str]:
+    ranked = sorted(rows, key=lambda row: row['Revenue'], reverse=True)[:TOP_N]
+    return [f"  {i}. {row[dim]}: revenue {_money(row['Revenue'])}, gross profit {_money(row['Gross_Profit'])}"
+            for i, row in enumerate(ranked, 1)]
+
+
+def render_context(groups: Dict[str, List[Dict[str, Any]]], records: int) -> str:
+    """Plain-text summary of the grouped sums for the system message"""
+    yearly = sorted(groups['yearly'], key=lambda row: row['Year'])
+    if not yearly:
+        return "Data Overview:\n- No business data is loaded yet."
+
+    revenue = sum(row['Revenue'] for row in yearly)
+    profit = sum(row['Gross_Profit'] for row in yearly)
+    units = sum(row['Units'] for row in yearly)
+    margin = profit / revenue * 100 if revenue else 0.0
+
+    lines = [
+        f"Data Overview (full dataset, {records:,} records):",
+        f"- Years: {', '.join(str(row['Year']) for row in yearly)}",
+        f"- Total Revenue: {_money(revenue)}",
+        f"- Total Gross Profit: {_money(profit)} ({margin:.1f}% margin)",
+        f"- Total Units: {units:,.0f}",
+        "",
+        "Yearly performance:"
+    ]
+    # Partial years are flagged so the model does not read them as a decline
+    months_per_year: Dict[Any, int] = {}
+    for row in groups['monthly']:
+        months_per_year[row['Year']] = months_per_year.get(row['Year'], 0) + 1
+    previous = None
+    for row in yearly:
+        months = months_per_year.get(row['Year'], 12)
+        partial = f" [{months} months of data]" if months < 12 else ""
+        growth = f" (YoY revenue {_growth(row['Revenue'], previous['Revenue'])})" if previous else ""
+        lines.append(f"  {row['Year']}{partial}: revenue {_money(row['Revenue'])}, gross profit "
+                     f"{_money(row['Gross_Profit'])}, units {row['Units']:,.0f}{growth}")
+        previous = row
+
+    lines += ["", "Revenue by business and year:"]
+    by_business: Dict[str, Dict[int, float]] = {}
+    for row in groups['business_yearly']:
+        by_business.setdefault(row['Business'], {})[row['Year']] = row['Revenue']
+    for business in sorted(by_business):
+        years = by_business[business]
+        cells, last = [], None
+        for year in sorted(years):
+            cell = f"{year} {_money(years[year])}"
+            if last is not None:
+                cell += f" ({_growth(years[year], years[last])})"
+            cells.append(cell)
+            last = year
+        lines.append(f"  {business}: " + ", ".join(cells))
+
+    for title, name, dim in [("Top brands", 'brands', 'Brand'),
+                             ("Top channels", 'channels', 'Channel'),
+                             ("Top customers", 'customers', 'Customer')]:
+        lines += ["", f"{title} by revenue:"] + _top(groups[name], dim)
+
+    latest = yearly[-1]['Year']
+    months = sorted((row for row in groups['monthly'] if row['Year'] == latest),
+                    key=lambda row: month_sort_key(row['Month_Name']))
+    lines += ["", f"Monthly trend {latest} ({len(months)} months of data):"]
+    lines += [f"  {row['Month_Name']}: revenue {_money(row['Revenue'])}, gross profit {_money(row['Gross_Profit'])}"
+              for row in months]
+    return "\n".join(lines)
+
+
+class BusinessContext:
+    """Rendered context text for one data version"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    @classmethod
+    def empty(cls) -> 'BusinessContext':
+        return cls(render_context({name: [] for name in CONTEXT_GROUPINGS}, 0))
+
+    @classmethod
+    def from_cube(cls, cube) -> 'BusinessContext':
+        if cube.n_rows == 0:
+            return cls.empty()
+        groups = {name: cube.group_sum(dims, round_to=2) for name, dims in CONTEXT_GROUPINGS.items()}
+        return cls(render_context(groups, cube.n_rows))
+
+    @classmethod
+    async def from_collection(cls, db, router) -> 'BusinessContext':
+        """The same sums from MongoDB, each read from the smallest rollup holding its dimensions"""
+        groups = {name: await cls._group_sums(db, router, dims) for name, dims in CONTEXT_GROUPINGS.items()}
+        records = await db.business_data.estimated_document_count()
+        return cls(render_context(groups, records))
+
+    @staticmethod
+    async def _group_sums(db, router, dims: List[str]) -> List[Dict[str, Any]]:
+        pipeline = [
+            {'$match': {dim: {'$ne': None} for dim in dims}},
+            {'$group': {'_id': {dim: f'${dim}' for dim in dims},
+                        **{measure: {'$sum': to_number(measure)} for measure in MEASURES}}}
+        ]
+        docs = await db[router.route(dims)].aggregate(pipeline).to_list(None)
+        return [{**doc['_id'], **{measure: round(float(doc[measure]), 2) for measure in MEASURES}}
+                for doc in docs]
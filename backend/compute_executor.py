@@ -0,0 +1,66 @@
+"""
+Compute Executor for BeaconIQ
+Runs CPU-heavy analytics work (cube groupbys, batch folds, JSON encoding) on
+a bounded thread pool so the event loop stays free for logins and other
+requests. NumPy releases the GIL in its inner loops, and threads share the
+memory-mapped cube without copying it. When too much work is already queued,
+new work is rejected rather than letting every dashboard user wait in line.
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from metrics import REGISTRY, observe_stage
+
+COMPUTE_REJECTED = REGISTRY.counter(
+    'beaconiq_compute_rejected_total', 'Analytics computations rejected because the compute queue was full')
+
+
+class ComputeBusy(Exception):
+    """The compute queue is full; the request should be retried later"""
+
+
+class ComputeExecutor:
+    def __init__(self, workers: int = None, max_queue: int = 32):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.rejected = 0
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='analytics-compute')
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run fn(*args) on the pool, raising ComputeBusy when the queue is full"""
+        # Only touched from the event loop thread, so no lock is needed
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            COMPUTE_REJECTED.inc()
+            raise ComputeBusy(f"{self.in_flight} analytics computations already in progress")
+
+        self.in_flight += 1
+        submitted = time.perf_counter()
+
+        def call():
+            observe_stage('compute_wait', time.perf_counter() - submitted)
+            return fn(*args)
+
+        try:
+            # Copy the context so stage timers inside fn see the request's route
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(self._pool, context.run, call)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,176 @@
+"""
+AI Conversation Store for BeaconIQ
+Write-behind persistence for ai_conversations: chat turns are buffered in
+memory and inserted in batches by a background task, so chat requests never
+wait on MongoDB. A (session_id, timestamp) index serves the recent-turns
+window in one query, and a TTL index on the timestamp bounds retention.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from metrics import REGISTRY
+
+DUPLICATE_KEY = 11000
+# Name create_index gives an ascending index on timestamp
+TTL_INDEX = 'timestamp_1'
+
+CONVERSATIONS_DROPPED = REGISTRY.counter(
+    'beaconiq_ai_conversations_dropped_total', 'Conversation turns dropped because the write buffer was full')
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore:
+    """Batched, indexed ai_conversations
+
+    Turns are flushed once `batch_size` are buffered or every
+    `flush_interval` seconds. When MongoDB falls behind by more than
+    `max_buffer` turns, the oldest unwritten turns are dropped rather than
+    growing memory without bound. `timestamp` is stored as a BSON date so
+    the TTL index can expire turns after `retention_days` (0 keeps them).
+    """
+
+    def __init__(self, collection, batch_size: int = 100, flush_interval: float = 1.0,
+                 max_buffer: int = 10000, retention_days: float = 90):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.retention_days = retention_days
+        self.written = 0
+        self.dropped = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([('session_id', ASCENDING), ('timestamp', DESCENDING)])
+        expire = int(self.retention_days * 86400)
+        existing = (await self.collection.index_information()).get(TTL_INDEX)
+        if existing is None:
+            if expire:
+                await self.collection.create_index('timestamp', name=TTL_INDEX, expireAfterSeconds=expire)
+        elif not expire:
+            await self.collection.drop_index(TTL_INDEX)
+        elif existing.get('expireAfterSeconds') != expire:
+            # create_index refuses to change the options of an existing index
+            await self.collection.database.command({
+                'collMod': self.collection.name,
+                'index': {'keyPattern': {'timestamp': ASCENDING}, 'expireAfterSeconds': expire}
+            })
+
+    async def migrate_timestamps(self, batch_size: int = 1000) -> int:
+        """Convert the ISO-string timestamps of turns saved before they were stored
+        as dates; the TTL index ignores strings and they sort apart from dates"""
+        migrated = 0
+        updates = []
+        async for doc in self.collection.find({'timestamp': {'$type': 'string'}}, {'timestamp': 1}):
+            try:
+                timestamp = datetime.fromisoformat(doc['timestamp'])
+            except ValueError:
+                logger.warning(f"Conversation turn {doc['_id']} has an unreadable timestamp {doc['timestamp']!r}")
+                continue
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            updates.append(UpdateOne({'_id': doc['_id']}, {'$set': {'timestamp': timestamp}}))
+            if len(updates) >= batch_size:
+                migrated += (await self.collection.bulk_write(updates, ordered=False)).modified_count
+                updates = []
+        if updates:
+            migrated += (await self.collection.bulk_write(updates, ordered=False)).modified_count
+        if migrated:
+            logger.info(f"Converted {migrated} conversation timestamps from strings to dates")
+        return migrated
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the writer and flush whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            while self._buffer:
+                await self.flush()
+        except Exception:
+            logger.warning(f"{len(self._buffer)} conversation turns were not written")
+
+    def add(self, turn: Dict[str, Any]):
+        """Buffer one turn; never blocks"""
+        self._buffer.append(turn)
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+            CONVERSATIONS_DROPPED.inc(amount=overflow)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self):
+        batch, self._buffer = self._buffer[:self.batch_size], self._buffer[self.batch_size:]
+        if not batch:
+            return
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except BulkWriteError as e:
+            # insert_many gave every turn an _id, so a retried turn that did reach
+            # MongoDB fails as a duplicate key; count it written
+            failed = {error['index'] for error in e.details.get('writeErrors', [])
+                      if error.get('code') != DUPLICATE_KEY}
+            self.written += len(batch) - len(failed)
+            if failed:
+                logger.error(f"Conversation write error: {len(failed)} of {len(batch)} turns failed")
+                self._buffer[:0] = [turn for i, turn in enumerate(batch) if i in failed]
+                raise
+        except Exception as e:
+            # Put the batch back for the next attempt; add() trims it if MongoDB stays down
+            logger.error(f"Conversation write error: {str(e)}")
+            self._buffer[:0] = batch
+            raise
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while self._buffer:
+                    await self.flush()
+            except Exception:
+                await asyncio.sleep(self.flush_interval)
+
+    async def recent_turns(self, session_id: str, user_email: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """The last `limit` turns of a user's session, oldest first, including unflushed ones
+
+        Session ids are chosen by the client, so turns are only returned to
+        the user who made them.
+        """
+        query = {'session_id': session_id, 'user_email': user_email}
+        pending = [{key: value for key, value in turn.items() if key != '_id'}
+                   for turn in self._buffer if all(turn.get(key) == value for key, value in query.items())]
+        cursor = self.collection.find(query, {'_id': 0}) \
+            .sort('timestamp', DESCENDING).limit(limit)
+        stored = await cursor.to_list(limit)
+        turns = list(reversed(stored)) + pending
+        return turns[-limit:]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped
+        }
@@ -0,0 +1,91 @@
+"""
+Analytics Cube Snapshots for BeaconIQ
+Persists the cube's columns to an Arrow IPC file tagged with the data
+version, so a restarted or newly scaled-out worker can memory-map it instead
+of re-reading business_data from MongoDB
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from analytics_query import NUMERIC_DIMENSIONS
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PREFIX = 'business_data-v'
+
+
+def snapshot_path(directory: Path, version: int) -> Path:
+    return Path(directory) / f'{SNAPSHOT_PREFIX}{version}.arrow'
+
+
+def save_snapshot(cube, directory: Path, version: int) -> Path:
+    """Write the cube as a single record batch so every column maps zero-copy"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = snapshot_path(directory, version)
+
+    columns = {f'code:{dim}': pa.array(codes) for dim, codes in cube.codes.items()}
+    columns.update({f'measure:{measure}': pa.array(values) for measure, values in cube.measures.items()})
+    metadata = {
+        'data_version': str(version),
+        'n_rows': str(cube.n_rows),
+        'present': json.dumps(sorted(cube.present)),
+        'dictionaries': json.dumps({dim: values.tolist() for dim, values in cube.dictionaries.items()})
+    }
+    batch = pa.RecordBatch.from_pydict(columns).replace_schema_metadata(metadata)
+
+    # Write then rename so concurrent workers never map a half-written file
+    tmp_path = path.with_suffix(f'.tmp{os.getpid()}')
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa.ipc.new_file(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+    os.replace(tmp_path, path)
+
+    for old in directory.glob(f'{SNAPSHOT_PREFIX}*.arrow'):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+    logger.info(f"Analytics cube snapshot written to {path}")
+    return path
+
+
+def load_snapshot(directory: Path, version: int) -> Optional[Tuple]:
+    """Memory-map the snapshot for `version`
+
+    Returns (codes, dictionaries, measures, present) ready for AnalyticsCube,
+    or None when the file is absent, stale or unreadable.
+    """
+    path = snapshot_path(directory, version)
+    if not path.exists():
+        return None
+
+    try:
+        source = pa.memory_map(str(path), 'r')
+        batch = pa.ipc.open_file(source).get_batch(0)
+        metadata = {key.decode(): value.decode() for key, value in (batch.schema.metadata or {}).items()}
+        if metadata.get('data_version') != str(version):
+            return None
+
+        codes, measures = {}, {}
+        for name, column in zip(batch.schema.names, batch.columns):
+            kind, field = name.split(':', 1)
+            target = codes if kind == 'code' else measures
+            target[field] = column.to_numpy(zero_copy_only=True)
+
+        dictionaries = {}
+        for dim, values in json.loads(metadata['dictionaries']).items():
+            dictionaries[dim] = np.array(values, dtype=np.int64 if dim in NUMERIC_DIMENSIONS else object)
+        present = json.loads(metadata['present'])
+    except (pa.ArrowException, KeyError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable cube snapshot {path}: {str(e)}")
+        return None
+
+    logger.info(f"Analytics cube snapshot mapped from {path}")
+    return codes, dictionaries, measures, present
@@ -0,0 +1,65 @@
+"""
+Data Version Counter for BeaconIQ
+A single counter document that is bumped whenever business_data is
+regenerated or synced, so caches and in-memory copies know when to refresh
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+VERSION_COLLECTION = 'data_version'
+VERSION_ID = 'business_data'
+
+
+async def get_data_version(db) -> int:
+    doc = await db[VERSION_COLLECTION].find_one({'_id': VERSION_ID})
+    return doc['version'] if doc else 0
+
+
+async def bump_data_version(db, partitions: Optional[List[int]] = None) -> int:
+    """Atomically increment the data version and return the new value
+
+    When only some (Year, Month) partitions changed, their YYYYMM keys are
+    recorded against the new version so consumers can refresh just those.
+    """
+    doc = await db[VERSION_COLLECTION].find_one_and_update(
+        {'_id': VERSION_ID},
+        {'$inc': {'version': 1}, '$set': {'updated_at': datetime.now(timezone.utc).isoformat()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    if partitions:
+        await db[VERSION_COLLECTION].update_one(
+            {'_id': VERSION_ID},
+            {'$set': {f'partitions.{period}': doc['version'] for period in partitions}}
+        )
+    return doc['version']
+
+
+async def get_partition_versions(db) -> Dict[int, int]:
+    """YYYYMM partition -> data version in which it last changed"""
+    doc = await db[VERSION_COLLECTION].find_one({'_id': VERSION_ID}, {'partitions': 1})
+    return {int(period): version for period, version in ((doc or {}).get('partitions') or {}).items()}
+
+
+class DataVersionTracker:
+    """In-process view of the data version
+
+    `version` only advances after the caller has finished refreshing whatever
+    depends on the data, so nothing computed from old data is tagged as current.
+    """
+
+    def __init__(self):
+        self.version = 0
+        # Data that was never versioned is version 0 too, so track the first load separately
+        self.published = False
+
+    def advance(self, version: int):
+        self.version = version
+        self.published = True
+
+    def is_current(self, version: int) -> bool:
+        """True once `version` or a newer one has been published"""
+        return self.published and version <= self.version
@@ -0,0 +1,95 @@
+"""
+Dimension Catalog for BeaconIQ
+Sorted filter dropdown members with their row counts, built once per data
+version and served from memory as a pre-serialized response body
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from analytics_query import month_sort_key
+from result_cache import serialize
+from rollups import BASE_COLLECTION
+
+# Response key -> record field, in the order the filter bar expects them
+CATALOG_FIELDS = {
+    'years': 'Year',
+    'months': 'Month_Name',
+    'businesses': 'Business',
+    'channels': 'Channel',
+    'customers': 'Customer',
+    'brands': 'Brand',
+    'categories': 'Category',
+    'sub_categories': 'Sub_Cat'
+}
+
+# Generated data stores sub-categories as Sub_Category rather than Sub_Cat
+FIELD_FALLBACKS = {'Sub_Cat': 'Sub_Category'}
+
+
+def _sort_members(field: str, members: List[Tuple[Any, int]]) -> List[Tuple[Any, int]]:
+    if field == 'Month_Name':
+        return sorted(members, key=lambda m: (month_sort_key(m[0]), m[0]))
+    return sorted(members, key=lambda m: m[0])
+
+
+class DimensionCatalog:
+    """Immutable set of dimension members for one data version"""
+
+    def __init__(self, members: Dict[str, List[Tuple[Any, int]]]):
+        self.members = members
+        self.body = serialize(self.options())
+        self.body_with_counts = serialize(self.options(with_counts=True))
+
+    @classmethod
+    def empty(cls) -> 'DimensionCatalog':
+        return cls({})
+
+    def options(self, with_counts: bool = False) -> Dict[str, List[Any]]:
+        if with_counts:
+            return {key: [{"value": value, "count": count} for value, count in members]
+                    for key, members in self.members.items()}
+        return {key: [value for value, _ in members] for key, members in self.members.items()}
+
+    @classmethod
+    def from_cube(cls, cube) -> 'DimensionCatalog':
+        """Member counts straight from the cube's dictionary codes"""
+        if cube.n_rows == 0:
+            return cls.empty()
+
+        members = {}
+        for key, field in CATALOG_FIELDS.items():
+            if not cube.has_dimension(field):
+                field = FIELD_FALLBACKS.get(field, field)
+            codes = cube.codes[field]
+            counts = np.bincount(codes[codes >= 0], minlength=len(cube.dictionaries[field]))
+            found = [(value, int(count)) for value, count in zip(cube.dictionaries[field].tolist(), counts) if count]
+            members[key] = _sort_members(field, found)
+        return cls(members)
+
+    @classmethod
+    async def from_collection(cls, db, router) -> 'DimensionCatalog':
+        """Grouped counts per field, each read from the smallest rollup holding that field"""
+        members = {}
+        for key, field in CATALOG_FIELDS.items():
+            found = await cls._count_members(db, router, field)
+            if not found and field in FIELD_FALLBACKS:
+                field = FIELD_FALLBACKS[field]
+                found = await cls._count_members(db, router, field)
+            members[key] = _sort_members(field, found)
+
+        if not any(members.values()):
+            return cls.empty()
+        return cls(members)
+
+    @staticmethod
+    async def _count_members(db, router, field: str) -> List[Tuple[Any, int]]:
+        collection = router.route([field])
+        rows = '$row_count' if collection != BASE_COLLECTION else 1
+        pipeline = [
+            {'$match': {field: {'$ne': None}}},
+            {'$group': {'_id': f'${field}', 'count': {'$sum': rows}}}
+        ]
+        docs = await db[collection].aggregate(pipeline).to_list(None)
+        return [(doc['_id'], int(doc['count'])) for doc in docs]
@@ -8,7 +8,16 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import random
 from datetime import datetime, timedelta
 import os
+import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
+from analytics_query import ANALYTICS_INDEXES
+from rollups import build_rollups
+from data_version import bump_data_version
+from bulk_loader import BulkLoader, build_indexes
+from synthetic_data import (
+    parse_generator_args, month_periods, choose, sparse_pairs, sample_frames, insert_frames
+)
 
 load_dotenv()
 
@@ -106,15 +115,26 @@ SUB_CATEGORIES = [
     'Sugar-Free', 'Non-GMO', 'Natural', 'Organic', 'Premium', 'Luxury', 'Budget'
 ]
 
-async def generate_dummy_data():
-    """Generate comprehensive dummy data for the BI portal"""
-    print("Starting dummy data generation...")
-    
-    # Clear existing data
-    await db.business_data.delete_many({})
-    print("Cleared existing data")
-    
-    records = []
+# Single-field indexes built after every load (compound ones come from ANALYTICS_INDEXES)
+BUSINESS_DATA_INDEXES = [
+    [('Year', 1)],
+    [('Month', 1)],
+    [('Business', 1)],
+    [('Channel', 1)],
+    [('Customer', 1)],
+    [('Brand', 1)],
+    [('Category', 1)]
+]
+
+# Vectorized (--scale) mode: rows per month at scale 1, about the loop generator's volume
+ROWS_PER_MONTH = 3200
+# 2025 data stops at September
+LAST_MONTH = (2025, 9)
+# Holiday season and summer uplift by month
+SEASONALITY = np.array([1.4, 1.0, 1.0, 1.0, 1.0, 1.2, 1.2, 1.2, 1.0, 1.0, 1.4, 1.4])
+
+async def insert_loop_records(loader: BulkLoader):
+    """Original generator: nested loops over every dimension combination (~100k rows)"""
     record_id = 1
     
     # Generate data for each combination
@@ -167,6 +187,7 @@ async def generate_dummy_data():
                                     record = {
                                         'Year': year,
                                         'Month': month_idx,
+                                        'Period': year * 100 + month_idx,
                                         'Month_Name': month_name,
                                         'Business': business,
                                         'Channel': channel,
@@ -179,34 +200,74 @@ async def generate_dummy_data():
                                         'Gross_Profit': gross_profit,
                                         'record_id': record_id
                                     }
-                                    records.append(record)
+                                    await loader.add(record)
                                     record_id += 1
                                     
-                                    # Batch insert every 10000 records
-                                    if len(records) >= 10000:
-                                        await db.business_data.insert_many(records)
-                                        print(f"Inserted {len(records)} records... Total: {record_id - 1}")
-                                        records = []
+                                    if record_id % 10000 == 1:
+                                        print(f"Queued {record_id - 1} records...")
+
+def sample_month(rng, year, month_idx, rows):
+    """One month of --scale data, sampled column-wise with the same KPI patterns as the loops"""
+    business, channel = sparse_pairs(rng, len(BUSINESSES), len(CHANNELS), 0.3, rows)
+    base_units = rng.integers(100, 5001, rows)
+    year_multiplier = 1.0 + (year - 2023) * 0.15
+    units = (base_units * year_multiplier * SEASONALITY[month_idx - 1]).astype(np.int64)
+    revenue = np.round(units * rng.uniform(15, 250, rows), 2)
+    gross_profit = np.round(revenue * rng.uniform(0.25, 0.40, rows), 2)
+    return pd.DataFrame({
+        'Year': year,
+        'Month': month_idx,
+        'Period': year * 100 + month_idx,
+        'Month_Name': MONTHS[month_idx - 1],
+        'Business': np.asarray(BUSINESSES, dtype=object)[business],
+        'Channel': np.asarray(CHANNELS, dtype=object)[channel],
+        'Customer': choose(rng, CUSTOMERS, rows),
+        'Brand': choose(rng, BRANDS, rows),
+        'Category': choose(rng, CATEGORIES, rows),
+        'Sub_Category': choose(rng, SUB_CATEGORIES, rows),
+        'Units': units,
+        'Revenue': revenue,
+        'Gross_Profit': gross_profit
+    })
+
+async def generate_dummy_data(scale: float = None, seed: int = None):
+    """Generate comprehensive dummy data for the BI portal"""
+    print("Starting dummy data generation...")
     
-    # Insert remaining records
-    if records:
-        await db.business_data.insert_many(records)
-        print(f"Inserted final {len(records)} records")
+    # Clear existing data (dropped rather than emptied so the load runs without index maintenance)
+    await db.business_data.drop()
+    print("Cleared existing data")
+    
+    async with BulkLoader(db.business_data) as loader:
+        if scale is None:
+            random.seed(seed)
+            await insert_loop_records(loader)
+        else:
+            # Vectorized mode for load testing at production-like volume
+            frames = sample_frames(sample_month, month_periods(YEARS, LAST_MONTH), ROWS_PER_MONTH, scale, seed)
+            await insert_frames(loader, frames)
+    print(f"Loaded {loader.stats.rows:,} records in {loader.stats.seconds:.1f}s "
+          f"({loader.stats.rows_per_second:,.0f} rows/sec)")
     
     total_count = await db.business_data.count_documents({})
     print(f"\n✅ Successfully generated {total_count:,} dummy records!")
     
     # Create indexes for performance
     print("\nCreating indexes...")
-    await db.business_data.create_index([('Year', 1)])
-    await db.business_data.create_index([('Month', 1)])
-    await db.business_data.create_index([('Business', 1)])
-    await db.business_data.create_index([('Channel', 1)])
-    await db.business_data.create_index([('Customer', 1)])
-    await db.business_data.create_index([('Brand', 1)])
-    await db.business_data.create_index([('Category', 1)])
+    # Built in one pass after the load rather than maintained row by row
+    await build_indexes(db.business_data, BUSINESS_DATA_INDEXES + ANALYTICS_INDEXES)
     print("✅ Indexes created")
     
+    # Materialize coarse-grain rollups used by the dashboard query router
+    print("\nBuilding rollups...")
+    rollup_sizes = await build_rollups(db)
+    for name, size in rollup_sizes.items():
+        print(f"  {name}: {size:,} documents")
+    
+    # Tell running servers to drop cached analytics and reload
+    version = await bump_data_version(db)
+    print(f"✅ Data version bumped to {version}")
+    
     # Print summary statistics
     print("\n📊 Data Summary:")
     pipeline = [
@@ -229,4 +290,5 @@ async def generate_dummy_data():
         print(f"  {year}: Revenue=€{revenue:,.2f}, Profit=€{profit:,.2f}, Units={units:,}")
 
 if __name__ == "__main__":
-    asyncio.run(generate_dummy_data())
+    args = parse_generator_args("Generate dummy ThriveBrands BI data")
+    asyncio.run(generate_dummy_data(scale=args.scale, seed=args.seed))
@@ -8,7 +8,16 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import random
 from datetime import datetime, timedelta
 import os
+import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
+from analytics_query import ANALYTICS_INDEXES
+from rollups import build_rollups
+from data_version import bump_data_version
+from bulk_loader import BulkLoader, build_indexes
+from synthetic_data import (
+    parse_generator_args, month_periods, choose, sparse_pairs, sample_frames, insert_frames
+)
 
 load_dotenv()
 
@@ -137,15 +146,45 @@ INDUSTRIES = [
     'Real Estate', 'Insurance', 'Pharmaceutical', 'Automotive'
 ]
 
-async def generate_business_data():
-    """Generate comprehensive generic business data"""
-    print("🚀 Starting generic business data generation...")
-    
-    # Clear existing data
-    await db.business_data.delete_many({})
-    print("✅ Cleared existing data")
-    
-    records = []
+# Single-field indexes built after every load (compound ones come from ANALYTICS_INDEXES)
+BUSINESS_DATA_INDEXES = [
+    [('Year', 1)],
+    [('Month', 1)],
+    [('Business', 1)],
+    [('Channel', 1)],
+    [('Customer', 1)],
+    [('Brand', 1)],
+    [('Category', 1)],
+    [('Region', 1)],
+    [('Industry', 1)]
+]
+
+# Vectorized (--scale) mode: rows per month at scale 1, about the loop generator's volume
+ROWS_PER_MONTH = 8800
+# 2025 data stops at September
+LAST_MONTH = (2025, 9)
+# Seasonal multiplier range by month: year-end, Q1 end and mid-year peaks
+SEASONALITY_RANGES = np.array([
+    (1.3, 1.6), (1.0, 1.0), (1.2, 1.4), (1.2, 1.4), (1.0, 1.0), (1.1, 1.3),
+    (1.1, 1.3), (1.1, 1.3), (1.0, 1.0), (1.0, 1.0), (1.3, 1.6), (1.3, 1.6)
+])
+# Unit price range by brand tier
+BRAND_PRICE_RANGES = np.array([
+    (500, 5000) if 'Premium' in brand or 'Enterprise' in brand
+    else (200, 1500) if 'Professional' in brand
+    else (50, 500)
+    for brand in BRANDS
+])
+# Margin range by business type
+BUSINESS_MARGIN_RANGES = np.array([
+    (0.60, 0.85) if business in ['Software Development', 'Cloud Services', 'Digital Marketing']
+    else (0.40, 0.60) if business in ['Professional Services', 'Data Analytics']
+    else (0.25, 0.45)
+    for business in BUSINESSES
+])
+
+async def insert_loop_records(loader: BulkLoader):
+    """Original generator: nested loops over every dimension combination (~300k rows)"""
     record_id = 1
     
     # Generate data for each combination
@@ -229,6 +268,7 @@ async def generate_business_data():
                                     record = {
                                         'Year': year,
                                         'Month': month_idx,
+                                        'Period': year * 100 + month_idx,
                                         'Month_Name': month_name,
                                         'Month_Abbr': month_abbr,
                                         'Quarter': f'Q{(month_idx-1)//3 + 1}',
@@ -248,36 +288,89 @@ async def generate_business_data():
                                         'Avg_Deal_Size': avg_deal_size,
                                         'record_id': record_id
                                     }
-                                    records.append(record)
+                                    await loader.add(record)
                                     record_id += 1
                                     
-                                    # Batch insert every 10000 records
-                                    if len(records) >= 10000:
-                                        await db.business_data.insert_many(records)
-                                        print(f"📦 Inserted {len(records)} records... Total: {record_id - 1}")
-                                        records = []
+                                    if record_id % 10000 == 1:
+                                        print(f"📦 Queued {record_id - 1} records...")
+
+def sample_month(rng, year, month_idx, rows):
+    """One month of --scale data, sampled column-wise with the same KPI patterns as the loops"""
+    business, channel = sparse_pairs(rng, len(BUSINESSES), len(CHANNELS), 0.35, rows)
+    brand = rng.integers(0, len(BRANDS), rows)
+    
+    base_units = rng.integers(50, 2001, rows)
+    year_multiplier = 1.0 + (year - 2023) * rng.uniform(0.08, 0.15, rows)
+    season_low, season_high = SEASONALITY_RANGES[month_idx - 1]
+    seasonal_multiplier = rng.uniform(season_low, season_high, rows)
+    units = (base_units * year_multiplier * seasonal_multiplier).astype(np.int64)
     
-    # Insert remaining records
-    if records:
-        await db.business_data.insert_many(records)
-        print(f"📦 Inserted final {len(records)} records")
+    price_per_unit = rng.uniform(BRAND_PRICE_RANGES[brand, 0], BRAND_PRICE_RANGES[brand, 1])
+    revenue = np.round(units * price_per_unit, 2)
+    margin_percentage = rng.uniform(BUSINESS_MARGIN_RANGES[business, 0], BUSINESS_MARGIN_RANGES[business, 1])
+    gross_profit = np.round(revenue * margin_percentage, 2)
+    
+    return pd.DataFrame({
+        'Year': year,
+        'Month': month_idx,
+        'Period': year * 100 + month_idx,
+        'Month_Name': MONTHS[month_idx - 1],
+        'Month_Abbr': MONTH_ABBR[month_idx - 1],
+        'Quarter': f'Q{(month_idx-1)//3 + 1}',
+        'Business': np.asarray(BUSINESSES, dtype=object)[business],
+        'Channel': np.asarray(CHANNELS, dtype=object)[channel],
+        'Customer': choose(rng, CUSTOMERS, rows),
+        'Brand': np.asarray(BRANDS, dtype=object)[brand],
+        'Category': choose(rng, CATEGORIES, rows),
+        'Sub_Category': choose(rng, SUB_CATEGORIES, rows),
+        'Region': choose(rng, REGIONS, rows),
+        'Industry': choose(rng, INDUSTRIES, rows),
+        'Units': units,
+        'Revenue': revenue,
+        'Gross_Profit': gross_profit,
+        'Cost_of_Goods': np.round(revenue - gross_profit, 2),
+        'Margin_Percentage': np.round(margin_percentage * 100, 2),
+        'Avg_Deal_Size': np.round(np.divide(revenue, units, out=np.zeros(rows), where=units > 0), 2)
+    })
+
+async def generate_business_data(scale: float = None, seed: int = None):
+    """Generate comprehensive generic business data"""
+    print("🚀 Starting generic business data generation...")
+    
+    # Clear existing data (dropped rather than emptied so the load runs without index maintenance)
+    await db.business_data.drop()
+    print("✅ Cleared existing data")
+    
+    async with BulkLoader(db.business_data) as loader:
+        if scale is None:
+            random.seed(seed)
+            await insert_loop_records(loader)
+        else:
+            # Vectorized mode for load testing at production-like volume
+            frames = sample_frames(sample_month, month_periods(YEARS, LAST_MONTH), ROWS_PER_MONTH, scale, seed)
+            await insert_frames(loader, frames)
+    print(f"📦 Loaded {loader.stats.rows:,} records in {loader.stats.seconds:.1f}s "
+          f"({loader.stats.rows_per_second:,.0f} rows/sec)")
     
     total_count = await db.business_data.count_documents({})
     print(f"\n✅ Successfully generated {total_count:,} generic business records!")
     
     # Create indexes for performance
     print("\n🔧 Creating indexes...")
-    await db.business_data.create_index([('Year', 1)])
-    await db.business_data.create_index([('Month', 1)])
-    await db.business_data.create_index([('Business', 1)])
-    await db.business_data.create_index([('Channel', 1)])
-    await db.business_data.create_index([('Customer', 1)])
-    await db.business_data.create_index([('Brand', 1)])
-    await db.business_data.create_index([('Category', 1)])
-    await db.business_data.create_index([('Region', 1)])
-    await db.business_data.create_index([('Industry', 1)])
+    # Built in one pass after the load rather than maintained row by row
+    await build_indexes(db.business_data, BUSINESS_DATA_INDEXES + ANALYTICS_INDEXES)
     print("✅ Indexes created")
     
+    # Materialize coarse-grain rollups used by the dashboard query router
+    print("\n🧮 Building rollups...")
+    rollup_sizes = await build_rollups(db)
+    for name, size in rollup_sizes.items():
+        print(f"  {name}: {size:,} documents")
+    
+    # Tell running servers to drop cached analytics and reload
+    version = await bump_data_version(db)
+    print(f"✅ Data version bumped to {version}")
+    
     # Print summary statistics
     print("\n📊 Data Summary by Year:")
     pipeline = [
@@ -332,4 +425,5 @@ async def generate_business_data():
         print(f"  {doc['_id']}: ${doc['total_revenue']:,.0f}")
 
 if __name__ == "__main__":
-    asyncio.run(generate_business_data())
+    args = parse_generator_args("Generate generic BeaconIQ business data")
+    asyncio.run(generate_business_data(scale=args.scale, seed=args.seed))
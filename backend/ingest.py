@@ -0,0 +1,263 @@
+"""
+Business Data Ingest for BeaconIQ
+Streams the business data CSV from Azure Blob Storage (or a local file) in
+chunks, parses each chunk into typed columns mapped onto BusinessDataRecord
+fields and writes them into business_data through the pipelined bulk loader,
+without ever holding the whole file in memory. Only (Year, Month) partitions
+at or after the source's watermark are replaced.
+"""
+
+import asyncio
+import codecs
+import csv
+import io
+import logging
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+from analytics_query import month_number, period_key, to_number
+from bulk_loader import BulkLoader
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 4 * 1024 * 1024
+WRITE_BATCH_SIZE = 5000
+
+# Per-source watermark: ETag / last-modified and the latest (Year, Month) loaded
+SYNC_STATE_COLLECTION = 'sync_state'
+
+# Source headers that differ from the BusinessDataRecord field names
+COLUMN_ALIASES = {
+    'gSales': 'Revenue',
+    'Sales': 'Revenue',
+    'fGP': 'Gross_Profit',
+    'Cases': 'Units',
+    'Sub_Category': 'Sub_Cat'
+}
+
+
+class AzureBlobSource:
+    """CSV blob read through the async Azure SDK (works against Azurite too)"""
+
+    def __init__(self, connection_string: str, container: str, blob_path: str):
+        self.connection_string = connection_string
+        self.container = container
+        self.blob_path = blob_path
+        self.name = f"azure://{container}/{blob_path}"
+
+    async def properties(self) -> Dict[str, str]:
+        from azure.storage.blob.aio import BlobServiceClient
+
+        async with BlobServiceClient.from_connection_string(self.connection_string) as service:
+            props = await service.get_blob_client(self.container, self.blob_path).get_blob_properties()
+            return {'etag': props.etag, 'last_modified': props.last_modified.isoformat()}
+
+    async def chunks(self, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        from azure.storage.blob.aio import BlobServiceClient
+
+        async with BlobServiceClient.from_connection_string(
+            self.connection_string, max_chunk_get_size=chunk_size
+        ) as service:
+            blob = service.get_blob_client(self.container, self.blob_path)
+            downloader = await blob.download_blob()
+            async for chunk in downloader.chunks():
+                yield chunk
+
+
+class LocalFileSource:
+    """CSV file on local disk, for development and tests"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.name = f"file://{self.path}"
+
+    async def properties(self) -> Dict[str, str]:
+        stat = await asyncio.to_thread(self.path.stat)
+        return {
+            'etag': f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+            'last_modified': datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat()
+        }
+
+    async def chunks(self, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        with open(self.path, 'rb') as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+
+class CsvChunkParser:
+    """Incremental CSV parser producing typed documents for a pydantic record model
+
+    Bytes are fed as they arrive; only complete records are parsed, so a
+    chunk boundary inside a row (or inside a quoted field) is carried over.
+    """
+
+    def __init__(self, model):
+        self.fields = {name: info.annotation for name, info in model.model_fields.items()}
+        self.required = [name for name, info in model.model_fields.items() if info.is_required()]
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.buffer = ''
+        self.header: Optional[List[str]] = None
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        self.buffer += self.decoder.decode(data)
+        end = self.buffer.rfind('\n')
+        # An odd number of quotes means the newline sits inside a quoted field
+        while end >= 0 and self.buffer.count('"', 0, end) % 2:
+            end = self.buffer.rfind('\n', 0, end)
+        if end < 0:
+            return []
+        block, self.buffer = self.buffer[:end + 1], self.buffer[end + 1:]
+        return self._parse(block)
+
+    def close(self) -> List[Dict[str, Any]]:
+        block, self.buffer = self.buffer + self.decoder.decode(b'', final=True), ''
+        return self._parse(block) if block.strip() else []
+
+    def _parse(self, block: str) -> List[Dict[str, Any]]:
+        if self.header is None:
+            first_line, _, block = block.partition('\n')
+            self.header = [self._field_name(column) for column in next(csv.reader([first_line]))]
+        if not block.strip():
+            return []
+
+        df = pd.read_csv(io.StringIO(block), header=None, names=self.header, dtype=str,
+                         keep_default_na=False, na_values=[''])
+        columns = {}
+        for name in df.columns:
+            annotation = self.fields.get(name)
+            if annotation is None:
+                continue
+            if annotation is int:
+                columns[name] = pd.to_numeric(df[name], errors='coerce').astype('Int64').tolist()
+            elif 'float' in str(annotation):
+                columns[name] = pd.to_numeric(df[name].str.replace(',', ''), errors='coerce').fillna(0).tolist()
+            else:
+                columns[name] = df[name].str.strip().tolist()
+
+        documents = []
+        for values in zip(*columns.values()):
+            doc = {name: (None if value is pd.NA or value != value else value)
+                   for name, value in zip(columns, values)}
+            if any(doc.get(name) is None for name in self.required):
+                continue
+            doc['Month'] = month_number(doc.get('Month_Name'))
+            doc['Period'] = period_key(doc.get('Year'), doc['Month'])
+            # The analytics endpoints group sub-categories as Sub_Category
+            doc.setdefault('Sub_Category', doc.get('Sub_Cat'))
+            documents.append(doc)
+        return documents
+
+    def _field_name(self, column: str) -> str:
+        column = column.strip()
+        if column in COLUMN_ALIASES:
+            return COLUMN_ALIASES[column]
+        normalized = column.replace(' ', '_')
+        for name in self.fields:
+            if name.lower() == normalized.lower():
+                return name
+        return normalized
+
+
+class IngestStats(NamedTuple):
+    source: str
+    rows: int
+    seconds: float
+    partitions: List[int] = []
+    unchanged: bool = False
+    # sync_state document to save with save_watermark once the load is published
+    watermark: Optional[Dict[str, Any]] = None
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class PartitionWriter:
+    """Replaces whole (Year, Month) partitions: the first time a period is seen
+    its existing rows are deleted, then the new rows go to the bulk loader"""
+
+    def __init__(self, loader: BulkLoader, watermark: Optional[int]):
+        self.loader = loader
+        self.watermark = watermark
+        self.replaced = set()
+        self.skipped = 0
+
+    async def add(self, documents: List[Dict[str, Any]]):
+        kept = []
+        for doc in documents:
+            period = period_key(doc.get('Year'), doc.get('Month'))
+            # Periods before the watermark are already loaded and never change
+            if period is None or (self.watermark is not None and period < self.watermark):
+                self.skipped += 1
+                continue
+            if period not in self.replaced:
+                # Earlier batches only hold other periods, so this never races an insert
+                await self.loader.collection.delete_many({'Year': doc['Year'], 'Month': doc['Month']})
+                self.replaced.add(period)
+            kept.append(doc)
+        await self.loader.add_many(kept)
+
+
+async def backfill_periods(collection) -> int:
+    """Set the YYYYMM Period key on rows loaded before it was stored"""
+    result = await collection.update_many(
+        {'Period': {'$exists': False}, 'Year': {'$ne': None}, 'Month': {'$ne': None}},
+        [{'$set': {'Period': {'$add': [{'$multiply': [to_number('Year', 'int'), 100]}, to_number('Month', 'int')]}}}]
+    )
+    return result.modified_count
+
+
+async def ingest_csv(source, db, model, collection: str = 'business_data',
+                     batch_size: int = WRITE_BATCH_SIZE) -> IngestStats:
+    """Load the (Year, Month) partitions of `source` at or after its watermark
+
+    The watermark in sync_state records the source's ETag / last-modified and
+    the latest period loaded. An unchanged source is skipped entirely; otherwise
+    the latest loaded period (which may have been partial) and every newer one
+    are replaced. The new watermark is returned rather than saved, so a caller
+    whose follow-up work fails leaves the source to be loaded again.
+    """
+    properties = await source.properties()
+    state = await db[SYNC_STATE_COLLECTION].find_one({'_id': source.name}) or {}
+    if state.get('etag') == properties['etag']:
+        logger.info(f"Source {source.name} unchanged (etag {properties['etag']}), skipping ingest")
+        return IngestStats(source.name, 0, 0.0, [], unchanged=True)
+
+    await db[collection].create_index([('Year', 1), ('Month', 1)])
+    parser = CsvChunkParser(model)
+    started = time.perf_counter()
+
+    async with BulkLoader(db[collection], batch_size=batch_size) as loader:
+        writer = PartitionWriter(loader, state.get('period'))
+        async for chunk in source.chunks():
+            await writer.add(await asyncio.to_thread(parser.feed, chunk))
+        await writer.add(parser.close())
+
+    partitions = sorted(writer.replaced)
+    watermark = {
+        '_id': source.name,
+        'etag': properties['etag'],
+        'last_modified': properties['last_modified'],
+        'period': max(partitions + [state.get('period') or 0]) or None,
+        'updated_at': datetime.now(timezone.utc).isoformat()
+    }
+
+    stats = IngestStats(source.name, loader.stats.rows, time.perf_counter() - started, partitions,
+                        watermark=watermark)
+    logger.info(f"Ingested {stats.rows} rows into {len(partitions)} partitions from {stats.source} "
+                f"in {stats.seconds:.1f}s ({stats.rows_per_second:,.0f} rows/sec, "
+                f"{writer.skipped} rows before the watermark skipped)")
+    return stats
+
+
+async def save_watermark(db, stats: IngestStats):
+    """Record a load as done, so the next sync of an unchanged source skips it"""
+    if stats.watermark is not None:
+        await db[SYNC_STATE_COLLECTION].replace_one({'_id': stats.source}, stats.watermark, upsert=True)
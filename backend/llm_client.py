@@ -0,0 +1,180 @@
+"""
+LLM Chat Client for BeaconIQ
+One interface over the chat providers used by VectorDeep AI, so /api/ai/chat
+and its server-sent-events variant can share prompt building and swap the
+provider with LLM_PROVIDER: "emergent" (default), "openai" for native token
+streaming, or "fake" for deterministic local runs. ScriptedChat replays fixed
+replies for tests of multi-step exchanges.
+"""
+
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List
+
+SYSTEM_PROMPT = """
+You are VectorDeep AI, a business intelligence assistant for ThriveBrands. You have access to business data summarized below:
+
+{context}
+
+You can answer questions about:
+- Sales performance and trends
+- Brand analysis
+- Customer and channel performance
+- Category insights
+- Year-over-year comparisons
+
+Provide insights with specific numbers when possible. Highlight good performance in your response and provide actionable recommendations.
+"""
+
+DEFAULT_MODEL = ('openai', 'gpt-4o')
+
+
+def build_system_message(context_text: str, tools_text: str = '') -> str:
+    message = SYSTEM_PROMPT.format(context=context_text)
+    return f"{message}\n{tools_text}" if tools_text else message
+
+
+class ChatSession(ABC):
+    """One conversation with a provider; later messages see the earlier ones"""
+
+    @abstractmethod
+    async def stream(self, text: str) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    async def send(self, text: str) -> str:
+        return ''.join([token async for token in self.stream(text)])
+
+
+class ChatModel(ABC):
+    """A chat provider handing out sessions"""
+
+    @abstractmethod
+    def session(self, session_id: str, system_message: str) -> ChatSession:
+        raise NotImplementedError
+
+
+class EmergentSession(ChatSession):
+    """emergentintegrations LlmChat; it only returns whole completions, so the
+    stream is a single chunk"""
+
+    def __init__(self, chat):
+        self.chat = chat
+
+    async def send(self, text: str) -> str:
+        from emergentintegrations.llm.chat import UserMessage
+
+        return await self.chat.send_message(UserMessage(text=text))
+
+    async def stream(self, text: str) -> AsyncIterator[str]:
+        yield await self.send(text)
+
+
+class EmergentChat(ChatModel):
+    def __init__(self, api_key: str, provider: str = DEFAULT_MODEL[0], model: str = DEFAULT_MODEL[1]):
+        self.api_key = api_key
+        self.provider = provider
+        self.model = model
+
+    def session(self, session_id: str, system_message: str) -> ChatSession:
+        from emergentintegrations.llm.chat import LlmChat
+
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model(self.provider, self.model)
+        return EmergentSession(chat)
+
+
+class OpenAISession(ChatSession):
+    """OpenAI chat completions with stream=True, forwarding each content delta"""
+
+    def __init__(self, client, model: str, system_message: str):
+        self.client = client
+        self.model = model
+        self.messages = [{'role': 'system', 'content': system_message}]
+
+    async def stream(self, text: str) -> AsyncIterator[str]:
+        self.messages.append({'role': 'user', 'content': text})
+        response = await self.client.chat.completions.create(model=self.model, messages=self.messages, stream=True)
+        parts = []
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        self.messages.append({'role': 'assistant', 'content': ''.join(parts)})
+
+
+class OpenAIChat(ChatModel):
+    def __init__(self, api_key: str, model: str = DEFAULT_MODEL[1]):
+        from openai import AsyncOpenAI
+
+        self.client = AsyncOpenAI(api_key=api_key)
+        self.model = model
+
+    def session(self, session_id: str, system_message: str) -> ChatSession:
+        return OpenAISession(self.client, self.model, system_message)
+
+
+async def _words(answer: str, delay: float) -> AsyncIterator[str]:
+    words = answer.split(' ')
+    for i, word in enumerate(words):
+        await asyncio.sleep(delay)
+        yield word if i == len(words) - 1 else word + ' '
+
+
+class FakeSession(ChatSession):
+    def __init__(self, system_message: str, delay: float):
+        self.system_message = system_message
+        self.delay = delay
+
+    async def stream(self, text: str) -> AsyncIterator[str]:
+        answer = f"VectorDeep AI (offline) received: {text}. Context has {len(self.system_message.splitlines())} lines."
+        async for word in _words(answer, self.delay):
+            yield word
+
+
+class FakeChat(ChatModel):
+    """Deterministic word-by-word answer echoing the question, no network"""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+
+    def session(self, session_id: str, system_message: str) -> ChatSession:
+        return FakeSession(system_message, self.delay)
+
+
+class ScriptedSession(ChatSession):
+    def __init__(self, model: 'ScriptedChat'):
+        self.model = model
+
+    async def stream(self, text: str) -> AsyncIterator[str]:
+        self.model.received.append(text)
+        reply = self.model.replies.pop(0) if self.model.replies else ''
+        async for word in _words(reply, self.model.delay):
+            yield word
+
+
+class ScriptedChat(ChatModel):
+    """Replies with the given messages in order, recording what it was sent;
+    used to drive multi-step exchanges such as tool calls in tests"""
+
+    def __init__(self, replies: List[str], delay: float = 0.0):
+        self.replies = list(replies)
+        self.delay = delay
+        self.received: List[str] = []
+
+    def session(self, session_id: str, system_message: str) -> ChatSession:
+        return ScriptedSession(self)
+
+
+def create_chat_model(provider: str = None) -> ChatModel:
+    provider = (provider or os.getenv('LLM_PROVIDER', 'emergent')).lower()
+    if provider == 'fake':
+        return FakeChat(delay=float(os.getenv('LLM_FAKE_DELAY_SECONDS', 0.02)))
+    if provider == 'openai':
+        return OpenAIChat(api_key=os.getenv('OPENAI_API_KEY'), model=os.getenv('LLM_MODEL', DEFAULT_MODEL[1]))
+    if provider == 'emergent':
+        return EmergentChat(api_key=os.getenv('EMERGENT_LLM_KEY'), model=os.getenv('LLM_MODEL', DEFAULT_MODEL[1]))
+    raise ValueError(f"Unknown LLM_PROVIDER: {provider}")
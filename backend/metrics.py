@@ -0,0 +1,174 @@
+"""
+Request Metrics for BeaconIQ
+Request and per-stage latency histograms plus row and byte counters, rendered
+in the Prometheus text exposition format for /api/metrics. Stage timers pick
+up the current route from a context variable set by MetricsMiddleware.
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+current_route: ContextVar[str] = ContextVar('current_route', default='none')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {value:g}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str],
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                    bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                    lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+                label_text = _format_labels(self.labelnames, labels)
+                lines.append(f'{self.name}_sum{label_text} {total[0]:.6f}')
+                lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(line for metric in self.metrics for line in metric.render()) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+REQUEST_SECONDS = REGISTRY.histogram(
+    'beaconiq_request_duration_seconds', 'HTTP request latency', ['route', 'method', 'status'])
+STAGE_SECONDS = REGISTRY.histogram(
+    'beaconiq_stage_duration_seconds', 'Time spent in each phase of a request', ['route', 'stage'])
+ROWS_SCANNED = REGISTRY.counter(
+    'beaconiq_rows_scanned_total', 'Rows read to answer requests', ['route'])
+RESPONSE_BYTES = REGISTRY.counter(
+    'beaconiq_response_bytes_total', 'Response body bytes returned', ['route'])
+CACHE_REQUESTS = REGISTRY.counter(
+    'beaconiq_result_cache_requests_total', 'Result cache lookups', ['route', 'result'])
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as one stage of the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, current_route.get(), name)
+
+
+def observe_stage(name: str, seconds: float):
+    """Record a stage measured elsewhere, e.g. summed over many batches"""
+    STAGE_SECONDS.observe(seconds, current_route.get(), name)
+
+
+def count_rows(rows: int):
+    ROWS_SCANNED.inc(current_route.get(), amount=rows)
+
+
+def count_cache(hit: bool):
+    CACHE_REQUESTS.inc(current_route.get(), 'hit' if hit else 'miss')
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request and counting response bytes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        token = current_route.set(scope['path'])
+        status = {'code': 500}
+        sent = {'bytes': 0}
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            elif message['type'] == 'http.response.body':
+                sent['bytes'] += len(message.get('body', b''))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Unmatched paths share one label so scanners cannot blow up the series count
+            route = scope['path'] if 'endpoint' in scope else 'unmatched'
+            REQUEST_SECONDS.observe(time.perf_counter() - started, route, scope['method'], str(status['code']))
+            RESPONSE_BYTES.inc(route, amount=sent['bytes'])
+            current_route.reset(token)
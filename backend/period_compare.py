@@ -0,0 +1,152 @@
+"""
+Period Comparison Engine for BeaconIQ
+YoY %, MoM %, YTD vs prior YTD and rolling 3/12-month totals of one measure
+for every member of a dimension, computed in one vectorized pass over a dense
+(member x month) grid indexed by an integer period key
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from analytics_query import month_number, to_number
+
+COMPARISONS = ['yoy', 'mom', 'ytd', 'rolling3', 'rolling12']
+COMPARE_PATTERN = f"^({'|'.join(COMPARISONS)})(,({'|'.join(COMPARISONS)}))*$"
+# Period filters only select which rows are returned; the comparison itself
+# needs the earlier months they would exclude
+PERIOD_FILTERS = ('Year', 'Month_Name', 'Period')
+# Dimensions a comparison can be broken down by
+COMPARE_DIMENSIONS = ['Business', 'Channel', 'Customer', 'Brand', 'Category', 'Sub_Category']
+
+
+class Comparison(NamedTuple):
+    metrics: tuple
+    by: Optional[str]
+    measure: str
+
+    @property
+    def dims(self) -> List[str]:
+        return [self.by] if self.by else []
+
+
+def parse_comparison(compare: Optional[str], by: Optional[str], measure: str) -> Optional[Comparison]:
+    """None when no comparison was asked for"""
+    if not compare:
+        return None
+    metrics = tuple(metric for metric in COMPARISONS if metric in compare.split(','))
+    return Comparison(metrics, by, measure)
+
+
+def scan_filters(filters: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+    """Filters to read the comparison input with"""
+    return {field: values for field, values in filters.items() if field not in PERIOD_FILTERS}
+
+
+def _selected(rows: List[Dict[str, Any]], filters: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    years = set(filters.get('Year') or [])
+    months = {month_number(name) for name in filters.get('Month_Name') or []}
+    periods = filters.get('Period')
+    return [row for row in rows
+            if (not years or row['Year'] in years) and (not months or row['Month'] in months)
+            and (periods is None or periods.contains(row['Period']))]
+
+
+def _pct(current: np.ndarray, previous: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Percentage change, NaN where there is no usable base"""
+    valid = valid & (previous != 0)
+    out = np.full(current.shape, np.nan)
+    np.divide(current - previous, np.abs(previous), out=out, where=valid)
+    return out * 100
+
+
+def _shift(grid: np.ndarray, months: int) -> np.ndarray:
+    shifted = np.zeros_like(grid)
+    shifted[:, months:] = grid[:, :grid.shape[1] - months]
+    return shifted
+
+
+def _number(value: float, digits: int) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def compare_periods(rows: List[Dict[str, Any]], comparison: Comparison,
+                    filters: Optional[Dict[str, List[Any]]] = None) -> Dict[str, Any]:
+    """Comparison series from measure sums grouped by (dims, Year, Month_Name)
+
+    Months without rows count as zero inside rolling windows and YTD sums.
+    Comparisons that reach back before the first month of data are null.
+    Only months matching the Year/Month_Name filters are returned.
+    """
+    result = {"measure": comparison.measure, "by": comparison.by, "metrics": list(comparison.metrics), "rows": []}
+    months = np.array([month_number(row['Month_Name']) or 0 for row in rows], dtype=np.int64)
+    keep = np.flatnonzero(months > 0)
+    if len(keep) == 0:
+        return result
+
+    members: Dict[tuple, int] = {}
+    member_idx = np.array([members.setdefault(tuple(rows[i][dim] for dim in comparison.dims), len(members))
+                           for i in keep], dtype=np.int64)
+    years = np.array([int(rows[i]['Year']) for i in keep], dtype=np.int64)
+    values = np.array([float(rows[i][comparison.measure]) for i in keep])
+
+    # Whole years, so YTD is a cumulative sum along the last axis of a (years x 12) view
+    first_year = int(years.min())
+    n_years = int(years.max()) - first_year + 1
+    columns = (years - first_year) * 12 + months[keep] - 1
+    grid = np.zeros((len(members), n_years * 12))
+    present = np.zeros(grid.shape, dtype=bool)
+    np.add.at(grid, (member_idx, columns), values)
+    present[member_idx, columns] = True
+
+    column = np.arange(grid.shape[1])
+    start = int(columns.min())
+    series = {}
+    if 'mom' in comparison.metrics:
+        series['mom_pct'] = _pct(grid, _shift(grid, 1), column - 1 >= start)
+    if 'yoy' in comparison.metrics:
+        series['yoy_pct'] = _pct(grid, _shift(grid, 12), column - 12 >= start)
+    if 'ytd' in comparison.metrics:
+        ytd = grid.reshape(len(members), n_years, 12).cumsum(axis=2).reshape(grid.shape)
+        prior = _shift(ytd, 12)
+        # Prior YTD needs the whole of the prior year up to that month
+        prior_valid = column - column % 12 - 12 >= start
+        series['ytd'] = ytd
+        series['prior_ytd'] = np.where(prior_valid, prior, np.nan)
+        series['ytd_pct'] = _pct(ytd, prior, prior_valid)
+    cumulative = np.cumsum(grid, axis=1)
+    for window in (3, 12):
+        if f'rolling{window}' in comparison.metrics:
+            rolling = cumulative - _shift(cumulative, window)
+            series[f'rolling_{window}'] = np.where(column - window + 1 >= start, rolling, np.nan)
+
+    labels = list(members)
+    for m, c in zip(*np.nonzero(present)):
+        year, month = first_year + c // 12, c % 12 + 1
+        row = {**dict(zip(comparison.dims, labels[m])), 'Period': int(year * 100 + month),
+               'Year': int(year), 'Month': int(month), comparison.measure: round(float(grid[m, c]), 2)}
+        for name, values in series.items():
+            row[name] = _number(values[m, c], 2)
+        result["rows"].append(row)
+    if filters:
+        result["rows"] = _selected(result["rows"], filters)
+    return result
+
+
+def cube_comparison(cube, filters: Dict[str, List[Any]], comparison: Comparison) -> Dict[str, Any]:
+    mask = cube.mask(scan_filters(filters))
+    rows = cube.group_sum(comparison.dims + ['Year', 'Month_Name'], mask, [comparison.measure])
+    return compare_periods(rows, comparison, filters)
+
+
+def comparison_pipeline(match: Dict[str, Any], comparison: Comparison) -> List[Dict[str, Any]]:
+    fields = comparison.dims + ['Year', 'Month_Name']
+    return [
+        {'$match': {**match, **{field: match.get(field, {'$ne': None}) for field in fields}}},
+        {'$group': {'_id': {field: f'${field}' for field in fields},
+                    comparison.measure: {'$sum': to_number(comparison.measure)}}}
+    ]
+
+
+def comparison_docs(docs: List[Dict[str, Any]], comparison: Comparison) -> List[Dict[str, Any]]:
+    return [{**doc['_id'], comparison.measure: doc[comparison.measure]} for doc in docs]
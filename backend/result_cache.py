@@ -0,0 +1,111 @@
+"""
+Analytics Result Cache for BeaconIQ
+Bounded LRU cache of serialized analytics responses, keyed on the endpoint
+plus the normalized filter set and tagged with the data version
+"""
+
+import json
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from analytics_query import PeriodRange
+
+
+def normalize_filters(filters: Dict[str, List[Any]]) -> Tuple:
+    """Sorted, deduplicated representation so equivalent filter sets share a key"""
+    return tuple(sorted(
+        (field, values if isinstance(values, PeriodRange) else tuple(sorted(set(values))))
+        for field, values in filters.items() if values
+    ))
+
+
+def serialize(result: Any) -> bytes:
+    """Same JSON encoding as FastAPI's JSONResponse"""
+    return json.dumps(result, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def cache_entry_unaffected(key, partitions: List[int]) -> bool:
+    """True when a cached response is filtered to years or a period range none of which changed"""
+    endpoint, filters, params = key
+    if params:
+        return False
+    filters = dict(filters)
+    selected = filters.get('Year')
+    if selected and not {period // 100 for period in partitions}.intersection(selected):
+        return True
+    period = filters.get('Period')
+    return period is not None and not any(period.contains(changed) for changed in partitions)
+
+
+class ResultCache:
+    """LRU cache bounded by the total size of the stored response bodies"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[int, bytes]]' = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def make_key(endpoint: str, filters: Dict[str, List[Any]], **params: Any) -> Tuple:
+        return (endpoint, normalize_filters(filters), tuple(sorted(params.items())))
+
+    def get(self, key: Hashable, version: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, version: int, result: Any) -> bytes:
+        """Serialize and store a result, returning the body that was stored"""
+        body = serialize(result)
+        if len(body) > self.max_bytes:
+            return body
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, body)
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+        return body
+
+    def carry_over(self, old_version: int, new_version: int, keep: Callable[[Hashable], bool]):
+        """Retag entries still valid under the new version and drop the rest"""
+        with self._lock:
+            for key, (version, body) in list(self._entries.items()):
+                if version == old_version and keep(key):
+                    self._entries[key] = (new_version, body)
+                else:
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _drop(self, key: Hashable):
+        _, body = self._entries.pop(key)
+        self.bytes -= len(body)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes
+        }
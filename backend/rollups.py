@@ -0,0 +1,121 @@
+"""
+Materialized Rollups for BeaconIQ
+Pre-aggregated copies of business_data at coarse grains, plus a router that
+sends each query to the smallest rollup able to answer it
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple
+
+from analytics_query import MEASURES, to_number
+
+logger = logging.getLogger(__name__)
+
+BASE_COLLECTION = 'business_data'
+CATALOG_COLLECTION = 'rollup_catalog'
+
+
+class Rollup(NamedTuple):
+    name: str
+    dims: List[str]
+
+
+ROLLUPS = [
+    Rollup('rollup_year_month_business_channel', ['Year', 'Month', 'Month_Name', 'Period', 'Business', 'Channel']),
+    Rollup('rollup_year_month_business_channel_customer',
+           ['Year', 'Month', 'Month_Name', 'Period', 'Business', 'Channel', 'Customer']),
+    Rollup('rollup_year_business_channel_brand', ['Year', 'Business', 'Channel', 'Brand']),
+    Rollup('rollup_year_business_channel_category',
+           ['Year', 'Business', 'Channel', 'Category', 'Sub_Category', 'Board_Category']),
+]
+
+
+def rollup_pipeline(rollup: Rollup, match: Dict[str, Any] = None, merge: bool = False) -> List[Dict[str, Any]]:
+    """Group the base collection to the rollup grain and write it out
+
+    With `merge` the grouped rows are added to the existing rollup instead of
+    replacing it, for refreshing a few partitions at a time.
+    """
+    sums = {measure: {'$sum': to_number(measure)} for measure in MEASURES}
+    return [
+        {'$match': match or {}},
+        {'$group': {'_id': {dim: f'${dim}' for dim in rollup.dims}, **sums, 'row_count': {'$sum': 1}}},
+        {'$project': {'_id': 0, **{dim: f'$_id.{dim}' for dim in rollup.dims},
+                      **{measure: 1 for measure in MEASURES}, 'row_count': 1}},
+        {'$merge': {'into': rollup.name}} if merge else {'$out': rollup.name}
+    ]
+
+
+async def build_rollups(db, rollups: Iterable[Rollup] = ROLLUPS) -> Dict[str, int]:
+    """Rebuild every rollup from the base collection and record its size in the catalog"""
+    sizes = {}
+    for rollup in rollups:
+        await db[BASE_COLLECTION].aggregate(rollup_pipeline(rollup), allowDiskUse=True).to_list(None)
+        await db[rollup.name].create_index([('Year', 1)])
+        if 'Period' in rollup.dims:
+            await db[rollup.name].create_index([('Period', 1)])
+        sizes[rollup.name] = await db[rollup.name].count_documents({})
+        await db[CATALOG_COLLECTION].replace_one(
+            {'_id': rollup.name},
+            {'_id': rollup.name, 'dims': rollup.dims, 'doc_count': sizes[rollup.name],
+             'built_at': datetime.now(timezone.utc).isoformat()},
+            upsert=True
+        )
+        logger.info(f"Rollup {rollup.name} built - {sizes[rollup.name]} documents")
+    return sizes
+
+
+def _partition_scope(rollup: Rollup, partitions: List[int]) -> Dict[str, Any]:
+    """Rows of a rollup covered by the given YYYYMM partitions"""
+    if 'Month' in rollup.dims:
+        return {'$or': [{'Year': period // 100, 'Month': period % 100} for period in partitions]}
+    # Rollups without a month grain are refreshed a whole year at a time
+    return {'Year': {'$in': sorted({period // 100 for period in partitions})}}
+
+
+async def refresh_rollup_partitions(db, partitions: List[int], rollups: Iterable[Rollup] = ROLLUPS) -> Dict[str, int]:
+    """Recompute only the rollup rows belonging to changed (Year, Month) partitions
+
+    Falls back to a full rebuild when a rollup has not been built yet.
+    """
+    rollups = list(rollups)
+    built = {doc['_id'] for doc in await db[CATALOG_COLLECTION].find({}, {'_id': 1}).to_list(None)}
+    if not partitions or any(rollup.name not in built for rollup in rollups):
+        return await build_rollups(db, rollups)
+
+    sizes = {}
+    for rollup in rollups:
+        scope = _partition_scope(rollup, partitions)
+        await db[rollup.name].delete_many(scope)
+        await db[BASE_COLLECTION].aggregate(rollup_pipeline(rollup, scope, merge=True), allowDiskUse=True).to_list(None)
+        sizes[rollup.name] = await db[rollup.name].count_documents({})
+        await db[CATALOG_COLLECTION].update_one(
+            {'_id': rollup.name},
+            {'$set': {'doc_count': sizes[rollup.name], 'built_at': datetime.now(timezone.utc).isoformat()}}
+        )
+        logger.info(f"Rollup {rollup.name} refreshed for {len(partitions)} partitions - {sizes[rollup.name]} documents")
+    return sizes
+
+
+class RollupRouter:
+    """Picks the smallest built rollup whose grain covers the requested fields"""
+
+    def __init__(self, rollups: Iterable[Rollup] = ROLLUPS):
+        self.rollups = list(rollups)
+        self.sizes: Dict[str, int] = {}
+        self.built_dims: Dict[str, List[str]] = {}
+
+    async def refresh(self, db):
+        catalog = await db[CATALOG_COLLECTION].find({}).to_list(None)
+        self.sizes = {doc['_id']: doc['doc_count'] for doc in catalog}
+        self.built_dims = {doc['_id']: doc.get('dims', []) for doc in catalog}
+
+    def route(self, fields: Iterable[str]) -> str:
+        needed = set(fields)
+        # A rollup built before a dimension was added must not answer queries on it
+        candidates = [r for r in self.rollups if r.name in self.sizes
+                      and needed <= set(r.dims) & set(self.built_dims.get(r.name, []))]
+        if not candidates:
+            return BASE_COLLECTION
+        return min(candidates, key=lambda r: self.sizes[r.name]).name
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Response, Query
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -9,15 +10,42 @@ from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional, Dict, Any
 import uuid
+import asyncio
+import hmac
+import time
 from datetime import datetime, timezone
-import pandas as pd
-from io import StringIO
-from azure.storage.blob import BlobServiceClient
 from apscheduler.schedulers.background import BackgroundScheduler
 from contextlib import asynccontextmanager
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-import bcrypt
 import jwt
+import json
+from analytics_query import (
+    build_match, parse_filters, run_executive_overview, run_customer_analysis,
+    Page, parse_page, page_params, page_info, period_range, PERIOD_PATTERN,
+    MEASURES, ANALYTICS_INDEXES, EXECUTIVE_OVERVIEW_FIELDS, CUSTOMER_ANALYSIS_FIELDS,
+    BRAND_ANALYSIS_FIELDS, CATEGORY_ANALYSIS_FIELDS
+)
+import analytics_cube
+from analytics_cube import CubeStore
+from rollups import RollupRouter, refresh_rollup_partitions
+from data_version import DataVersionTracker, get_data_version, bump_data_version, get_partition_versions
+from result_cache import ResultCache, cache_entry_unaffected
+from dimension_catalog import DimensionCatalog, CATALOG_FIELDS, FIELD_FALLBACKS
+from business_context import BusinessContext
+from streaming_aggregate import stream_group_sums
+from period_compare import (
+    Comparison, parse_comparison, cube_comparison, comparison_pipeline, comparison_docs, compare_periods, scan_filters,
+    COMPARE_PATTERN, COMPARE_DIMENSIONS
+)
+from ingest import AzureBlobSource, LocalFileSource, ingest_csv, save_watermark, backfill_periods
+import metrics
+from metrics import MetricsMiddleware, stage, count_rows, count_cache
+from compute_executor import ComputeExecutor, ComputeBusy
+from auth import PasswordHasher, TokenCache, LoginBusy
+from single_flight import SingleFlight
+from llm_client import create_chat_model, build_system_message
+from ai_tools import AggregateSpec, aggregate_cube, aggregate_docs, render_table, tool_instructions, stream_with_tools
+from answer_cache import AnswerCache
+from conversation_store import ConversationStore
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -32,14 +60,87 @@ AZURE_CONNECTION_STRING = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
 AZURE_CONTAINER_NAME = os.getenv('AZURE_CONTAINER_NAME')
 AZURE_BLOB_PATH = os.getenv('AZURE_BLOB_PATH')
 
+# Local CSV used by /api/data/sync when Azure is not configured (development and tests)
+INGEST_LOCAL_PATH = os.getenv('INGEST_LOCAL_PATH')
+
 # JWT Secret
 JWT_SECRET = "thrive-brands-biz-pulse-secret-2024"
 JWT_ALGORITHM = "HS256"
 
 security = HTTPBearer()
 
-# Scheduler for periodic sync
+# Bearer token for Prometheus scrapers, which cannot log in; signed-in users may scrape too
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# bcrypt runs on its own small pool with a cap on concurrent logins, and
+# verified tokens are cached so dashboard calls skip JWT verification
+password_hasher = PasswordHasher(
+    workers=int(os.getenv('BCRYPT_WORKERS', 2)),
+    max_concurrent=int(os.getenv('LOGIN_CONCURRENCY', 16))
+)
+token_cache = TokenCache(ttl=float(os.getenv('TOKEN_CACHE_TTL_SECONDS', 300)))
+
+# Scheduler for periodic sync (set SYNC_INTERVAL_MINUTES to enable)
 scheduler = BackgroundScheduler()
+SYNC_INTERVAL_MINUTES = float(os.getenv('SYNC_INTERVAL_MINUTES', 0))
+sync_lock = asyncio.Lock()
+# One analytics refresh at a time, whichever of startup, sync or the version watcher starts it
+refresh_lock = asyncio.Lock()
+
+# Columnar in-memory copy of business_data shared by the analytics endpoints
+# Set ANALYTICS_CUBE=false to serve everything from MongoDB rollups instead
+USE_ANALYTICS_CUBE = os.getenv('ANALYTICS_CUBE', 'true').lower() != 'false'
+# Workers on one host share a memory-mapped Arrow snapshot per data version
+CUBE_SNAPSHOT_DIR = os.getenv('CUBE_SNAPSHOT_DIR', str(ROOT_DIR / 'snapshots'))
+cube_store = CubeStore(snapshot_dir=Path(CUBE_SNAPSHOT_DIR) if CUBE_SNAPSHOT_DIR else None)
+
+# Routes MongoDB queries to the smallest materialized rollup that can answer them
+rollup_router = RollupRouter()
+
+# Analytics responses are cached per data version; other workers and the data
+# generators bump the version in MongoDB, which is polled for changes
+data_tracker = DataVersionTracker()
+result_cache = ResultCache(max_bytes=int(os.getenv('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024)))
+DATA_VERSION_POLL_SECONDS = float(os.getenv('DATA_VERSION_POLL_SECONDS', 30))
+# Upper bound on how long a worker keeps serving cached responses after another worker's sync
+DATA_VERSION_CHECK_SECONDS = float(os.getenv('DATA_VERSION_CHECK_SECONDS', 1))
+version_checked_at = 0.0
+# Identical analytics requests arriving together share one computation
+analytics_flights = SingleFlight()
+
+# CPU-heavy analytics work runs on a bounded thread pool, off the event loop;
+# requests beyond workers + queue limit get a 503 instead of queueing forever
+compute_executor = ComputeExecutor(
+    workers=int(os.getenv('COMPUTE_WORKERS', 0)) or None,
+    max_queue=int(os.getenv('COMPUTE_QUEUE_LIMIT', 32))
+)
+
+# Filter dropdown members, rebuilt with the rest of the analytics state
+dimension_catalog = DimensionCatalog.empty()
+
+# Full-dataset summary for the AI chat system message, rebuilt per data version
+business_context = BusinessContext.empty()
+
+# Aggregation tool description for the AI system message, rebuilt with the catalog
+ai_tool_instructions = ""
+
+# Chat provider for VectorDeep AI (LLM_PROVIDER=emergent|openai|fake)
+chat_model = create_chat_model()
+# Chat turns are written to ai_conversations in batches off the request path
+# and expire after AI_CONVERSATION_RETENTION_DAYS (0 keeps them forever)
+conversation_store = ConversationStore(
+    db.ai_conversations,
+    batch_size=int(os.getenv('AI_CONVERSATION_BATCH_SIZE', 100)),
+    flush_interval=float(os.getenv('AI_CONVERSATION_FLUSH_SECONDS', 1.0)),
+    retention_days=float(os.getenv('AI_CONVERSATION_RETENTION_DAYS', 90))
+)
+# Answers to repeated opening questions (e.g. the widget's suggested ones) per data version;
+# AI_ANSWER_SIMILARITY > 0 also reuses answers to near-identical questions
+answer_cache = AnswerCache(
+    maxsize=int(os.getenv('AI_ANSWER_CACHE_SIZE', 1000)),
+    ttl=float(os.getenv('AI_ANSWER_CACHE_TTL_SECONDS', 3600)),
+    similarity=float(os.getenv('AI_ANSWER_SIMILARITY', 0))
+)
 
 # Models
 class User(BaseModel):
@@ -83,10 +184,19 @@ class BusinessDataRecord(BaseModel):
     Sub_Cat: Optional[str] = None
     Board_Category: Optional[str] = None
 
+# Dimensions the analytics endpoints' compare_by parameter accepts
+COMPARE_BY_PATTERN = f"^({'|'.join(COMPARE_DIMENSIONS)})$"
+
+# Fields the AI aggregation tool may group and filter by; Sub_Cat is offered
+# as Sub_Category, which generated and ingested rows both store
+TOOL_DIMENSIONS = [FIELD_FALLBACKS.get(name, name) for name, field in BusinessDataRecord.model_fields.items()
+                   if name not in MEASURES and field.annotation in (int, str, Optional[str])]
+
 class AIConversation(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     session_id: str
+    user_email: Optional[str] = None
     user_message: str
     ai_response: str
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -103,22 +213,127 @@ class SyncStatusResponse(BaseModel):
     status: str
     message: str
     records_count: int
+    rows_per_second: Optional[float] = None
 
 # Helper Functions
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
         token = credentials.credentials
+        email = token_cache.get(token)
+        if email is not None:
+            return email
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         email = payload.get("email")
         if email is None:
             raise HTTPException(status_code=401, detail="Invalid token")
+        token_cache.put(token, email, payload.get("exp", float("inf")))
         return email
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-# Removed sync_azure_data function - using dummy data instead
+async def get_metrics_client(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    if METRICS_TOKEN and hmac.compare_digest(credentials.credentials.encode(), METRICS_TOKEN.encode()):
+        return "metrics-scraper"
+    return await get_current_user(credentials)
+
+def get_ingest_source():
+    """Azure Blob when configured, else a local CSV, else None (dummy data only)"""
+    if AZURE_CONNECTION_STRING and AZURE_CONTAINER_NAME and AZURE_BLOB_PATH:
+        return AzureBlobSource(AZURE_CONNECTION_STRING, AZURE_CONTAINER_NAME, AZURE_BLOB_PATH)
+    if INGEST_LOCAL_PATH:
+        return LocalFileSource(INGEST_LOCAL_PATH)
+    return None
+
+async def refresh_analytics(version: int, partitions: Optional[List[int]] = None):
+    """Reload analytics for `version` unless it (or a newer one) is already published"""
+    async with refresh_lock:
+        if data_tracker.is_current(version):
+            logger.info(f"Analytics already at data version {data_tracker.version}, skipping refresh to {version}")
+            return
+        await load_analytics(version, partitions)
+
+async def load_analytics(version: int, partitions: Optional[List[int]] = None):
+    """Reload everything derived from business_data, then publish the new version
+
+    When the new version only replaced some (Year, Month) partitions, cached
+    responses filtered to other years stay valid and are carried over.
+    """
+    global dimension_catalog, business_context, ai_tool_instructions
+    previous = data_tracker.version
+    if partitions is None and previous and version == previous + 1:
+        partitions = [period for period, changed in (await get_partition_versions(db)).items() if changed == version]
+    await rollup_router.refresh(db)
+    if USE_ANALYTICS_CUBE:
+        cube = await cube_store.refresh(db.business_data, version)
+        dimension_catalog = DimensionCatalog.from_cube(cube)
+        business_context = await asyncio.to_thread(BusinessContext.from_cube, cube)
+    else:
+        dimension_catalog = await DimensionCatalog.from_collection(db, rollup_router)
+        business_context = await BusinessContext.from_collection(db, rollup_router)
+    members = {FIELD_FALLBACKS.get(CATALOG_FIELDS[key], CATALOG_FIELDS[key]): values
+               for key, values in dimension_catalog.options().items()}
+    ai_tool_instructions = tool_instructions(TOOL_DIMENSIONS, members)
+    data_tracker.advance(version)
+    # Answers were generated from the whole-dataset context, so none carry over
+    answer_cache.clear()
+    answer_cache.set_members(value for values in members.values() for value in values)
+    if partitions and previous and version == previous + 1:
+        result_cache.carry_over(previous, version, lambda key: cache_entry_unaffected(key, partitions))
+    else:
+        result_cache.clear()
+
+async def run_sync():
+    """Ingest the configured source and refresh only the partitions that changed"""
+    async with sync_lock:
+        source = get_ingest_source()
+        stats = await ingest_csv(source, db, BusinessDataRecord)
+        if not stats.unchanged:
+            await refresh_rollup_partitions(db, stats.partitions)
+            version = await bump_data_version(db, stats.partitions)
+            # Only now is the load visible everywhere; until then a failed sync is retried in full
+            await save_watermark(db, stats)
+            await refresh_analytics(version, stats.partitions)
+        return stats
+
+def schedule_sync(loop):
+    """Scheduler job: runs on the scheduler's thread, so hand the sync to the app loop"""
+    try:
+        asyncio.run_coroutine_threadsafe(run_sync(), loop).result()
+    except Exception as e:
+        logger.error(f"Scheduled sync error: {str(e)}")
+
+async def watch_data_version():
+    """Pick up data changes made by the generators or other workers"""
+    while True:
+        await asyncio.sleep(DATA_VERSION_POLL_SECONDS)
+        try:
+            version = await get_data_version(db)
+            if version != data_tracker.version:
+                logger.info(f"Data version changed {data_tracker.version} -> {version}, refreshing analytics")
+                await refresh_analytics(version)
+        except Exception as e:
+            logger.error(f"Data version check error: {str(e)}")
+
+async def current_data_version() -> int:
+    """The data version to serve, catching up first if another worker has synced
+
+    The stored version is read at most once per DATA_VERSION_CHECK_SECONDS, so a
+    cache hit costs one point read per interval rather than one per request.
+    """
+    global version_checked_at
+    now = time.monotonic()
+    if now - version_checked_at >= DATA_VERSION_CHECK_SECONDS:
+        version_checked_at = now
+        try:
+            version = await get_data_version(db)
+            if not data_tracker.is_current(version):
+                logger.info(f"Data version changed {data_tracker.version} -> {version}, refreshing analytics")
+                await refresh_analytics(version)
+        except Exception as e:
+            logger.error(f"Data version check error: {str(e)}")
+    return data_tracker.version
 
 # Lifespan context manager
 @asynccontextmanager
@@ -129,24 +344,55 @@ async def lifespan(app: FastAPI):
     # Create default user if not exists
     existing_user = await db.users.find_one({"email": "data.admin@thrivebrands.ai"})
     if not existing_user:
-        password_hash = bcrypt.hashpw("123456User".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        password_hash = await password_hasher.hash("123456User")
         user = User(email="data.admin@thrivebrands.ai", password_hash=password_hash)
         user_dict = user.model_dump()
         user_dict['created_at'] = user_dict['created_at'].isoformat()
         await db.users.insert_one(user_dict)
         logger.info("Default user created")
     
+    # Compound indexes for filtered drilldowns (no-op when they already exist)
+    for keys in ANALYTICS_INDEXES:
+        await db.business_data.create_index(keys)
+    
+    # Rows loaded before the YYYYMM Period key existed get it now
+    try:
+        backfilled = await backfill_periods(db.business_data)
+        if backfilled:
+            logger.info(f"Period key added to {backfilled} existing records")
+    except Exception as e:
+        logger.warning(f"Period backfill skipped: {str(e)}")
+    
     # Verify data exists in MongoDB
     count = await db.business_data.count_documents({})
     logger.info(f"Using dummy data from MongoDB - {count} records available")
     
     if count == 0:
         logger.warning("⚠️ No data in MongoDB! Run generate_dummy_data.py to populate data")
+    else:
+        await refresh_analytics(await get_data_version(db))
+    
+    await conversation_store.ensure_indexes()
+    await conversation_store.migrate_timestamps()
+    conversation_store.start()
+    
+    version_watcher = asyncio.create_task(watch_data_version())
+    
+    if SYNC_INTERVAL_MINUTES and get_ingest_source() is not None:
+        scheduler.add_job(schedule_sync, 'interval', args=[asyncio.get_running_loop()],
+                          minutes=SYNC_INTERVAL_MINUTES, max_instances=1, coalesce=True)
+        scheduler.start()
+        logger.info(f"Scheduled sync every {SYNC_INTERVAL_MINUTES:g} minutes")
     
     yield
     
     # Shutdown
-    scheduler.shutdown()
+    version_watcher.cancel()
+    await conversation_store.close()
+    compute_executor.shutdown()
+    password_hasher.shutdown()
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
     client.close()
     logger.info("Application shutdown")
 
@@ -163,7 +409,11 @@ async def login(request: LoginRequest):
     if not user_doc:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not bcrypt.checkpw(request.password.encode('utf-8'), user_doc['password_hash'].encode('utf-8')):
+    try:
+        password_ok = await password_hasher.verify(request.password, user_doc['password_hash'])
+    except LoginBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    if not password_ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Create JWT token
@@ -178,335 +428,491 @@ async def login(request: LoginRequest):
 @api_router.get("/data/sync", response_model=SyncStatusResponse)
 async def trigger_sync(email: str = Depends(get_current_user)):
     try:
-        # Using dummy data - sync not implemented
+        source = get_ingest_source()
+        if source is None:
+            # Using dummy data - just make sure this worker is serving the latest version
+            await refresh_analytics(await get_data_version(db))
+            count = await db.business_data.count_documents({})
+            return SyncStatusResponse(
+                status="success",
+                message="Using dummy data - no ingest source configured",
+                records_count=count
+            )
+        
+        stats = await run_sync()
         count = await db.business_data.count_documents({})
+        if stats.unchanged:
+            # Another worker may have loaded this source; serve what it published
+            await refresh_analytics(await get_data_version(db))
+            return SyncStatusResponse(
+                status="success",
+                message=f"Source unchanged since last sync - {stats.source}",
+                records_count=count
+            )
+        
         return SyncStatusResponse(
             status="success",
-            message="Using dummy data - sync not implemented",
-            records_count=count
+            message=f"Ingested {stats.rows:,} rows into {len(stats.partitions)} partitions from {stats.source} in {stats.seconds:.1f}s",
+            records_count=count,
+            rows_per_second=round(stats.rows_per_second, 1)
         )
     except Exception as e:
+        logger.error(f"Data sync error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def cached_response(endpoint: str, filters: Dict[str, List[Any]], compute, **params):
+    """Serve an analytics result from the result cache, computing it on a miss
+
+    Concurrent misses for the same key and data version are coalesced into a
+    single computation.
+    """
+    version = await current_data_version()
+    key = ResultCache.make_key(endpoint, filters, **params)
+    with stage('cache_lookup'):
+        body = result_cache.get(key, version)
+    count_cache(body is not None)
+    if body is None:
+        async def compute_and_store():
+            result = await compute()
+            with stage('serialize'):
+                return await compute_executor.run(result_cache.put, key, version, result)
+        body = await analytics_flights.run((version, key), compute_and_store)
+    return Response(content=body, media_type="application/json")
+
+async def compute_comparison(filters: Dict[str, List[Any]], comparison: Comparison):
+    cube = cube_store.cube
+    if cube is not None:
+        count_rows(cube.n_rows)
+        with stage('cube_groupby'):
+            return await compute_executor.run(cube_comparison, cube, filters, comparison)
+    
+    # Earlier periods are read even when filtered out, since YoY and YTD compare against them
+    scan = scan_filters(filters)
+    collection = rollup_router.route(comparison.dims + ['Year', 'Month_Name'] + list(scan))
+    with stage('mongo_fetch'):
+        docs = await db[collection].aggregate(comparison_pipeline(build_match(scan), comparison)).to_list(None)
+    count_rows(len(docs))
+    with stage('compare'):
+        return await compute_executor.run(compare_periods, comparison_docs(docs, comparison), comparison, filters)
+
+async def with_comparison(compute, filters: Dict[str, List[Any]], comparison: Optional[Comparison]):
+    """Add period comparisons (YoY, MoM, YTD, rolling) to an endpoint result when requested"""
+    result = await compute
+    if comparison is not None and "error" not in result:
+        result["comparison"] = await compute_comparison(filters, comparison)
+    return result
+
+def comparison_params(comparison: Optional[Comparison]) -> Dict[str, Any]:
+    """Result cache key parameters for a comparison"""
+    return {"comparison": tuple(comparison)} if comparison is not None else {}
+
+async def compute_executive_overview(filters: Dict[str, List[Any]]):
+    cube = cube_store.cube
+    if cube is not None:
+        count_rows(cube.n_rows)
+        with stage('cube_groupby'):
+            result = await compute_executor.run(analytics_cube.executive_overview, cube, filters)
+    else:
+        # Filters and rollups are pushed down into a single aggregation round trip
+        query = build_match(filters)
+        collection = rollup_router.route(EXECUTIVE_OVERVIEW_FIELDS + list(filters))
+        logger.info(f"Query being executed on {collection}: {query}")
+        result = await run_executive_overview(db[collection], query)
+    
+    if result is None:
+        return {"error": "No data available"}
+    
+    return result
+
+async def compute_customer_analysis(filters: Dict[str, List[Any]], page: Optional[Page] = None):
+    cube = cube_store.cube
+    if cube is not None:
+        count_rows(cube.n_rows)
+        with stage('cube_groupby'):
+            result = await compute_executor.run(analytics_cube.customer_analysis, cube, filters, page)
+        return result or {"error": "No data available"}
+    
+    # Paging is pushed down as $sort/$skip/$limit inside the pipeline
+    collection = rollup_router.route(CUSTOMER_ANALYSIS_FIELDS + list(filters))
+    result = await run_customer_analysis(db[collection], build_match(filters), page)
+    
+    if result is None:
+        return {"error": "No data available"}
+    
+    return result
+
+async def compute_brand_analysis(filters: Dict[str, List[Any]], page: Optional[Page] = None):
+    cube = cube_store.cube
+    if cube is not None:
+        count_rows(cube.n_rows)
+        with stage('cube_groupby'):
+            result = await compute_executor.run(analytics_cube.brand_analysis, cube, filters, page)
+        return result or {"error": "No data available"}
+    
+    # Streamed from MongoDB so memory is bounded by the number of groups, not rows
+    collection = rollup_router.route(BRAND_ANALYSIS_FIELDS + list(filters))
+    groups = await stream_group_sums(db[collection], build_match(filters), executor=compute_executor, groupings={
+        'brand_performance': (['Brand'], MEASURES),
+        'brand_by_business': (['Brand', 'Business'], ['Gross_Profit', 'Revenue']),
+        'brand_yoy_growth': (['Brand', 'Year'], ['Revenue'])
+    })
+    
+    if groups.rows == 0:
+        return {"error": "No data available"}
+    
+    with stage('shape'):
+        if page is None:
+            return {
+                "brand_performance": groups.results('brand_performance'),
+                "brand_by_business": groups.results('brand_by_business'),
+                "brand_yoy_growth": groups.results('brand_yoy_growth')
+            }
+        
+        # The breakdowns only cover the brands on the page
+        brands, total = groups.top('brand_performance', page)
+        on_page = {row['Brand'] for row in brands}
+        return {
+            "brand_performance": brands,
+            "brand_by_business": [row for row in groups.results('brand_by_business') if row['Brand'] in on_page],
+            "brand_yoy_growth": [row for row in groups.results('brand_yoy_growth') if row['Brand'] in on_page],
+            "page": page_info(page, {"brand_performance": total})
+        }
+
+async def compute_category_analysis(filters: Dict[str, List[Any]], page: Optional[Page] = None):
+    cube = cube_store.cube
+    if cube is not None:
+        count_rows(cube.n_rows)
+        with stage('cube_groupby'):
+            result = await compute_executor.run(analytics_cube.category_analysis, cube, filters, page)
+        return result or {"error": "No data available"}
+    
+    collection = rollup_router.route(CATEGORY_ANALYSIS_FIELDS + list(filters))
+    groups = await stream_group_sums(db[collection], build_match(filters), executor=compute_executor, groupings={
+        'category_performance': (['Category'], MEASURES),
+        'subcategory_performance': (['Sub_Category'], MEASURES),
+        'board_category_performance': (['Board_Category'], ['Gross_Profit', 'Revenue'])
+    })
+    
+    if groups.rows == 0:
+        return {"error": "No data available"}
+    
+    with stage('shape'):
+        # Board Category (check if column exists)
+        board_category_perf = []
+        if 'Board_Category' in groups.seen_fields:
+            board_category_perf = groups.results('board_category_performance')
+        
+        if page is None:
+            return {
+                "category_performance": groups.results('category_performance'),
+                "subcategory_performance": groups.results('subcategory_performance'),
+                "board_category_performance": board_category_perf
+            }
+        
+        categories, category_total = groups.top('category_performance', page)
+        subcategories, subcategory_total = groups.top('subcategory_performance', page)
+        return {
+            "category_performance": categories,
+            "subcategory_performance": subcategories,
+            "board_category_performance": board_category_perf,
+            "page": page_info(page, {"category_performance": category_total,
+                                     "subcategory_performance": subcategory_total})
+        }
+
 @api_router.get("/analytics/executive-overview")
 async def get_executive_overview(
     years: str = None,
     months: str = None,
     businesses: str = None,
     channels: str = None,
+    period_from: Optional[str] = Query(None, alias="from", pattern=PERIOD_PATTERN),
+    period_to: Optional[str] = Query(None, alias="to", pattern=PERIOD_PATTERN),
+    compare: Optional[str] = Query(None, pattern=COMPARE_PATTERN),
+    compare_by: Optional[str] = Query(None, pattern=COMPARE_BY_PATTERN),
+    compare_measure: str = Query("Revenue", pattern="^(Revenue|Gross_Profit|Units)$"),
     email: str = Depends(get_current_user)
 ):
     """Executive Overview - YoY comparison, KPIs with multi-select filters"""
     try:
-        # Build query based on multi-select filters
-        query = {}
-        
-        if years:
-            year_list = [int(y.strip()) for y in years.split(',') if y.strip()]
-            if year_list:
-                query['Year'] = {'$in': year_list}
-        
-        if months:
-            month_list = [m.strip() for m in months.split(',') if m.strip()]
-            if month_list:
-                query['Month_Name'] = {'$in': month_list}
-        
-        if businesses:
-            business_list = [b.strip() for b in businesses.split(',') if b.strip()]
-            if business_list:
-                query['Business'] = {'$in': business_list}
-        
-        if channels:
-            channel_list = [c.strip() for c in channels.split(',') if c.strip()]
-            if channel_list:
-                query['Channel'] = {'$in': channel_list}
-            
-        # Get filtered data
-        logger.info(f"Query being executed: {query}")
-        data = await db.business_data.find(query, {"_id": 0}).to_list(100000)
-        logger.info(f"Retrieved {len(data)} records from MongoDB")
-        
-        if data:
-            logger.info(f"First record keys: {list(data[0].keys())}")
-            logger.info(f"Sample values - Year: {data[0].get('Year')}, Revenue: {data[0].get('Revenue')}, gSales: {data[0].get('gSales')}")
-        
-        df = pd.DataFrame(data)
-        
-        # Debug logging
-        logger.info(f"DataFrame columns: {list(df.columns) if not df.empty else 'Empty DataFrame'}")
-        
-        if df.empty:
-            return {"error": "No data available"}
-        
-        # Ensure numeric columns
-        for col in ['Gross_Profit', 'Revenue', 'Units', 'Year']:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        # Group by Year and sort
-        yearly = df.groupby('Year').agg({
-            'Gross_Profit': 'sum',
-            'Revenue': 'sum',
-            'Units': 'sum'
-        }).reset_index().sort_values('Year')
-        
-        # Convert to regular Python types for JSON serialization
-        yearly['Year'] = yearly['Year'].astype(int)
-        yearly['Gross_Profit'] = yearly['Gross_Profit'].astype(float).round(2)
-        yearly['Revenue'] = yearly['Revenue'].astype(float).round(2)
-        yearly['Units'] = yearly['Units'].astype(float).round(2)
-        
-        # Business-wise performance
-        business_perf = df.groupby('Business').agg({
-            'Gross_Profit': 'sum',
-            'Revenue': 'sum',
-            'Units': 'sum'
-        }).reset_index()
-        
-        business_perf['Gross_Profit'] = business_perf['Gross_Profit'].astype(float).round(2)
-        business_perf['Revenue'] = business_perf['Revenue'].astype(float).round(2)
-        business_perf['Units'] = business_perf['Units'].astype(float).round(2)
-        
-        # Month-wise trend for current year with proper month ordering
-        current_year = int(df['Year'].max())
-        month_order = ['January', 'February', 'March', 'April', 'May', 'June', 
-                      'July', 'August', 'September', 'October', 'November', 'December']
-        
-        monthly_trend = df[df['Year'] == current_year].groupby('Month_Name').agg({
-            'Gross_Profit': 'sum',
-            'Revenue': 'sum',
-            'Units': 'sum'
-        }).reset_index()
-        
-        # Sort by month order
-        monthly_trend['month_sort'] = monthly_trend['Month_Name'].apply(
-            lambda x: month_order.index(x) if x in month_order else 999
+        filters = parse_filters(years=years, months=months, businesses=businesses, channels=channels)
+        filters.update(period_range(period_from, period_to))
+        comparison = parse_comparison(compare, compare_by, compare_measure)
+        return await cached_response(
+            "executive-overview", filters,
+            lambda: with_comparison(compute_executive_overview(filters), filters, comparison),
+            **comparison_params(comparison)
         )
-        monthly_trend = monthly_trend.sort_values('month_sort').drop('month_sort', axis=1)
-        
-        monthly_trend['Gross_Profit'] = monthly_trend['Gross_Profit'].astype(float).round(2)
-        monthly_trend['Revenue'] = monthly_trend['Revenue'].astype(float).round(2)
-        monthly_trend['Units'] = monthly_trend['Units'].astype(float).round(2)
-        
-        return {
-            "yearly_performance": yearly.to_dict('records'),
-            "business_performance": business_perf.to_dict('records'),
-            "monthly_trend": monthly_trend.to_dict('records'),
-            "total_profit": float(df['Gross_Profit'].sum()),
-            "total_revenue": float(df['Revenue'].sum()),
-            "total_units": float(df['Units'].sum())
-        }
+    except ComputeBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Executive overview error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/analytics/customer-analysis")
-async def get_customer_analysis(email: str = Depends(get_current_user)):
-    """Customer Analysis - Channel and customer drilldowns"""
+async def get_customer_analysis(
+    years: str = None,
+    months: str = None,
+    businesses: str = None,
+    channels: str = None,
+    customers: str = None,
+    brands: str = None,
+    categories: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    sort_by: Optional[str] = Query(None, pattern="^(Revenue|Gross_Profit|Units)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    period_from: Optional[str] = Query(None, alias="from", pattern=PERIOD_PATTERN),
+    period_to: Optional[str] = Query(None, alias="to", pattern=PERIOD_PATTERN),
+    compare: Optional[str] = Query(None, pattern=COMPARE_PATTERN),
+    compare_by: Optional[str] = Query(None, pattern=COMPARE_BY_PATTERN),
+    compare_measure: str = Query("Revenue", pattern="^(Revenue|Gross_Profit|Units)$"),
+    email: str = Depends(get_current_user)
+):
+    """Customer Analysis - Channel and customer drilldowns with multi-select filters"""
     try:
-        data = await db.business_data.find({}, {"_id": 0}).to_list(100000)
-        df = pd.DataFrame(data)
-        
-        if df.empty:
-            return {"error": "No data available"}
-        
-        # Ensure numeric columns
-        for col in ['Gross_Profit', 'Revenue', 'Units']:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        # Channel-wise analysis
-        channel_analysis = df.groupby('Channel').agg({
-            'Gross_Profit': 'sum',
-            'Revenue': 'sum',
-            'Units': 'sum'
-        }).reset_index()
-        
-        channel_analysis['Gross_Profit'] = channel_analysis['Gross_Profit'].astype(float).round(2)
-        channel_analysis['Revenue'] = channel_analysis['Revenue'].astype(float).round(2)
-        channel_analysis['Units'] = channel_analysis['Units'].astype(float).round(2)
-        
-        # Customer-wise analysis
-        customer_analysis = df.groupby('Customer').agg({
-            'Gross_Profit': 'sum',
-            'Revenue': 'sum',
-            'Units': 'sum'
-        }).reset_index()
-        
-        customer_analysis['Gross_Profit'] = customer_analysis['Gross_Profit'].astype(float).round(2)
-        customer_analysis['Revenue'] = customer_analysis['Revenue'].astype(float).round(2)
-        customer_analysis['Units'] = customer_analysis['Units'].astype(float).round(2)
-        
-        # Top 10 customers
-        top_customers = customer_analysis.nlargest(10, 'Revenue')
-        
-        return {
-            "channel_performance": channel_analysis.to_dict('records'),
-            "customer_performance": customer_analysis.to_dict('records'),
-            "top_customers": top_customers.to_dict('records')
-        }
+        filters = parse_filters(
+            years=years, months=months, businesses=businesses, channels=channels,
+            customers=customers, brands=brands, categories=categories
+        )
+        filters.update(period_range(period_from, period_to))
+        page = parse_page(limit, offset, sort_by, order)
+        comparison = parse_comparison(compare, compare_by, compare_measure)
+        return await cached_response(
+            "customer-analysis", filters,
+            lambda: with_comparison(compute_customer_analysis(filters, page), filters, comparison),
+            **page_params(page), **comparison_params(comparison)
+        )
+    except ComputeBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Customer analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/analytics/brand-analysis")
-async def get_brand_analysis(email: str = Depends(get_current_user)):
-    """Brand Analysis - Brand performance by category and channel"""
+async def get_brand_analysis(
+    years: str = None,
+    months: str = None,
+    businesses: str = None,
+    channels: str = None,
+    customers: str = None,
+    brands: str = None,
+    categories: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    sort_by: Optional[str] = Query(None, pattern="^(Revenue|Gross_Profit|Units)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    period_from: Optional[str] = Query(None, alias="from", pattern=PERIOD_PATTERN),
+    period_to: Optional[str] = Query(None, alias="to", pattern=PERIOD_PATTERN),
+    compare: Optional[str] = Query(None, pattern=COMPARE_PATTERN),
+    compare_by: Optional[str] = Query(None, pattern=COMPARE_BY_PATTERN),
+    compare_measure: str = Query("Revenue", pattern="^(Revenue|Gross_Profit|Units)$"),
+    email: str = Depends(get_current_user)
+):
+    """Brand Analysis - Brand performance by category and channel with multi-select filters"""
     try:
-        data = await db.business_data.find({}, {"_id": 0}).to_list(100000)
-        df = pd.DataFrame(data)
-        
-        if df.empty:
-            return {"error": "No data available"}
-        
-        # Brand performance
-        brand_perf = df.groupby('Brand').agg({
-            'Gross_Profit': 'sum',
-            'Revenue': 'sum',
-            'Units': 'sum'
-        }).reset_index()
-        
-        # Brand by Business
-        brand_by_business = df.groupby(['Brand', 'Business']).agg({
-            'Gross_Profit': 'sum',
-            'Revenue': 'sum'
-        }).reset_index()
-        
-        # YoY Brand Growth
-        brand_yoy = df.groupby(['Brand', 'Year']).agg({
-            'Revenue': 'sum'
-        }).reset_index()
-        
-        return {
-            "brand_performance": brand_perf.to_dict('records'),
-            "brand_by_business": brand_by_business.to_dict('records'),
-            "brand_yoy_growth": brand_yoy.to_dict('records')
-        }
+        filters = parse_filters(
+            years=years, months=months, businesses=businesses, channels=channels,
+            customers=customers, brands=brands, categories=categories
+        )
+        filters.update(period_range(period_from, period_to))
+        page = parse_page(limit, offset, sort_by, order)
+        comparison = parse_comparison(compare, compare_by, compare_measure)
+        return await cached_response(
+            "brand-analysis", filters,
+            lambda: with_comparison(compute_brand_analysis(filters, page), filters, comparison),
+            **page_params(page), **comparison_params(comparison)
+        )
+    except ComputeBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/analytics/category-analysis")
-async def get_category_analysis(email: str = Depends(get_current_user)):
-    """Category Analysis - Category and sub-category deep dives"""
+async def get_category_analysis(
+    years: str = None,
+    months: str = None,
+    businesses: str = None,
+    channels: str = None,
+    customers: str = None,
+    brands: str = None,
+    categories: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    sort_by: Optional[str] = Query(None, pattern="^(Revenue|Gross_Profit|Units)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    period_from: Optional[str] = Query(None, alias="from", pattern=PERIOD_PATTERN),
+    period_to: Optional[str] = Query(None, alias="to", pattern=PERIOD_PATTERN),
+    compare: Optional[str] = Query(None, pattern=COMPARE_PATTERN),
+    compare_by: Optional[str] = Query(None, pattern=COMPARE_BY_PATTERN),
+    compare_measure: str = Query("Revenue", pattern="^(Revenue|Gross_Profit|Units)$"),
+    email: str = Depends(get_current_user)
+):
+    """Category Analysis - Category and sub-category deep dives with multi-select filters"""
     try:
-        data = await db.business_data.find({}, {"_id": 0}).to_list(100000)
-        df = pd.DataFrame(data)
-        
-        if df.empty:
-            return {"error": "No data available"}
-        
-        # Category performance
-        category_perf = df.groupby('Category').agg({
-            'Gross_Profit': 'sum',
-            'Revenue': 'sum',
-            'Units': 'sum'
-        }).reset_index()
-        
-        # Sub-category performance
-        subcategory_perf = df.groupby('Sub_Category').agg({
-            'Gross_Profit': 'sum',
-            'Revenue': 'sum',
-            'Units': 'sum'
-        }).reset_index()
-        
-        # Board Category (check if column exists)
-        board_category_perf = []
-        if 'Board_Category' in df.columns:
-            board_category_perf = df.groupby('Board_Category').agg({
-                'Gross_Profit': 'sum',
-                'Revenue': 'sum'
-            }).reset_index().to_dict('records')
-        
-        return {
-            "category_performance": category_perf.to_dict('records'),
-            "subcategory_performance": subcategory_perf.to_dict('records'),
-            "board_category_performance": board_category_perf
-        }
+        filters = parse_filters(
+            years=years, months=months, businesses=businesses, channels=channels,
+            customers=customers, brands=brands, categories=categories
+        )
+        filters.update(period_range(period_from, period_to))
+        page = parse_page(limit, offset, sort_by, order)
+        comparison = parse_comparison(compare, compare_by, compare_measure)
+        return await cached_response(
+            "category-analysis", filters,
+            lambda: with_comparison(compute_category_analysis(filters, page), filters, comparison),
+            **page_params(page), **comparison_params(comparison)
+        )
+    except ComputeBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/filters/options")
-async def get_filter_options(email: str = Depends(get_current_user)):
+async def get_filter_options(counts: bool = False, email: str = Depends(get_current_user)):
     """Get all unique filter options"""
-    try:
-        data = await db.business_data.find({}, {"_id": 0}).to_list(100000)
-        df = pd.DataFrame(data)
-        
-        if df.empty:
-            return {}
-        
-        return {
-            "years": sorted(df['Year'].dropna().unique().tolist()),
-            "months": df['Month_Name'].dropna().unique().tolist(),
-            "businesses": df['Business'].dropna().unique().tolist(),
-            "channels": df['Channel'].dropna().unique().tolist(),
-            "customers": df['Customer'].dropna().unique().tolist(),
-            "brands": df['Brand'].dropna().unique().tolist(),
-            "categories": df['Category'].dropna().unique().tolist(),
-            "sub_categories": df['Sub_Cat'].dropna().unique().tolist()
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Built once per data version, so this is a plain in-memory read
+    catalog = dimension_catalog
+    return Response(content=catalog.body_with_counts if counts else catalog.body, media_type="application/json")
+
+@api_router.get("/cache/stats")
+async def get_cache_stats(email: str = Depends(get_current_user)):
+    """Result cache hit/miss/eviction counters"""
+    return {
+        "data_version": data_tracker.version,
+        **result_cache.stats(),
+        "compute": compute_executor.stats(),
+        "coalesced": analytics_flights.coalesced,
+        "ai_answers": answer_cache.stats(),
+        "ai_conversations": conversation_store.stats()
+    }
+
+@api_router.get("/metrics")
+async def get_metrics(client: str = Depends(get_metrics_client)):
+    """Prometheus scrape target: request/stage latency histograms, rows scanned, bytes returned"""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+def save_conversation(session_id: str, email: str, user_message: str, ai_response: str):
+    """Queue a chat turn for the conversation store's next batch"""
+    conversation = AIConversation(
+        session_id=session_id,
+        user_email=email,
+        user_message=user_message,
+        ai_response=ai_response
+    )
+    conversation_store.add(conversation.model_dump())
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """One server-sent event; unnamed events carry tokens"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def run_aggregate_tool(call: Dict[str, Any]) -> str:
+    """Execute one AI aggregate tool call and render the result table"""
+    spec = AggregateSpec.parse(call, TOOL_DIMENSIONS)
+    cube = cube_store.cube
+    if cube is not None and all(cube.has_dimension(dim) for dim in spec.group_by + list(spec.filters)):
+        count_rows(cube.n_rows)
+        with stage('cube_groupby'):
+            rows = await compute_executor.run(aggregate_cube, cube, spec)
+    else:
+        collection = rollup_router.route(spec.group_by + list(spec.filters))
+        with stage('mongo_fetch'):
+            docs = await db[collection].aggregate(spec.pipeline()).to_list(spec.limit)
+        rows = aggregate_docs(docs, spec)
+    return render_table(rows, spec)
+
+async def is_first_turn(session_id: str, email: str) -> bool:
+    """Only a session's opening question is answered the same whoever asks it;
+    follow-ups like "what about Tesco?" depend on the earlier turns"""
+    return not await conversation_store.recent_turns(session_id, email, 1)
+
+def chat_session(session_id: str, email: str):
+    # Business data context, precomputed from the full dataset for this data version
+    system_message = build_system_message(business_context.text, ai_tool_instructions)
+    # Session ids come from the client, so two users picking the same one must not share a session
+    return chat_model.session(f"{email}/{session_id}", system_message)
 
 @api_router.post("/ai/chat", response_model=AIChatResponse)
 async def ai_chat(request: AIChatRequest, email: str = Depends(get_current_user)):
     """AI Chat Assistant for business insights"""
     try:
-        # Get business data context
-        data = await db.business_data.find({}, {"_id": 0}).to_list(1000)
-        df = pd.DataFrame(data)
-        
-        # Create data summary for AI context
-        context = f"""
-You are VectorDeep AI, a business intelligence assistant for ThriveBrands. You have access to business data with the following structure:
-
-Data Overview:
-- Total Records: {len(df)}
-- Years: {df['Year'].unique().tolist() if not df.empty else []}
-- Businesses: {df['Business'].unique().tolist() if not df.empty else []}
-- Brands: {df['Brand'].unique().tolist()[:10] if not df.empty else []} (showing first 10)
-- Total Revenue: ${df['Revenue'].sum():,.2f} if not df.empty else 0
-- Total Gross Profit: ${df['Gross_Profit'].sum():,.2f} if not df.empty else 0
-
-You can answer questions about:
-- Sales performance and trends
-- Brand analysis
-- Customer and channel performance
-- Category insights
-- Year-over-year comparisons
-
-Provide insights with specific numbers when possible. Highlight good performance in your response and provide actionable recommendations.
-"""
+        version = await current_data_version()
+        cacheable = await is_first_turn(request.session_id, email)
         
-        # Initialize LLM chat
-        chat = LlmChat(
-            api_key=os.getenv('EMERGENT_LLM_KEY'),
-            session_id=request.session_id,
-            system_message=context
-        ).with_model("openai", "gpt-4o")
+        response = answer_cache.get(request.message, version) if cacheable else None
+        if response is None:
+            session = chat_session(request.session_id, email)
+            with stage('llm'):
+                response = ''.join([token async for token in
+                                    stream_with_tools(session, request.message, run_aggregate_tool)])
+            if cacheable:
+                answer_cache.put(request.message, version, response)
         
-        # Send message
-        user_message = UserMessage(text=request.message)
-        response = await chat.send_message(user_message)
-        
-        # Save conversation
-        conversation = AIConversation(
-            session_id=request.session_id,
-            user_message=request.message,
-            ai_response=response
-        )
-        conv_dict = conversation.model_dump()
-        conv_dict['timestamp'] = conv_dict['timestamp'].isoformat()
-        await db.ai_conversations.insert_one(conv_dict)
+        save_conversation(request.session_id, email, request.message, response)
         
         return AIChatResponse(response=response, session_id=request.session_id)
     except Exception as e:
         logger.error(f"AI Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/ai/chat/stream")
+async def ai_chat_stream(request: AIChatRequest, email: str = Depends(get_current_user)):
+    """AI Chat Assistant streaming tokens as server-sent events
+    
+    Each token arrives as `data: {"token": ...}`; the stream ends with
+    `event: done` once the turn is queued for saving, or `event: error`.
+    """
+    version = await current_data_version()
+    cacheable = await is_first_turn(request.session_id, email)
+    cached = answer_cache.get(request.message, version) if cacheable else None
+    session = chat_session(request.session_id, email) if cached is None else None
+    
+    async def events():
+        tokens = []
+        finished = False
+        try:
+            if cached is not None:
+                # Cached answers go out as one event
+                tokens.append(cached)
+                yield sse_event({"token": cached})
+            else:
+                with stage('llm'):
+                    async for token in stream_with_tools(session, request.message, run_aggregate_tool):
+                        tokens.append(token)
+                        yield sse_event({"token": token})
+                if cacheable:
+                    answer_cache.put(request.message, version, ''.join(tokens))
+            finished = True
+            save_conversation(request.session_id, email, request.message, ''.join(tokens))
+            yield sse_event({"session_id": request.session_id}, event="done")
+        except Exception as e:
+            logger.error(f"AI Chat stream error: {str(e)}")
+            yield sse_event({"detail": str(e)}, event="error")
+        finally:
+            if tokens and not finished:
+                # The client went away mid-answer: keep what was generated
+                save_conversation(request.session_id, email, request.message, ''.join(tokens))
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/ai/history")
+async def ai_history(session_id: str = "default-session", limit: int = 20, email: str = Depends(get_current_user)):
+    """Most recent chat turns of one of the current user's sessions, oldest first"""
+    try:
+        turns = await conversation_store.recent_turns(session_id, email, max(1, min(limit, 100)))
+        return {"session_id": session_id, "turns": turns}
+    except Exception as e:
+        logger.error(f"AI history error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -0,0 +1,62 @@
+"""
+Single-Flight Request Coalescing for BeaconIQ
+Concurrent calls with the same key share one computation: the first caller
+starts it and identical requests arriving while it runs await the same task
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from metrics import REGISTRY, current_route
+
+COALESCED = REGISTRY.counter(
+    'beaconiq_coalesced_requests_total', 'Requests that awaited an identical in-flight computation', ['route'])
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Per-key coalescing of in-flight coroutines
+
+    Errors reach every waiter. A waiter that is cancelled (e.g. the client
+    disconnected) leaves the others running; the computation itself is only
+    cancelled once nobody is waiting for it any more.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda task: self._forget(key, flight))
+        else:
+            self.coalesced += 1
+            COALESCED.inc(current_route.get())
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        # Finished flights are dropped so the next request starts fresh
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # Mark the exception retrieved even if every waiter was cancelled
+            flight.task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._flights)
@@ -0,0 +1,138 @@
+"""
+Streaming Aggregation for BeaconIQ
+Iterates a Motor cursor in batches and folds each batch into running sums
+per group key, so memory is bounded by the number of groups rather than the
+number of rows and results are exact at any collection size
+"""
+
+import asyncio
+import heapq
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from analytics_query import Page
+from metrics import count_rows, observe_stage
+
+# Output name -> (group-by fields, summed measures)
+Groupings = Dict[str, Tuple[List[str], List[str]]]
+
+
+class StreamingGroupBy:
+    """Running partial aggregates for several group-bys over one stream"""
+
+    def __init__(self, groupings: Groupings):
+        self.groupings = groupings
+        self.partials: Dict[str, Dict[Tuple, List[float]]] = {name: {} for name in groupings}
+        self.seen_fields = set()
+        self.rows = 0
+
+    def fold(self, batch: List[Dict[str, Any]]):
+        df = pd.DataFrame(batch)
+        self.rows += len(df)
+        self.seen_fields.update(df.columns)
+
+        for name, (dims, measures) in self.groupings.items():
+            if not set(dims) <= set(df.columns):
+                continue
+            frame = df[dims].copy()
+            for measure in measures:
+                values = df[measure] if measure in df.columns else 0
+                frame[measure] = pd.to_numeric(values, errors='coerce')
+            frame[measures] = frame[measures].fillna(0)
+
+            partial = self.partials[name]
+            for row in frame.groupby(dims).sum().itertuples():
+                key = row[0] if isinstance(row[0], tuple) else (row[0],)
+                sums = partial.get(key)
+                if sums is None:
+                    partial[key] = list(row[1:])
+                else:
+                    for i, value in enumerate(row[1:]):
+                        sums[i] += value
+
+    def results(self, name: str, round_to: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Final rows for one grouping, ordered by group key like pandas groupby"""
+        partial = self.partials[name]
+        return [self._row(name, key, partial[key], round_to) for key in sorted(partial)]
+
+    def top(self, name: str, page: Page, round_to: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of a grouping ordered by a measure, and its number of groups
+
+        Groups up to the end of the page are picked with a bounded heap
+        instead of sorting them all.
+        """
+        dims, measures = self.groupings[name]
+        partial = self.partials[name]
+        index = measures.index(page.sort_by)
+        sign = -1 if page.descending else 1
+
+        def rank(key: Tuple) -> Tuple:
+            # Ties are broken by the group key so pages never overlap
+            return sign * partial[key][index], key
+
+        if page.limit is None:
+            keys = sorted(partial, key=rank)
+        else:
+            keys = heapq.nsmallest(page.offset + page.limit, partial, key=rank)
+        rows = [self._row(name, key, partial[key], round_to) for key in keys[page.offset:]]
+        return rows, len(partial)
+
+    def _row(self, name: str, key: Tuple, sums: List[float], round_to: Optional[int]) -> Dict[str, Any]:
+        dims, measures = self.groupings[name]
+        if round_to is not None:
+            sums = [round(float(value), round_to) for value in sums]
+        return {**{dim: _native(value) for dim, value in zip(dims, key)},
+                **{measure: float(value) for measure, value in zip(measures, sums)}}
+
+
+def _native(value: Any) -> Any:
+    """Unwrap NumPy scalars so the rows stay JSON serializable"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+async def _fold(aggregator: StreamingGroupBy, batch: List[Dict[str, Any]], executor):
+    if executor is not None:
+        await executor.run(aggregator.fold, batch)
+    else:
+        aggregator.fold(batch)
+        await asyncio.sleep(0)
+
+
+async def stream_group_sums(
+    collection,
+    query: Dict[str, Any],
+    groupings: Groupings,
+    batch_size: int = 5000,
+    executor=None
+) -> StreamingGroupBy:
+    """Fold every matching document into the requested group-bys
+
+    With a ComputeExecutor the pandas folds run on its worker pool; the next
+    batch is fetched only after the previous fold finishes, bounding memory.
+    """
+    fields = {field for dims, measures in groupings.values() for field in dims + measures}
+    aggregator = StreamingGroupBy(groupings)
+    started = time.perf_counter()
+    fold_seconds = 0.0
+
+    batch = []
+    cursor = collection.find(query, {'_id': 0, **{field: 1 for field in fields}}).batch_size(batch_size)
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            fold_started = time.perf_counter()
+            await _fold(aggregator, batch, executor)
+            fold_seconds += time.perf_counter() - fold_started
+            batch = []
+    if batch:
+        fold_started = time.perf_counter()
+        await _fold(aggregator, batch, executor)
+        fold_seconds += time.perf_counter() - fold_started
+
+    # Fetching and folding interleave, so each is reported as its summed time
+    observe_stage('mongo_fetch', time.perf_counter() - started - fold_seconds)
+    observe_stage('groupby', fold_seconds)
+    count_rows(aggregator.rows)
+    return aggregator
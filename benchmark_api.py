@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+BeaconIQ - Backend API Benchmark
+Seeds a local mongod (or an in-process stand-in) at several data sizes,
+drives every /api analytics route in-process with realistic filter mixes and
+records p50/p95/p99 latency, throughput and peak RSS per route. Fails when a
+route's p95 regresses past the stored baseline, or has no baseline to
+compare against.
+
+    python benchmark_api.py --sizes 0.1,1,10 --update-baseline
+    python benchmark_api.py --sizes 0.1,1,10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR / 'backend'))
+
+ROUTES = [
+    "/api/analytics/executive-overview",
+    "/api/analytics/customer-analysis",
+    "/api/analytics/brand-analysis",
+    "/api/analytics/category-analysis",
+    "/api/filters/options"
+]
+# Query parameter -> dimension catalog key used to pick realistic values
+FILTER_PARAMS = {
+    "years": "years",
+    "months": "months",
+    "businesses": "businesses",
+    "channels": "channels",
+    "customers": "customers",
+    "brands": "brands",
+    "categories": "categories"
+}
+# Executive overview only accepts the time / business / channel filters
+ROUTE_FILTERS = {
+    "/api/analytics/executive-overview": ["years", "months", "businesses", "channels"],
+    "/api/filters/options": []
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the BeaconIQ analytics API")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="beaconiq_benchmark")
+    parser.add_argument("--in-process", action="store_true",
+                        help="use an in-process MongoDB stand-in (mongomock-motor) instead of mongod; "
+                             "rollups are skipped, so only the analytics cube path is meaningful")
+    parser.add_argument("--sizes", default="0.1,1",
+                        help="comma separated data sizes, as generate_dummy_data.py --scale factors")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route and size")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--filter-mixes", type=int, default=40,
+                        help="distinct filter combinations per route (repeats exercise the result cache)")
+    parser.add_argument("--no-cache", action="store_true", help="disable the analytics result cache")
+    parser.add_argument("--mongo-only", action="store_true", help="disable the analytics cube (ANALYTICS_CUBE=false)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=str(ROOT_DIR / "benchmark_baseline.json"))
+    parser.add_argument("--update-baseline", "--record-baseline", action="store_true",
+                        help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed p95 slowdown versus the baseline, as a fraction")
+    parser.add_argument("--min-regression-ms", type=float, default=2.0,
+                        help="ignore p95 slowdowns smaller than this, which are noise")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    """Must run before the server module is imported, which reads its settings at import time"""
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    os.environ["DATA_VERSION_POLL_SECONDS"] = "3600"
+    os.environ["CUBE_SNAPSHOT_DIR"] = ""
+    if args.no_cache:
+        os.environ["RESULT_CACHE_MAX_BYTES"] = "0"
+    if args.mongo_only:
+        os.environ["ANALYTICS_CUBE"] = "false"
+    if args.in_process:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+
+
+async def seed(db, scale, seed_value):
+    """Reload business_data at `scale` the same way generate_dummy_data.py --scale does"""
+    import generate_dummy_data as generator
+    from analytics_query import ANALYTICS_INDEXES
+    from bulk_loader import BulkLoader, build_indexes
+    from data_version import bump_data_version
+    from rollups import build_rollups
+    from synthetic_data import month_periods, sample_frames
+
+    await db.business_data.drop()
+    frames = sample_frames(generator.sample_month, month_periods(generator.YEARS, generator.LAST_MONTH),
+                           generator.ROWS_PER_MONTH, scale, seed_value)
+    started = time.perf_counter()
+    async with BulkLoader(db.business_data) as loader:
+        for frame in frames:
+            await loader.add_many(frame.to_dict('records'))
+    await build_indexes(db.business_data, generator.BUSINESS_DATA_INDEXES + ANALYTICS_INDEXES)
+    try:
+        await build_rollups(db)
+    except Exception as e:
+        print(f"  Rollups skipped: {str(e)[:80]}")
+    print(f"  Seeded {loader.stats.rows:,} rows in {time.perf_counter() - started:.1f}s")
+    return loader.stats.rows, await bump_data_version(db)
+
+
+def filter_mixes(catalog, route, count, rng):
+    """Realistic dashboard queries: mostly 0-2 filters with one or two values each"""
+    params = ROUTE_FILTERS.get(route, list(FILTER_PARAMS))
+    mixes = [{}]
+    while len(mixes) < count and params:
+        query = {}
+        for param in rng.sample(params, k=min(len(params), rng.choice([1, 1, 2, 2, 3]))):
+            values = catalog.get(FILTER_PARAMS[param]) or []
+            if values:
+                query[param] = ",".join(str(v) for v in rng.sample(values, k=min(len(values), rng.choice([1, 1, 2]))))
+        mixes.append(query)
+    return mixes
+
+
+async def drive(client, headers, route, mixes, total, concurrency, rng):
+    """Issue `total` requests from `concurrency` workers; returns latencies (ms), errors, wall seconds"""
+    queue = [rng.choice(mixes) for _ in range(total)]
+    latencies, errors = [], []
+
+    async def worker():
+        while queue:
+            params = queue.pop()
+            started = time.perf_counter()
+            response = await client.get(route, params=params, headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                errors.append(f"{response.status_code} {params}: {response.text[:100]}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run(args):
+    import httpx
+    import server
+    from data_version import get_data_version
+
+    rng = random.Random(args.seed)
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            login = await client.post("/api/auth/login", json={
+                "email": "data.admin@thrivebrands.ai", "password": "123456User"
+            })
+            login.raise_for_status()
+            headers = {"Authorization": f"Bearer {login.json()['token']}"}
+
+            for scale in [float(size) for size in args.sizes.split(",")]:
+                label = f"scale-{scale:g}"
+                print(f"\n=== {label} ===")
+                rows, version = await seed(server.db, scale, args.seed)
+                await server.refresh_analytics(version)
+                assert await get_data_version(server.db) == version
+
+                catalog = (await client.get("/api/filters/options", headers=headers)).json()
+                results[label] = {"rows": rows, "routes": {}}
+                for route in ROUTES:
+                    mixes = filter_mixes(catalog, route, args.filter_mixes, rng)
+                    latencies, errors, wall = await drive(
+                        client, headers, route, mixes, args.requests, args.concurrency, rng
+                    )
+                    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+                    stats = {
+                        "p50_ms": round(float(p50), 2),
+                        "p95_ms": round(float(p95), 2),
+                        "p99_ms": round(float(p99), 2),
+                        "requests_per_sec": round(len(latencies) / wall, 1),
+                        "errors": len(errors),
+                        "peak_rss_mb": round(peak_rss_mb(), 1)
+                    }
+                    results[label]["routes"][route] = stats
+                    print(f"  {route:<40} p50={stats['p50_ms']:>8.2f}ms p95={stats['p95_ms']:>8.2f}ms "
+                          f"p99={stats['p99_ms']:>8.2f}ms {stats['requests_per_sec']:>8.1f} req/s "
+                          f"rss={stats['peak_rss_mb']:.0f}MB" + (f" errors={len(errors)}" if errors else ""))
+                    for error in errors[:3]:
+                        print(f"    ❌ {error}")
+    return results
+
+
+def compare(results, baseline, tolerance, min_regression_ms):
+    """Routes whose p95 grew past the baseline by more than the tolerance, that have no
+    baseline, or that returned errors"""
+    failures = []
+    for label, size in results.items():
+        for route, stats in size["routes"].items():
+            if stats["errors"]:
+                failures.append(f"{label} {route}: {stats['errors']} failed requests")
+            previous = baseline.get(label, {}).get("routes", {}).get(route)
+            if not previous:
+                # A route or size the baseline never measured cannot pass the gate
+                failures.append(f"{label} {route}: no baseline - run with --update-baseline to store one")
+                continue
+            limit = previous["p95_ms"] * (1 + tolerance)
+            if stats["p95_ms"] > limit and stats["p95_ms"] - previous["p95_ms"] > min_regression_ms:
+                failures.append(f"{label} {route}: p95 {stats['p95_ms']:.2f}ms > baseline "
+                                f"{previous['p95_ms']:.2f}ms (+{tolerance:.0%} allowed)")
+    return failures
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+    results = asyncio.run(run(args))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2))
+        print(f"\nBaseline written to {baseline_path}")
+        return True
+
+    if not baseline_path.exists():
+        print(f"\nNo baseline at {baseline_path} - run with --update-baseline to store one")
+        return False
+    baseline = json.loads(baseline_path.read_text())
+    failures = compare(results, baseline, args.tolerance, args.min_regression_ms)
+
+    print("\n" + "=" * 60)
+    if failures:
+        print("REGRESSIONS:")
+        for failure in failures:
+            print(f"  - {failure}")
+    else:
+        print("🎉 No regressions against the baseline")
+    return not failures
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -1,5 +1,4 @@
 import React, { useState, useRef, useEffect } from 'react';
-import axios from 'axios';
 import { API, useAuth } from '@/App';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -31,19 +30,59 @@ const AIAssistant = () => {
     setLoading(true);
 
     try {
-      const response = await axios.post(
-        `${API}/ai/chat`,
-        {
+      // Tokens arrive as server-sent events and are appended to the AI message as they come in
+      const response = await fetch(`${API}/ai/chat/stream`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          Authorization: `Bearer ${token}`
+        },
+        body: JSON.stringify({
           message: input,
           session_id: sessionId.current
-        },
-        {
-          headers: { Authorization: `Bearer ${token}` }
-        }
-      );
+        })
+      });
+      if (!response.ok || !response.body) {
+        throw new Error(`AI chat failed with status ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let started = false;
 
-      const aiMessage = { role: 'ai', content: response.data.response };
-      setMessages((prev) => [...prev, aiMessage]);
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const raw of events) {
+          const lines = raw.split('\n');
+          const eventLine = lines.find((line) => line.startsWith('event: '));
+          const dataLine = lines.find((line) => line.startsWith('data: '));
+          if (!dataLine) continue;
+          const eventName = eventLine ? eventLine.slice(7) : 'message';
+          const data = JSON.parse(dataLine.slice(6));
+
+          if (eventName === 'error') {
+            throw new Error(data.detail);
+          }
+          if (eventName === 'message') {
+            if (!started) {
+              started = true;
+              setLoading(false);
+              setMessages((prev) => [...prev, { role: 'ai', content: data.token }]);
+            } else {
+              setMessages((prev) => [
+                ...prev.slice(0, -1),
+                { role: 'ai', content: prev[prev.length - 1].content + data.token }
+              ]);
+            }
+          }
+        }
+      }
     } catch (error) {
       toast.error('AI Assistant is unavailable');
       const errorMessage = {
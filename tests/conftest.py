@@ -0,0 +1,122 @@
+import itertools
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from analytics_query import MONTH_ORDER  # noqa: E402
+
+
+def _convert(parser, spec):
+    """The numeric subset of $convert that analytics_query.to_number uses"""
+    try:
+        value = parser.parse(spec['input'])
+    except KeyError:
+        value = None
+    if value is None:
+        return spec.get('onNull')
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return spec.get('onError')
+    return int(number) if spec['to'] in ('int', 'long') else number
+
+
+def _merge(in_collection, database, options):
+    """$merge of documents without _id, which always inserts; rollup refreshes only merge those"""
+    if in_collection:
+        database.get_collection(options['into']).insert_many(in_collection)
+    return []
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """An in-memory MongoDB database; mongomock lacks $convert and $merge, so they are added here"""
+    mongomock_motor = pytest.importorskip('mongomock_motor')
+    from mongomock import aggregate
+
+    original = aggregate._Parser._handle_type_convertion_operator
+
+    def handle(self, operator, values):
+        if operator == '$convert':
+            return _convert(self, values)
+        return original(self, operator, values)
+
+    monkeypatch.setattr(aggregate._Parser, '_handle_type_convertion_operator', handle)
+    monkeypatch.setitem(aggregate._PIPELINE_HANDLERS, '$merge', _merge)
+    return mongomock_motor.AsyncMongoMockClient()['beaconiq_test']
+
+
+@pytest.fixture(scope='session')
+def server_module():
+    """The server module on an in-memory MongoDB; it reads its settings and
+    creates its client at import time"""
+    mongomock_motor = pytest.importorskip('mongomock_motor')
+    os.environ.update({
+        'MONGO_URL': 'mongodb://localhost:27017',
+        'DB_NAME': 'beaconiq_test',
+        'LLM_PROVIDER': 'fake',
+        'LLM_FAKE_DELAY_SECONDS': '0',
+        'DATA_VERSION_POLL_SECONDS': '3600',
+        'CUBE_SNAPSHOT_DIR': ''
+    })
+    import motor.motor_asyncio
+
+    motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    import server
+    return server
+
+
+@pytest.fixture
+def analytics_server(server_module, mongo_db, monkeypatch):
+    """server computing on `mongo_db` without running its lifespan: no cube and no rollups
+    until a test sets them"""
+    from compute_executor import ComputeExecutor
+    from rollups import RollupRouter
+
+    executor = ComputeExecutor(workers=2)
+    monkeypatch.setattr(server_module, 'db', mongo_db)
+    monkeypatch.setattr(server_module, 'compute_executor', executor)
+    monkeypatch.setattr(server_module, 'rollup_router', RollupRouter())
+    monkeypatch.setattr(server_module.cube_store, 'cube', None)
+    yield server_module
+    executor.shutdown()
+
+
+@pytest.fixture
+def business_rows():
+    """Two years of Jan-Mar business_data with the irregularities real data has:
+    a missing customer, a numeric string, an unparseable and a missing measure,
+    and rows without Board_Category"""
+    rows = []
+    customers = ['Tesco', 'Boots', 'Asda', None]
+    for i, (year, month) in enumerate(itertools.product([2023, 2024], [1, 2, 3])):
+        for j in range(8):
+            row = {
+                'Year': year,
+                'Month': month,
+                'Month_Name': MONTH_ORDER[month - 1][:3],
+                'Period': year * 100 + month,
+                'Business': ['Alpha', 'Beta'][j % 2],
+                'Channel': ['Retail', 'Online'][j // 4],
+                'Customer': customers[(i + j) % 4],
+                'Brand': ['Kinetica', 'Pro Series', 'Value Range'][j % 3],
+                'Category': ['Hair', 'Skin'][j % 2],
+                'Sub_Category': ['Hair Oil', 'Foot Cream', 'Serum'][(i + j) % 3],
+                'Board_Category': ['Personal Care', 'Beauty'][j % 2],
+                'Revenue': float(100 + 10 * i + j),
+                'Gross_Profit': float(30 + i + 2 * j),
+                'Units': float(1 + j)
+            }
+            rows.append(row)
+    rows[3]['Revenue'] = '15.5'
+    rows[5]['Revenue'] = 'n/a'
+    rows[9]['Gross_Profit'] = None
+    del rows[12]['Units']
+    for row in rows[40:]:
+        del row['Board_Category']
+    return rows
@@ -0,0 +1,83 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import jwt
+
+LOGIN = {'email': 'data.admin@thrivebrands.ai', 'password': '123456User'}
+
+
+def parse_events(body: str):
+    """(event name, data) pairs of a server-sent-events body"""
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields.get('event', 'message'), json.loads(fields['data'])))
+    return events
+
+
+def token_for(email, server):
+    return jwt.encode({'email': email, 'exp': datetime.now(timezone.utc) + timedelta(hours=1)},
+                      server.JWT_SECRET, algorithm=server.JWT_ALGORITHM)
+
+
+def run_with_client(server, test):
+    """The app's executors shut down with its lifespan, so it runs once per module"""
+    async def run():
+        async with server.app.router.lifespan_context(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                token = (await client.post('/api/auth/login', json=LOGIN)).json()['token']
+                client.headers['Authorization'] = f'Bearer {token}'
+                await test(client)
+
+    asyncio.run(run())
+
+
+def test_chat_stream_sends_tokens_then_done(server_module):
+    server = server_module
+
+    async def test(client):
+        request = {'message': 'How did Tesco do?', 'session_id': 'stream-test'}
+        anonymous = await client.post('/api/ai/chat/stream', json=request, headers={'Authorization': ''})
+        assert anonymous.status_code in (401, 403)
+
+        response = await client.post('/api/ai/chat/stream', json=request)
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/event-stream')
+
+        events = parse_events(response.text)
+        tokens = [data['token'] for event, data in events if event == 'message']
+        assert len(tokens) > 1
+        assert ''.join(tokens).startswith('VectorDeep AI (offline) received: How did Tesco do?')
+        assert events[-1] == ('done', {'session_id': 'stream-test'})
+
+        # Opening the same question in another session is answered from the cache in one event
+        other = {**request, 'session_id': 'stream-test-2'}
+        events = parse_events((await client.post('/api/ai/chat/stream', json=other)).text)
+        assert [event for event, _ in events] == ['message', 'done']
+        assert events[0][1]['token'] == ''.join(tokens)
+
+        # A follow-up depends on the session, so it is never answered from the cache
+        hits = server.answer_cache.hits
+        events = parse_events((await client.post('/api/ai/chat/stream', json=request)).text)
+        assert len([event for event, _ in events if event == 'message']) > 1
+        assert server.answer_cache.hits == hits
+
+        history = (await client.get('/api/ai/history', params={'session_id': 'stream-test'})).json()
+        assert [turn['ai_response'] for turn in history['turns']] == [''.join(tokens)] * 2
+        assert {turn['user_email'] for turn in history['turns']} == {LOGIN['email']}
+        json.dumps(history)
+
+        # Session ids are guessable; another user sees none of this session and starts their own
+        other_user = {'Authorization': f"Bearer {token_for('analyst@thrivebrands.ai', server)}"}
+        history = (await client.get('/api/ai/history', params={'session_id': 'stream-test'},
+                                    headers=other_user)).json()
+        assert history['turns'] == []
+        hits = server.answer_cache.hits
+        await client.post('/api/ai/chat/stream', json=request, headers=other_user)
+        assert server.answer_cache.hits == hits + 1
+
+    run_with_client(server, test)
+
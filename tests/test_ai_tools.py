@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+
+from ai_tools import MAX_TOOL_CALLS, ToolError, AggregateSpec, parse_tool_call, stream_with_tools
+from llm_client import ScriptedChat
+
+DIMENSIONS = ['Year', 'Business', 'Customer']
+
+
+def run_tools(replies):
+    """Final answer and the messages the model was sent"""
+    model = ScriptedChat(replies)
+    calls = []
+
+    async def execute(call):
+        spec = AggregateSpec.parse(call, DIMENSIONS)
+        calls.append(call)
+        return f"{' | '.join(spec.group_by + spec.measures)}\nTesco | 100.00"
+
+    async def collect():
+        session = model.session('test', 'system')
+        return ''.join([token async for token in stream_with_tools(session, 'question', execute)])
+
+    return asyncio.run(collect()), model.received, calls
+
+
+def tool_call(**call):
+    return f"TOOL_CALL: {json.dumps(call)}"
+
+
+def test_plain_answer_is_streamed_unchanged():
+    answer, received, calls = run_tools(["Revenue grew 12% year over year."])
+    assert answer == "Revenue grew 12% year over year."
+    assert received == ['question']
+    assert calls == []
+
+
+def test_short_answer_is_not_swallowed():
+    answer, _, _ = run_tools(["Yes."])
+    assert answer == "Yes."
+
+
+def test_tool_result_is_sent_back_before_the_answer():
+    answer, received, calls = run_tools([
+        tool_call(group_by=['Customer'], measures=['Revenue'], filters={'Year': ['2024']}),
+        "Tesco had revenue of 100.00."
+    ])
+    assert answer == "Tesco had revenue of 100.00."
+    assert calls == [{'group_by': ['Customer'], 'measures': ['Revenue'], 'filters': {'Year': ['2024']}}]
+    assert received[1] == "TOOL_RESULT:\nCustomer | Revenue\nTesco | 100.00"
+
+
+def test_bad_calls_are_returned_to_the_model_as_errors():
+    answer, received, calls = run_tools([
+        "TOOL_CALL: not json",
+        tool_call(group_by=['Region']),
+        "I can only group by the listed dimensions."
+    ])
+    assert answer == "I can only group by the listed dimensions."
+    assert received[1] == "TOOL_ERROR: TOOL_CALL must be followed by one JSON object"
+    assert received[2].startswith("TOOL_ERROR: Unknown dimensions ['Region']")
+    assert calls == []
+
+
+def test_tool_calls_are_capped():
+    replies = [tool_call(group_by=['Business'])] * (MAX_TOOL_CALLS + 1)
+    answer, received, calls = run_tools(replies)
+    assert answer == "Sorry, I could not compute that figure."
+    assert len(calls) == MAX_TOOL_CALLS
+    assert len(received) == MAX_TOOL_CALLS + 1
+
+
+def test_parse_tool_call_ignores_answers_and_trailing_text():
+    assert parse_tool_call("Revenue was flat.") is None
+    assert parse_tool_call('TOOL_CALL: {"group_by": []} thanks') == {'group_by': []}
+
+
+def test_spec_validates_measures_and_years():
+    spec = AggregateSpec.parse({'filters': {'Year': 2024}, 'limit': 500}, DIMENSIONS)
+    assert spec.filters == {'Year': [2024]}
+    assert spec.limit == 50
+    for call in ({'measures': ['Margin']}, {'filters': {'Year': ['last year']}}, {'tool': 'sql'}):
+        with pytest.raises(ToolError):
+            AggregateSpec.parse(call, DIMENSIONS)
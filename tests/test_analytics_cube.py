@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from analytics_cube import AnalyticsCube
+
+ENDPOINTS = ['executive_overview', 'customer_analysis', 'brand_analysis', 'category_analysis']
+FILTERS = [
+    {},
+    {'Year': [2024]},
+    {'Year': [2023], 'Month_Name': ['Feb', 'Mar'], 'Channel': ['Retail']},
+    {'Customer': ['Tesco', 'Nobody'], 'Brand': ['Kinetica']},
+    {'Category': ['Skin'], 'Business': ['Beta']},
+    # Members that do not exist match nothing on either path
+    {'Business': ['Nobody']},
+    {'Year': [1999]}
+]
+
+
+def normalized(value):
+    """Rounded numbers and lists in a stable order, so the two paths compare equal
+    whichever order groups come out in"""
+    if isinstance(value, dict):
+        return {key: normalized(item) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [normalized(item) for item in value]
+        return sorted(items, key=repr)
+    if isinstance(value, float):
+        return round(value, 2)
+    return value
+
+
+def compute_both(server, rows, endpoint, filters):
+    compute = getattr(server, f'compute_{endpoint}')
+
+    async def run():
+        await server.db.business_data.insert_many(rows)
+        from_mongo = await compute(dict(filters))
+        server.cube_store.cube = await AnalyticsCube.load(server.db.business_data)
+        from_cube = await compute(dict(filters))
+        return from_cube, from_mongo
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+def test_cube_matches_mongo(analytics_server, business_rows, endpoint, filters):
+    from_cube, from_mongo = compute_both(analytics_server, business_rows, endpoint, filters)
+    assert normalized(from_cube) == normalized(from_mongo)
+
+
+def test_unknown_members_return_no_data(analytics_server, business_rows):
+    from_cube, from_mongo = compute_both(analytics_server, business_rows, 'customer_analysis',
+                                         {'Customer': ['Nobody']})
+    assert from_cube == from_mongo == {"error": "No data available"}
+
+
+def test_missing_and_malformed_measures_count_as_zero(mongo_db, business_rows):
+    async def load():
+        await mongo_db.business_data.insert_many(business_rows)
+        return await AnalyticsCube.load(mongo_db.business_data)
+
+    cube = asyncio.run(load())
+    expected_revenue = sum(float(row['Revenue']) for row in business_rows if row['Revenue'] != 'n/a')
+    totals = cube.totals()
+    assert totals['Revenue'] == pytest.approx(expected_revenue)
+    assert totals['Units'] == pytest.approx(sum(row.get('Units', 0) for row in business_rows))
+
+
+def test_group_sum_skips_rows_missing_the_dimension(mongo_db, business_rows):
+    async def load():
+        await mongo_db.business_data.insert_many(business_rows)
+        return await AnalyticsCube.load(mongo_db.business_data)
+
+    cube = asyncio.run(load())
+    rows = cube.group_sum(['Customer'], cube.mask({'Year': [2024]}), ['Units'])
+    expected = {}
+    for row in business_rows:
+        if row['Year'] == 2024 and row['Customer'] is not None:
+            expected[row['Customer']] = expected.get(row['Customer'], 0) + row.get('Units', 0)
+    assert {row['Customer']: row['Units'] for row in rows} == expected
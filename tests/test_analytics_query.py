@@ -0,0 +1,58 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from analytics_cube import AnalyticsCube
+from analytics_query import PeriodRange, build_match, period_key, period_range
+
+
+def test_period_range_from_query_parameters():
+    assert period_range(None, None) == {}
+    assert period_range('202401', None) == {'Period': PeriodRange(202401, None)}
+    assert period_range(None, '202312') == {'Period': PeriodRange(None, 202312)}
+    assert period_range('', '202312') == {'Period': PeriodRange(None, 202312)}
+
+
+@pytest.mark.parametrize('period_filter, match', [
+    (PeriodRange(202401, 202403), {'$gte': 202401, '$lte': 202403}),
+    (PeriodRange(202401, None), {'$gte': 202401}),
+    (PeriodRange(None, 202403), {'$lte': 202403}),
+    (PeriodRange(None, None), {})
+])
+def test_period_range_match(period_filter, match):
+    assert build_match({'Period': period_filter, 'Year': [2024]}) == {'Period': match, 'Year': {'$in': [2024]}}
+
+
+@pytest.mark.parametrize('period_filter, inside', [
+    (PeriodRange(202312, 202402), [False, True, True, True, False]),
+    (PeriodRange(202401, None), [False, False, True, True, True]),
+    (PeriodRange(None, 202312), [True, True, False, False, False]),
+    (PeriodRange(None, None), [True] * 5)
+])
+def test_contains_agrees_on_scalars_and_arrays(period_filter, inside):
+    periods = [202311, 202312, 202401, 202402, 202403]
+    assert [bool(period_filter.contains(period)) for period in periods] == inside
+    assert np.broadcast_to(period_filter.contains(np.array(periods)), len(periods)).tolist() == inside
+
+
+def test_period_key():
+    assert period_key(2024, 3) == 202403
+    assert period_key('2023', '11') == 202311
+    assert period_key(2024, None) is None
+
+
+@pytest.mark.parametrize('period_filter', [PeriodRange(202302, 202402), PeriodRange(202402, None),
+                                           PeriodRange(None, 202301)])
+def test_cube_and_mongo_apply_period_ranges_alike(analytics_server, business_rows, period_filter):
+    server = analytics_server
+
+    async def run():
+        await server.db.business_data.insert_many(business_rows)
+        from_mongo = await server.compute_customer_analysis({'Period': period_filter})
+        server.cube_store.cube = await AnalyticsCube.load(server.db.business_data)
+        return await server.compute_customer_analysis({'Period': period_filter}), from_mongo
+
+    from_cube, from_mongo = asyncio.run(run())
+    assert from_cube['customer_performance']
+    assert sorted(map(repr, from_cube['customer_performance'])) == sorted(map(repr, from_mongo['customer_performance']))
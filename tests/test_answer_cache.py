@@ -0,0 +1,32 @@
+from answer_cache import AnswerCache
+
+QUESTION = "What was revenue for Tesco in Q2 2024 vs 2023?"
+
+
+def near_match_cache():
+    cache = AnswerCache(similarity=0.8)
+    cache.set_members(['Tesco', 'Tesco Ireland', 'Boots', 'Hair Oil'])
+    cache.put(QUESTION, 1, 'answer')
+    return cache
+
+
+def test_exact_question_hits_regardless_of_case_and_punctuation():
+    cache = AnswerCache()
+    cache.put(QUESTION, 1, 'answer')
+    assert cache.get("what was revenue for TESCO in q2 2024 vs 2023", 1) == 'answer'
+    assert cache.get(QUESTION, 2) is None
+
+
+def test_near_match_ignores_wording():
+    assert near_match_cache().get("What was the revenue for Tesco in Q2 2024 vs 2023", 1) == 'answer'
+
+
+def test_near_match_needs_the_same_periods_and_members():
+    cache = near_match_cache()
+    for question in ("What was revenue for Tesco in Q3 2024 vs 2023?",
+                     "What was revenue for Tesco in Q2 2023 vs 2024?",
+                     "What was revenue for Tesco in March 2024 vs 2023?",
+                     "What was revenue for Boots in Q2 2024 vs 2023?",
+                     "What was revenue for Tesco Ireland in Q2 2024 vs 2023?"):
+        assert cache.get(question, 1) is None, question
+    assert cache.stats()['near_hits'] == 0
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from bulk_loader import BulkLoader
+
+
+class FailingCollection:
+    """Fails every insert_many after the first `good` batches"""
+
+    name = 'failing'
+
+    def __init__(self, good: int = 0):
+        self.good = good
+        self.inserted = []
+
+    async def insert_many(self, batch, ordered=True):
+        await asyncio.sleep(0)
+        if len(self.inserted) >= self.good:
+            raise RuntimeError('write failed')
+        self.inserted.append(batch)
+
+
+def test_batches_are_written_and_counted(mongo_db):
+    async def load():
+        async with BulkLoader(mongo_db.rows, batch_size=4, concurrency=2) as loader:
+            await loader.add_many([{'n': n} for n in range(10)])
+            await loader.add({'n': 10})
+        return loader, await mongo_db.rows.count_documents({})
+
+    loader, count = asyncio.run(load())
+    assert count == 11
+    assert (loader.stats.rows, loader.stats.batches) == (11, 3)
+
+
+def test_a_failed_write_is_raised_on_exit():
+    collection = FailingCollection(good=1)
+
+    async def load():
+        loader = BulkLoader(collection, batch_size=2, concurrency=1)
+        with pytest.raises(RuntimeError):
+            async with loader:
+                await loader.add_many([{'n': n} for n in range(4)])
+        return loader
+
+    loader = asyncio.run(load())
+    assert loader.stats.rows == 2
+    assert all(writer.done() for writer in loader._writers)
+
+
+def test_writers_stop_when_the_final_flush_fails():
+    collection = FailingCollection()
+
+    async def load():
+        loader = BulkLoader(collection, batch_size=2, concurrency=2)
+        with pytest.raises(RuntimeError):
+            async with loader:
+                await loader.add_many([{'n': 0}, {'n': 1}])
+                # Let the writer fail, so flushing the leftover row raises
+                while loader._error is None:
+                    await asyncio.sleep(0)
+                await loader.add({'n': 2})
+        return loader
+
+    loader = asyncio.run(load())
+    assert loader.stats is not None
+    assert all(writer.done() for writer in loader._writers)
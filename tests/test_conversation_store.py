@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime, timezone
+
+from conversation_store import ConversationStore
+
+
+def test_string_timestamps_are_migrated_to_dates(mongo_db):
+    store = ConversationStore(mongo_db.ai_conversations)
+    turns = [
+        {'_id': 1, 'session_id': 's', 'user_message': 'first', 'timestamp': '2024-05-01T10:00:00.123456+00:00'},
+        {'_id': 2, 'session_id': 's', 'user_message': 'second', 'timestamp': '2024-05-01T09:00:00'},
+        {'_id': 3, 'session_id': 's', 'user_message': 'third', 'timestamp': datetime(2024, 5, 2, tzinfo=timezone.utc)},
+        {'_id': 4, 'session_id': 's', 'user_message': 'broken', 'timestamp': 'yesterday'}
+    ]
+
+    async def migrate():
+        await mongo_db.ai_conversations.insert_many(turns)
+        migrated = await store.migrate_timestamps(batch_size=1)
+        docs = await mongo_db.ai_conversations.find({}).sort('_id', 1).to_list(None)
+        return migrated, docs, await store.migrate_timestamps()
+
+    migrated, docs, again = asyncio.run(migrate())
+    assert (migrated, again) == (2, 0)
+    assert [doc['timestamp'].replace(tzinfo=None) for doc in docs[:3]] == [
+        datetime(2024, 5, 1, 10, 0, 0, 123000), datetime(2024, 5, 1, 9), datetime(2024, 5, 2)]
+    assert docs[3]['timestamp'] == 'yesterday'
+
+
+def test_recent_turns_only_returns_the_users_own_turns(mongo_db):
+    store = ConversationStore(mongo_db.ai_conversations)
+
+    def turn(user, message, hour):
+        return {'session_id': 'shared', 'user_email': user, 'user_message': message,
+                'timestamp': datetime(2024, 5, 1, hour, tzinfo=timezone.utc)}
+
+    async def recent():
+        await mongo_db.ai_conversations.insert_many([turn('a@x', 'a1', 1), turn('b@x', 'b1', 2)])
+        # Unflushed turns are filtered the same way
+        store.add(turn('a@x', 'a2', 3))
+        store.add(turn('b@x', 'b2', 4))
+        return await store.recent_turns('shared', 'a@x'), await store.recent_turns('shared', 'c@x')
+
+    own, stranger = asyncio.run(recent())
+    assert [row['user_message'] for row in own] == ['a1', 'a2']
+    assert stranger == []
@@ -0,0 +1,69 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from analytics_cube import AnalyticsCube, CubeStore  # noqa: E402
+from cube_snapshot import load_snapshot, save_snapshot, snapshot_path  # noqa: E402
+
+
+def load_cube(db, rows):
+    async def load():
+        await db.business_data.insert_many([dict(row) for row in rows])
+        return await AnalyticsCube.load(db.business_data)
+
+    return asyncio.run(load())
+
+
+def test_snapshot_round_trip(mongo_db, business_rows, tmp_path):
+    cube = load_cube(mongo_db, business_rows)
+    save_snapshot(cube, tmp_path, 3)
+    mapped = AnalyticsCube(*load_snapshot(tmp_path, 3))
+
+    assert mapped.n_rows == cube.n_rows
+    assert mapped.present == cube.present
+    for dim, codes in cube.codes.items():
+        assert np.array_equal(mapped.codes[dim], codes)
+        assert mapped.dictionaries[dim].tolist() == cube.dictionaries[dim].tolist()
+        assert mapped.dictionaries[dim].dtype == cube.dictionaries[dim].dtype
+    filters = {'Year': [2024], 'Customer': ['Tesco']}
+    assert mapped.group_sum(['Brand'], mapped.mask(filters)) == cube.group_sum(['Brand'], cube.mask(filters))
+    assert mapped.totals() == cube.totals()
+
+
+def test_stale_or_unreadable_snapshots_are_rejected(mongo_db, business_rows, tmp_path):
+    cube = load_cube(mongo_db, business_rows)
+    save_snapshot(cube, tmp_path, 3)
+    assert load_snapshot(tmp_path, 4) is None
+
+    # A file renamed to another version still carries its own version in its metadata
+    snapshot_path(tmp_path, 3).rename(snapshot_path(tmp_path, 4))
+    assert load_snapshot(tmp_path, 4) is None
+
+    snapshot_path(tmp_path, 5).write_bytes(b'not arrow')
+    assert load_snapshot(tmp_path, 5) is None
+
+
+def test_saving_removes_older_snapshots(mongo_db, business_rows, tmp_path):
+    cube = load_cube(mongo_db, business_rows)
+    save_snapshot(cube, tmp_path, 1)
+    save_snapshot(cube, tmp_path, 2)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [snapshot_path(tmp_path, 2).name]
+
+
+def test_store_reloads_when_the_data_changed_without_a_version_bump(mongo_db, business_rows, tmp_path):
+    store = CubeStore(snapshot_dir=tmp_path)
+
+    async def refresh():
+        await mongo_db.business_data.insert_many([dict(row) for row in business_rows])
+        first = await store.refresh(mongo_db.business_data, 1)
+        await mongo_db.business_data.delete_many({'Year': 2023})
+        return first, await store.refresh(mongo_db.business_data, 1)
+
+    first, second = asyncio.run(refresh())
+    assert first.n_rows == len(business_rows)
+    assert second.n_rows == len([row for row in business_rows if row['Year'] != 2023])
+    # The stale snapshot was replaced by one of the reloaded cube
+    assert load_snapshot(tmp_path, 1)[2]['Revenue'].shape == (second.n_rows,)
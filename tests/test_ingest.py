@@ -0,0 +1,119 @@
+import asyncio
+import codecs
+import os
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from ingest import SYNC_STATE_COLLECTION, CsvChunkParser, LocalFileSource, backfill_periods, ingest_csv, save_watermark
+
+
+class Record(BaseModel):
+    Year: int
+    Month_Name: str
+    Customer: Optional[str] = None
+    Sub_Cat: Optional[str] = None
+    Revenue: float = 0.0
+
+
+CSV = (
+    'Year,Month_Name,Customer,Sub_Category,gSales\n'
+    '2024,January,"Tesco, Ireland",Hair Oil,"1,200.50"\n'
+    '2024,February,"Boots\nUK",Foot Cream,300\n'
+    '2024,March,"Say ""hi""",Hair Oil,10\n'
+)
+
+
+def parse_in_chunks(data: bytes, size: int):
+    parser = CsvChunkParser(Record)
+    docs = []
+    for start in range(0, len(data), size):
+        docs += parser.feed(data[start:start + size])
+    return docs + parser.close()
+
+
+@pytest.mark.parametrize('size', [1, 2, 7, 64, 4096])
+def test_parser_carries_quoted_fields_across_chunks(size):
+    docs = parse_in_chunks(CSV.encode(), size)
+    assert [doc['Customer'] for doc in docs] == ['Tesco, Ireland', 'Boots\nUK', 'Say "hi"']
+    assert [doc['Revenue'] for doc in docs] == [1200.5, 300.0, 10.0]
+    assert [doc['Period'] for doc in docs] == [202401, 202402, 202403]
+    assert docs[0]['Sub_Cat'] == docs[0]['Sub_Category'] == 'Hair Oil'
+
+
+def test_parser_handles_a_bom_split_across_chunks():
+    docs = parse_in_chunks(codecs.BOM_UTF8 + CSV.encode(), 1)
+    assert docs[0]['Year'] == 2024
+
+
+def test_parser_skips_rows_missing_required_fields():
+    docs = parse_in_chunks(b'Year,Month_Name,gSales\n,January,5\n2024,May,6\n', 4096)
+    assert [(doc['Year'], doc['Month']) for doc in docs] == [(2024, 5)]
+
+
+def write_csv(path, rows, mtime):
+    lines = ['Year,Month_Name,Customer,gSales'] + [','.join(map(str, row)) for row in rows]
+    path.write_text('\n'.join(lines) + '\n')
+    os.utime(path, (mtime, mtime))
+
+
+def test_ingest_replaces_partitions_from_the_watermark(tmp_path):
+    mongomock_motor = pytest.importorskip('mongomock_motor')
+    db = mongomock_motor.AsyncMongoMockClient()['ingest_test']
+    path = tmp_path / 'business.csv'
+    source = LocalFileSource(str(path))
+
+    async def ingest(publish=True):
+        stats = await ingest_csv(source, db, Record)
+        if publish:
+            await save_watermark(db, stats)
+        return stats
+
+    async def revenue_by_month():
+        docs = await db.business_data.find({}, {'_id': 0}).to_list(None)
+        totals = {}
+        for doc in docs:
+            totals[doc['Month']] = totals.get(doc['Month'], 0) + doc['Revenue']
+        return totals
+
+    write_csv(path, [(2024, 'January', 'Tesco', 10), (2024, 'February', 'Tesco', 20)], 1_700_000_000)
+    # A load whose follow-up work failed leaves no watermark and is repeated in full
+    assert asyncio.run(ingest(publish=False)).partitions == [202401, 202402]
+    assert asyncio.run(db[SYNC_STATE_COLLECTION].find_one({'_id': source.name})) is None
+    stats = asyncio.run(ingest())
+    assert (stats.rows, stats.partitions) == (2, [202401, 202402])
+    assert asyncio.run(db[SYNC_STATE_COLLECTION].find_one({'_id': source.name}))['period'] == 202402
+
+    # Same ETag: nothing is read
+    assert asyncio.run(ingest()).unchanged
+
+    # January is before the watermark and is kept even though the file changed it;
+    # February is reloaded and March is new
+    write_csv(path, [(2024, 'January', 'Tesco', 99), (2024, 'February', 'Tesco', 25),
+                     (2024, 'March', 'Boots', 30)], 1_700_000_100)
+    stats = asyncio.run(ingest())
+    assert stats.partitions == [202402, 202403]
+    assert asyncio.run(revenue_by_month()) == {1: 10, 2: 25, 3: 30}
+    assert asyncio.run(db[SYNC_STATE_COLLECTION].find_one({'_id': source.name}))['period'] == 202403
+
+
+def test_backfill_periods_on_legacy_rows(mongo_db):
+    rows = [
+        {'_id': 1, 'Year': 2024, 'Month': 3},
+        {'_id': 2, 'Year': '2023', 'Month': '11'},
+        {'_id': 3, 'Year': 2024, 'Month': None},
+        {'_id': 4, 'Year': 2024},
+        {'_id': 5, 'Year': 2024, 'Month': 1, 'Period': 202401}
+    ]
+
+    async def backfill():
+        await mongo_db.business_data.insert_many(rows)
+        modified = await backfill_periods(mongo_db.business_data)
+        docs = await mongo_db.business_data.find({}).sort('_id', 1).to_list(None)
+        # A second run finds nothing left to do
+        return modified, docs, await backfill_periods(mongo_db.business_data)
+
+    modified, docs, again = asyncio.run(backfill())
+    assert (modified, again) == (2, 0)
+    assert [doc.get('Period') for doc in docs] == [202403, 202311, None, None, 202401]
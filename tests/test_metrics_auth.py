@@ -0,0 +1,30 @@
+import asyncio
+
+import httpx
+
+from .test_ai_stream import token_for
+
+
+def scrape(server, headers):
+    async def get():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await client.get('/api/metrics', headers=headers)
+
+    return asyncio.run(get())
+
+
+def test_metrics_require_a_user_or_the_scrape_token(server_module, monkeypatch):
+    server = server_module
+    monkeypatch.setattr(server, 'METRICS_TOKEN', 'scrape-secret')
+
+    assert scrape(server, {}).status_code in (401, 403)
+    assert scrape(server, {'Authorization': 'Bearer wrong'}).status_code == 401
+    assert scrape(server, {'Authorization': 'Bearer scrape-secret'}).status_code == 200
+    user = {'Authorization': f"Bearer {token_for('data.admin@thrivebrands.ai', server)}"}
+    assert scrape(server, user).status_code == 200
+
+    # Without a configured token only signed-in users can scrape
+    monkeypatch.setattr(server, 'METRICS_TOKEN', None)
+    assert scrape(server, {'Authorization': 'Bearer scrape-secret'}).status_code == 401
+    assert scrape(server, user).text.startswith('#')
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from analytics_cube import AnalyticsCube
+from analytics_query import Page, parse_page
+
+PAGED_LISTS = {
+    'customer_analysis': ['customer_performance', 'top_customers'],
+    'brand_analysis': ['brand_performance'],
+    'category_analysis': ['category_performance', 'subcategory_performance']
+}
+PAGES = [
+    Page('Revenue', True, 0, 2),
+    Page('Units', False, 1, 2),
+    Page('Gross_Profit', True, 2, None),
+    # Past the last group: an empty page that still reports the totals
+    Page('Revenue', True, 50, 5)
+]
+
+
+def rounded(value):
+    if isinstance(value, dict):
+        return {key: rounded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [rounded(item) for item in value]
+    return round(value, 2) if isinstance(value, float) else value
+
+
+def compute_both(server, rows, endpoint, filters, page):
+    compute = getattr(server, f'compute_{endpoint}')
+
+    async def run():
+        await server.db.business_data.insert_many([dict(row) for row in rows])
+        from_mongo = await compute(dict(filters), page)
+        server.cube_store.cube = await AnalyticsCube.load(server.db.business_data)
+        from_cube = await compute(dict(filters), page)
+        return from_cube, from_mongo
+
+    return asyncio.run(run())
+
+
+def test_parse_page():
+    assert parse_page(None, 0, None, 'desc') is None
+    assert parse_page(10, 0, None, 'desc') == Page('Revenue', True, 0, 10)
+    assert parse_page(None, 5, 'Units', 'asc') == Page('Units', False, 5, None)
+
+
+@pytest.mark.parametrize('page', PAGES)
+@pytest.mark.parametrize('endpoint', list(PAGED_LISTS))
+def test_cube_and_mongo_pages_agree(analytics_server, business_rows, endpoint, page):
+    from_cube, from_mongo = compute_both(analytics_server, business_rows, endpoint, {'Year': [2024]}, page)
+    assert from_cube['page'] == from_mongo['page']
+    for name in PAGED_LISTS[endpoint]:
+        # Order matters here: it is the page
+        assert rounded(from_cube[name]) == rounded(from_mongo[name]), name
+
+
+def test_customer_count_excludes_missing_customers(analytics_server, business_rows):
+    page = Page('Revenue', True, 0, 1)
+    for from_path in compute_both(analytics_server, business_rows, 'customer_analysis', {}, page):
+        assert from_path['page']['total'] == {'customer_performance': 3}
+        assert len(from_path['customer_performance']) == 1
+
+
+TIED = [
+    {'Year': 2024, 'Month': 1, 'Month_Name': 'Jan', 'Period': 202401, 'Business': 'Alpha', 'Channel': 'Retail',
+     'Customer': customer, 'Brand': brand, 'Category': 'Hair', 'Sub_Category': 'Serum',
+     'Board_Category': 'Beauty', 'Revenue': revenue, 'Gross_Profit': 1.0, 'Units': 1.0}
+    for customer, brand, revenue in [('Cobb', 'Zeta', 10.0), ('Abel', 'Alto', 10.0), ('Bree', 'Mira', 10.0),
+                                     ('Dale', 'Nova', 5.0)]
+]
+
+
+@pytest.mark.parametrize('descending, expected', [
+    (True, ['Abel', 'Bree', 'Cobb', 'Dale']),
+    (False, ['Dale', 'Abel', 'Bree', 'Cobb'])
+])
+def test_ties_are_ordered_by_key_and_pages_never_overlap(analytics_server, descending, expected):
+    for offset in range(4):
+        page = Page('Revenue', descending, offset, 1)
+        for from_path in compute_both(analytics_server, TIED, 'customer_analysis', {}, page):
+            assert [row['Customer'] for row in from_path['customer_performance']] == expected[offset:offset + 1]
+        analytics_server.cube_store.cube = None
+        asyncio.run(analytics_server.db.business_data.delete_many({}))
+
+
+def test_unpaged_requests_keep_the_full_lists(analytics_server, business_rows):
+    for from_path in compute_both(analytics_server, business_rows, 'brand_analysis', {}, None):
+        assert 'page' not in from_path
+        assert len(from_path['brand_performance']) == 3
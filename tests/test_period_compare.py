@@ -0,0 +1,128 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from analytics_cube import AnalyticsCube
+from analytics_query import PeriodRange, build_match
+from period_compare import (
+    COMPARISONS, Comparison, _pct, _shift, compare_periods, comparison_docs, comparison_pipeline,
+    cube_comparison, parse_comparison, scan_filters
+)
+
+ALL = Comparison(tuple(COMPARISONS), 'Business', 'Revenue')
+
+# Business A: 2023 Jan-Mar and 2024 Jan-Mar, with a zero in Feb 2024;
+# Business B only has February of each year
+ROWS = [
+    {'Business': 'A', 'Year': 2023, 'Month_Name': 'Jan', 'Revenue': 10.0},
+    {'Business': 'A', 'Year': 2023, 'Month_Name': 'Feb', 'Revenue': 20.0},
+    {'Business': 'A', 'Year': 2023, 'Month_Name': 'Mar', 'Revenue': 30.0},
+    {'Business': 'B', 'Year': 2023, 'Month_Name': 'February', 'Revenue': 5.0},
+    {'Business': 'A', 'Year': 2024, 'Month_Name': 'Jan', 'Revenue': 15.0},
+    {'Business': 'A', 'Year': 2024, 'Month_Name': 'Feb', 'Revenue': 0.0},
+    {'Business': 'A', 'Year': 2024, 'Month_Name': 'Mar', 'Revenue': 45.0},
+    {'Business': 'B', 'Year': 2024, 'Month_Name': 'Feb', 'Revenue': 10.0},
+    # Not a month: ignored
+    {'Business': 'A', 'Year': 2024, 'Month_Name': 'Total', 'Revenue': 999.0}
+]
+
+METRICS = ['mom_pct', 'yoy_pct', 'ytd', 'prior_ytd', 'ytd_pct', 'rolling_3', 'rolling_12']
+EXPECTED = {
+    # (Business, Period): mom, yoy, ytd, prior ytd, ytd %, rolling 3, rolling 12
+    ('A', 202301): (None, None, 10.0, None, None, None, None),
+    ('A', 202302): (100.0, None, 30.0, None, None, None, None),
+    ('A', 202303): (50.0, None, 60.0, None, None, 60.0, None),
+    ('A', 202401): (None, 50.0, 15.0, 10.0, 50.0, 15.0, 65.0),
+    ('A', 202402): (-100.0, -100.0, 15.0, 30.0, -50.0, 15.0, 45.0),
+    ('A', 202403): (None, 50.0, 60.0, 60.0, 0.0, 60.0, 60.0),
+    ('B', 202302): (None, None, 5.0, None, None, None, None),
+    ('B', 202402): (None, 100.0, 10.0, 5.0, 100.0, 10.0, 10.0),
+}
+
+
+def by_key(result):
+    return {(row['Business'], row['Period']): row for row in result['rows']}
+
+
+def test_shift_moves_columns_right_and_zero_fills():
+    grid = np.array([[1.0, 2.0, 3.0]])
+    assert _shift(grid, 1).tolist() == [[0.0, 1.0, 2.0]]
+    assert _shift(grid, 3).tolist() == [[0.0, 0.0, 0.0]]
+    assert _shift(grid, 12).tolist() == [[0.0, 0.0, 0.0]]
+
+
+def test_pct_is_nan_for_zero_or_invalid_bases():
+    current, previous = np.array([5.0, 5.0, 5.0, -5.0]), np.array([0.0, 4.0, 4.0, -10.0])
+    valid = np.array([True, True, False, True])
+    assert np.allclose(_pct(current, previous, valid), [np.nan, 25.0, np.nan, 50.0], equal_nan=True)
+
+
+def test_compare_periods_matches_hand_computed_values():
+    result = compare_periods(ROWS, ALL)
+    assert result['metrics'] == COMPARISONS
+    rows = by_key(result)
+    assert list(rows) == list(EXPECTED)
+    for key, expected in EXPECTED.items():
+        assert tuple(rows[key][metric] for metric in METRICS) == expected, key
+    assert rows[('A', 202402)]['Revenue'] == 0.0
+    assert (rows[('A', 202402)]['Year'], rows[('A', 202402)]['Month']) == (2024, 2)
+
+
+def test_only_requested_metrics_are_returned():
+    row = compare_periods(ROWS, parse_comparison('yoy', None, 'Revenue'))['rows'][-1]
+    assert row == {'Period': 202403, 'Year': 2024, 'Month': 3, 'Revenue': 45.0, 'yoy_pct': 50.0}
+
+
+def test_overall_comparison_sums_members():
+    rows = compare_periods(ROWS, Comparison(('mom',), None, 'Revenue'))['rows']
+    assert [(row['Period'], row['Revenue'], row['mom_pct']) for row in rows] == [
+        (202301, 10.0, None), (202302, 25.0, 150.0), (202303, 30.0, 20.0),
+        (202401, 15.0, None), (202402, 10.0, -33.33), (202403, 45.0, 350.0)
+    ]
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ({'Year': [2024]}, [('A', 202401), ('A', 202402), ('A', 202403), ('B', 202402)]),
+    ({'Month_Name': ['February']}, [('A', 202302), ('A', 202402), ('B', 202302), ('B', 202402)]),
+    ({'Period': PeriodRange(202402, None)}, [('A', 202402), ('A', 202403), ('B', 202402)]),
+    ({'Year': [2024], 'Period': PeriodRange(None, 202401)}, [('A', 202401)])
+])
+def test_period_filters_select_rows_after_computing(filters, expected):
+    rows = by_key(compare_periods(ROWS, ALL, filters))
+    assert list(rows) == expected
+    # Values still come from the months the filters leave out
+    for key in expected:
+        assert tuple(rows[key][metric] for metric in METRICS) == EXPECTED[key]
+
+
+def test_scan_filters_keep_only_non_period_filters():
+    filters = {'Year': [2024], 'Month_Name': ['Jan'], 'Period': PeriodRange(202401, None), 'Business': ['A']}
+    assert scan_filters(filters) == {'Business': ['A']}
+
+
+def test_empty_input():
+    assert compare_periods([], ALL)['rows'] == []
+
+
+@pytest.mark.parametrize('comparison, filters', [
+    (ALL, {}),
+    (Comparison(('yoy', 'ytd'), 'Customer', 'Gross_Profit'), {'Year': [2024], 'Channel': ['Retail']}),
+    (Comparison(('mom', 'rolling3'), None, 'Units'), {'Period': PeriodRange(202302, 202402)})
+])
+def test_cube_and_mongo_comparisons_agree(mongo_db, business_rows, comparison, filters):
+    async def compare():
+        await mongo_db.business_data.insert_many(business_rows)
+        cube = await AnalyticsCube.load(mongo_db.business_data)
+        pipeline = comparison_pipeline(build_match(scan_filters(filters)), comparison)
+        docs = await mongo_db.business_data.aggregate(pipeline).to_list(None)
+        from_mongo = compare_periods(comparison_docs(docs, comparison), comparison, filters)
+        return cube_comparison(cube, filters, comparison), from_mongo
+
+    from_cube, from_mongo = asyncio.run(compare())
+    assert from_cube['rows']
+
+    def key(row):
+        return tuple(str(row.get(dim)) for dim in comparison.dims) + (row['Period'],)
+
+    assert sorted(from_cube['rows'], key=key) == sorted(from_mongo['rows'], key=key)
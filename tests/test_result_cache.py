@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from analytics_query import PeriodRange
+from data_version import DataVersionTracker
+from ingest import IngestStats
+from result_cache import ResultCache, cache_entry_unaffected, serialize
+
+
+def key(filters=None, **params):
+    return ResultCache.make_key('executive_overview', filters or {}, **params)
+
+
+def test_equivalent_filter_sets_share_a_key():
+    assert key({'Year': [2024, 2023, 2024], 'Channel': []}) == key({'Year': [2023, 2024]})
+
+
+def test_entries_from_another_version_miss_and_are_dropped():
+    cache = ResultCache()
+    cache.put(key(), 1, {'total': 1})
+    assert cache.get(key(), 1) == serialize({'total': 1})
+    assert cache.get(key(), 2) is None
+    assert cache.get(key(), 1) is None
+    assert (cache.hits, cache.misses, cache.bytes) == (1, 2, 0)
+
+
+def test_eviction_keeps_the_total_under_the_byte_budget():
+    body = len(serialize({'value': 'x' * 10}))
+    cache = ResultCache(max_bytes=2 * body)
+    cache.put(key({'Year': [1]}), 1, {'value': 'x' * 10})
+    cache.put(key({'Year': [2]}), 1, {'value': 'y' * 10})
+    # Reading the first entry makes the second the least recently used
+    assert cache.get(key({'Year': [1]}), 1) is not None
+    cache.put(key({'Year': [3]}), 1, {'value': 'z' * 10})
+    assert cache.get(key({'Year': [2]}), 1) is None
+    assert cache.get(key({'Year': [1]}), 1) is not None
+    assert (cache.evictions, cache.bytes) == (1, 2 * body)
+
+
+def test_results_larger_than_the_budget_are_not_stored():
+    cache = ResultCache(max_bytes=10)
+    assert cache.put(key(), 1, {'value': 'x' * 20}) == serialize({'value': 'x' * 20})
+    assert cache.stats()['entries'] == 0
+
+
+@pytest.mark.parametrize('filters, params, unaffected', [
+    ({'Year': [2023]}, {}, True),
+    ({'Year': [2023, 2024]}, {}, False),
+    ({}, {}, False),
+    ({'Channel': ['Retail']}, {}, False),
+    ({'Period': PeriodRange(202301, 202312)}, {}, True),
+    ({'Period': PeriodRange(202401, None)}, {}, False),
+    ({'Period': PeriodRange(None, 202402)}, {}, False),
+    # Paged and compared responses carry params and are always recomputed
+    ({'Year': [2023]}, {'limit': 10}, False)
+])
+def test_cache_entry_unaffected(filters, params, unaffected):
+    assert cache_entry_unaffected(key(filters, **params), [202402, 202403]) is unaffected
+
+
+def test_carry_over_retags_valid_entries_and_drops_the_rest():
+    cache = ResultCache()
+    cache.put(key({'Year': [2023]}), 1, {'year': 2023})
+    cache.put(key({'Year': [2024]}), 1, {'year': 2024})
+    cache.put(key({'Year': [2022]}), 0, {'year': 2022})
+    cache.carry_over(1, 2, lambda entry: cache_entry_unaffected(entry, [202401]))
+    assert cache.get(key({'Year': [2023]}), 2) == serialize({'year': 2023})
+    assert cache.stats()['entries'] == 1
+    assert cache.bytes == len(serialize({'year': 2023}))
+
+
+@pytest.mark.parametrize('version, carried', [(2, True), (3, False)])
+def test_load_analytics_carries_over_only_to_the_next_version(analytics_server, mongo_db, business_rows,
+                                                              monkeypatch, version, carried):
+    server = analytics_server
+    for name in ('dimension_catalog', 'business_context', 'ai_tool_instructions'):
+        monkeypatch.setattr(server, name, getattr(server, name))
+    monkeypatch.setattr(server, 'result_cache', ResultCache())
+    monkeypatch.setattr(server, 'data_tracker', DataVersionTracker())
+    server.data_tracker.advance(1)
+    server.result_cache.put(key({'Year': [2023]}), 1, {'year': 2023})
+    server.result_cache.put(key({'Year': [2024]}), 1, {'year': 2024})
+
+    async def load():
+        await mongo_db.business_data.insert_many(business_rows)
+        await server.load_analytics(version, [202402])
+
+    asyncio.run(load())
+    assert server.data_tracker.version == version
+    assert (server.result_cache.get(key({'Year': [2023]}), version) is not None) is carried
+    assert server.result_cache.get(key({'Year': [2024]}), version) is None
+
+
+def test_cache_hits_catch_up_with_another_workers_sync(analytics_server, mongo_db, monkeypatch):
+    server = analytics_server
+    refreshed = []
+
+    async def refresh_analytics(version, partitions=None):
+        refreshed.append(version)
+        server.data_tracker.advance(version)
+
+    monkeypatch.setattr(server, 'refresh_analytics', refresh_analytics)
+    monkeypatch.setattr(server, 'data_tracker', DataVersionTracker())
+    monkeypatch.setattr(server, 'version_checked_at', 0.0)
+    monkeypatch.setattr(server, 'DATA_VERSION_CHECK_SECONDS', 3600)
+    server.data_tracker.advance(1)
+
+    async def serve():
+        # Another worker synced twice
+        await server.bump_data_version(mongo_db)
+        await server.bump_data_version(mongo_db)
+        first = await server.current_data_version()
+        await server.bump_data_version(mongo_db)
+        # Within the check interval the stored version is not read again
+        return first, await server.current_data_version()
+
+    assert asyncio.run(serve()) == (2, 2)
+    assert refreshed == [2]
+
+
+def test_unchanged_sync_serves_the_stored_version(analytics_server, mongo_db, monkeypatch):
+    server = analytics_server
+    refreshed = []
+
+    async def refresh_analytics(version, partitions=None):
+        refreshed.append(version)
+
+    async def run_sync():
+        return IngestStats('business.csv', 0, 0.0, unchanged=True)
+
+    monkeypatch.setattr(server, 'refresh_analytics', refresh_analytics)
+    monkeypatch.setattr(server, 'run_sync', run_sync)
+    monkeypatch.setattr(server, 'get_ingest_source', lambda: object())
+
+    async def sync():
+        await server.bump_data_version(mongo_db)
+        return await server.trigger_sync(email='data.admin@thrivebrands.ai')
+
+    assert 'unchanged' in asyncio.run(sync()).message
+    assert refreshed == [1]
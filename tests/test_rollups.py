@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from rollups import BASE_COLLECTION, ROLLUPS, Rollup, RollupRouter, build_rollups, refresh_rollup_partitions
+
+SMALL = Rollup('rollup_small', ['Year', 'Business'])
+WIDE = Rollup('rollup_wide', ['Year', 'Business', 'Channel'])
+
+
+def router_with(sizes, dims=None):
+    router = RollupRouter([SMALL, WIDE])
+    router.sizes = sizes
+    router.built_dims = dims or {rollup.name: rollup.dims for rollup in [SMALL, WIDE]}
+    return router
+
+
+def test_smallest_covering_rollup_wins():
+    router = router_with({SMALL.name: 10, WIDE.name: 50})
+    assert router.route(['Year', 'Business']) == SMALL.name
+    assert router.route(['Year', 'Channel']) == WIDE.name
+    # Size decides, not the declared order
+    router.sizes = {SMALL.name: 80, WIDE.name: 50}
+    assert router.route(['Year']) == WIDE.name
+
+
+def test_route_falls_back_to_the_base_collection():
+    router = router_with({SMALL.name: 10, WIDE.name: 50})
+    assert router.route(['Year', 'Customer']) == BASE_COLLECTION
+    # Unbuilt rollups, and rollups built before a dimension was added, never answer
+    assert router_with({SMALL.name: 10}).route(['Channel']) == BASE_COLLECTION
+    stale = router_with({SMALL.name: 10, WIDE.name: 50}, {SMALL.name: SMALL.dims, WIDE.name: ['Year', 'Business']})
+    assert stale.route(['Channel']) == BASE_COLLECTION
+
+
+YEAR_GRAIN = next(rollup for rollup in ROLLUPS if 'Month' not in rollup.dims)
+MONTH_GRAIN = next(rollup for rollup in ROLLUPS if 'Month' in rollup.dims)
+
+
+def grouped(rows, rollup):
+    """The rollup computed by hand from the base rows"""
+    totals = {}
+    for row in rows:
+        key = tuple(row.get(dim) for dim in rollup.dims)
+        totals[key] = totals.get(key, 0) + row.get('Units', 0)
+    return totals
+
+
+@pytest.mark.parametrize('rollup', [YEAR_GRAIN, MONTH_GRAIN], ids=['year', 'month'])
+def test_refresh_recomputes_only_changed_partitions(mongo_db, business_rows, rollup):
+    async def refresh():
+        await mongo_db[BASE_COLLECTION].insert_many([dict(row) for row in business_rows])
+        await build_rollups(mongo_db, [rollup])
+        # March 2024 is reloaded with doubled units; other partitions are untouched
+        reloaded = [{**row, 'Units': 2 * row.get('Units', 0)} for row in business_rows if row['Period'] == 202403]
+        await mongo_db[BASE_COLLECTION].delete_many({'Period': 202403})
+        await mongo_db[BASE_COLLECTION].insert_many(reloaded)
+        await refresh_rollup_partitions(mongo_db, [202403], [rollup])
+        docs = await mongo_db[rollup.name].find({}, {'_id': 0}).to_list(None)
+        base = await mongo_db[BASE_COLLECTION].find({}, {'_id': 0}).to_list(None)
+        catalog = await mongo_db['rollup_catalog'].find_one({'_id': rollup.name})
+        return docs, base, catalog
+
+    docs, base, catalog = asyncio.run(refresh())
+    assert {tuple(doc.get(dim) for dim in rollup.dims): doc['Units'] for doc in docs} == grouped(base, rollup)
+    assert catalog['doc_count'] == len(docs)
+
+
+def test_refresh_without_partitions_rebuilds(mongo_db, business_rows):
+    async def refresh():
+        await mongo_db[BASE_COLLECTION].insert_many([dict(row) for row in business_rows])
+        sizes = await refresh_rollup_partitions(mongo_db, [202401], [YEAR_GRAIN])
+        router = RollupRouter([YEAR_GRAIN])
+        await router.refresh(mongo_db)
+        return sizes, router
+
+    sizes, router = asyncio.run(refresh())
+    assert sizes == {YEAR_GRAIN.name: len(grouped(business_rows, YEAR_GRAIN))}
+    assert router.route(['Year', 'Brand']) == YEAR_GRAIN.name
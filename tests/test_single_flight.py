@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    flights = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def run():
+        return await asyncio.gather(*[flights.run('key', compute) for _ in range(5)])
+
+    assert asyncio.run(run()) == [42] * 5
+    assert (len(calls), flights.coalesced, flights.in_flight()) == (1, 4, 0)
+
+
+def test_a_cancelled_waiter_leaves_the_computation_to_the_others():
+    flights = SingleFlight()
+    release = None
+
+    async def compute():
+        await release.wait()
+        return 'done'
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.ensure_future(flights.run('key', compute))
+        second = asyncio.ensure_future(flights.run('key', compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == 'done'
+    assert flights.in_flight() == 0
+
+
+def test_the_computation_is_cancelled_once_nobody_waits():
+    flights = SingleFlight()
+    cancelled = []
+
+    async def compute():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def run():
+        waiter = asyncio.ensure_future(flights.run('key', compute))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [1]
+    assert flights.in_flight() == 0
+
+
+def test_errors_reach_every_waiter_and_the_key_is_retried():
+    flights = SingleFlight()
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        await asyncio.sleep(0)
+        if len(attempts) == 1:
+            raise ValueError('boom')
+        return 'ok'
+
+    async def run():
+        results = await asyncio.gather(*[flights.run('key', compute) for _ in range(3)], return_exceptions=True)
+        assert flights.in_flight() == 0
+        return results, await flights.run('key', compute)
+
+    results, retried = asyncio.run(run())
+    assert [type(result) for result in results] == [ValueError] * 3
+    assert retried == 'ok'
+    assert len(attempts) == 2
+
+
+def test_different_keys_do_not_coalesce():
+    flights = SingleFlight()
+
+    async def run():
+        async def compute(value):
+            await asyncio.sleep(0)
+            return value
+        return await asyncio.gather(flights.run('a', lambda: compute(1)), flights.run('b', lambda: compute(2)))
+
+    assert asyncio.run(run()) == [1, 2]
+    assert flights.coalesced == 0